@@ -2,12 +2,15 @@
 #!/usr/bin/env python3
 import platform
 import socket
-import subprocess
 import json
 import os
-import requests
 import time
 import sys
+import random
+
+# requests, subprocess, argparse and the scanner modules are imported inside
+# the functions that use them: a one-shot run only pays for what it needs
+# (windows-audit-cis-main/bench_startup.py tracks the import and launch cost).
 
 ADMIN_HOSTNAME = socket.gethostname()
 
@@ -15,13 +18,37 @@ ADMIN_HOSTNAME = socket.gethostname()
 # NOTE: Update the BACKEND_URL to your actual server address.
 BACKEND_REGISTER_URL = "http://localhost:8000/api/agents/register"
 BACKEND_UPLOAD_URL = "http://localhost:8000/api/upload"
+BACKEND_RULE_PACK_URL = "http://localhost:8000/api/rule-packs/windows"
 
 CONFIG_FILE = "agent_config.json"
 
+SCANNER_DIR = "windows-audit-cis-main"
+BUNDLED_RULES_DIR = os.path.join(SCANNER_DIR, "rules", "windows")
+
+# Upload attempts on connection errors / timeouts (uploads are idempotent)
+UPLOAD_ATTEMPTS = 3
+# Daemon mode: first delay before re-uploading a report the backend did not
+# accept; doubled on every further failure, up to the scan interval
+UPLOAD_RETRY_DELAY = 30
+
+# Daemon mode defaults (seconds)
+DEFAULT_SCAN_INTERVAL = 3600
+DEFAULT_SCAN_JITTER = 300
+MIN_SCAN_DELAY = 60
+
 OUT_DIR = "windows-audit-cis-main/outputs"
 REPORT_FILE = os.path.join(OUT_DIR, "report.json")
 
-def register_agent():
+# Server-distributed rule pack, revalidated with ETag / If-None-Match
+RULE_PACK_CACHE_DIR = "windows-audit-cis-main/rule_pack_cache"
+RULE_PACK_FILE = os.path.join(RULE_PACK_CACHE_DIR, "windows.json")
+RULE_PACK_ETAG_FILE = os.path.join(RULE_PACK_CACHE_DIR, "windows.etag")
+
+# Incremental scans: raw probe values + change signals from the last scan
+PROBE_CACHE_FILE = os.path.join(RULE_PACK_CACHE_DIR, "probes.json")
+
+def register_agent(session=None):
+    import requests
     system_info = get_system_info()
 
     payload = {
@@ -30,7 +57,7 @@ def register_agent():
         "ip_address": system_info["ip_address"],
         "role": system_info["role"]
     }
-    r = requests.post(BACKEND_REGISTER_URL, json=payload)
+    r = (session or requests).post(BACKEND_REGISTER_URL, json=payload, timeout=30)
     r.raise_for_status()
 
     with open(CONFIG_FILE, "w") as f:
@@ -88,8 +115,47 @@ def load_report():
         print(f"Error: Failed to decode JSON from {REPORT_FILE}. The report might be malformed.")
     return None
 
+# --------------------- RULE PACK ---------------------
+
+def fetch_rule_pack(session=None):
+    """
+    Fetches the Windows rule pack from the backend. The cached copy is sent
+    as If-None-Match, so an unchanged pack costs a 304 and no download.
+    Returns the path of the local pack, or None to fall back to bundled rules.
+    """
+    import requests
+    headers = {}
+    if os.path.exists(RULE_PACK_FILE) and os.path.exists(RULE_PACK_ETAG_FILE):
+        with open(RULE_PACK_ETAG_FILE, "r") as f:
+            headers["If-None-Match"] = f.read().strip()
+
+    try:
+        r = (session or requests).get(BACKEND_RULE_PACK_URL, headers=headers, timeout=30)
+        if r.status_code == 304:
+            print("Rule pack unchanged, using cached copy.")
+            return RULE_PACK_FILE
+        r.raise_for_status()
+
+        os.makedirs(RULE_PACK_CACHE_DIR, exist_ok=True)
+        tmp_path = RULE_PACK_FILE + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(r.content)
+        os.replace(tmp_path, RULE_PACK_FILE)
+        with open(RULE_PACK_ETAG_FILE, "w") as f:
+            f.write(r.headers.get("ETag", ""))
+        print(f"Fetched rule pack {r.headers.get('X-Rule-Pack-Digest', '')[:12]}")
+        return RULE_PACK_FILE
+    except requests.exceptions.RequestException as e:
+        print(f"Could not fetch rule pack: {e}")
+
+    if os.path.exists(RULE_PACK_FILE):
+        print("Using cached rule pack.")
+        return RULE_PACK_FILE
+    return None
+
 def run_linux_scanner():
     """Executes the CIS Ubuntu 20.04 scanner."""
+    import subprocess
     cmd = ["bash", "CIS-Ubuntu-20.04-develop/run.sh"]
     print(f"Running Linux CIS scanner: {' '.join(cmd)}")
     try:
@@ -105,11 +171,48 @@ def run_linux_scanner():
         print("Error: Could not find 'bash' or 'CIS-Ubuntu-20.04-develop/run.sh'. Check your setup.")
     return None
 
-def run_windows_scanner():
-    """Executes the Windows CIS scanner."""
+def load_windows_scanner():
+    """The in-process scanner API (windows-audit-cis-main/scanner.py)."""
+    scanner_path = os.path.abspath(SCANNER_DIR)
+    if scanner_path not in sys.path:
+        sys.path.insert(0, scanner_path)
+    import scanner
+    return scanner
+
+def run_windows_scanner(rule_pack=None, include=(), exclude=(), incremental=False, cmd_ttl=0,
+                        use_subprocess=False):
+    """
+    Runs the Windows CIS scanner in this process and returns its report.
+    A copy is still written to REPORT_FILE for inspection.
+    """
+    if use_subprocess:
+        return run_windows_scanner_subprocess(rule_pack, include, exclude, incremental, cmd_ttl)
+
+    try:
+        scanner = WarmWindowsScanner(incremental, cmd_ttl)
+        data = scanner.scan(rule_pack, include, exclude)
+    except Exception as e:
+        print(f"Windows scanner failed: {e}")
+        return None
+
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    return data
+
+def run_windows_scanner_subprocess(rule_pack=None, include=(), exclude=(), incremental=False, cmd_ttl=0):
+    """Executes the Windows CIS scanner as a separate `python main.py` process."""
+    import subprocess
     # Pass the full path to the outputs
     # file via the --json argument
     cmd = ["python", "main.py", "--json", REPORT_FILE]
+    if rule_pack:
+        cmd += ["--rule-pack", os.path.abspath(rule_pack)]
+    for selector in include:
+        cmd += ["--include", selector]
+    for selector in exclude:
+        cmd += ["--exclude", selector]
+    if incremental:
+        cmd += ["--probe-cache", os.path.abspath(PROBE_CACHE_FILE), "--cmd-ttl", str(cmd_ttl)]
     print(f"Running Windows CIS scanner: {' '.join(cmd)}")
     try:
         subprocess.run(cmd,stdout=subprocess.PIPE,stderr=subprocess.STDOUT,cwd="windows-audit-cis-main")
@@ -121,7 +224,211 @@ def run_windows_scanner():
         print("Error: Could not find 'python' or 'windows-audit-cis-main/main.py'. Check your setup.")
     return None
 
-def main():
+# --------------------- DAEMON MODE ---------------------
+
+class WarmWindowsScanner:
+    """
+    Runs the Windows scanner in this process. Scanner modules and the loaded
+    rules stay in memory between scans; rules are reloaded only when the
+    rule pack file (or a bundled .yml file) changes. In incremental mode a
+    probe cache is kept too.
+    """
+    def __init__(self, incremental=False, cmd_ttl=0):
+        self.scanner = load_windows_scanner().Scanner(
+            BUNDLED_RULES_DIR, PROBE_CACHE_FILE if incremental else "", cmd_ttl
+        )
+
+    def scan(self, rule_pack=None, include=(), exclude=()):
+        scanner = self.scanner
+        scanner.load(rule_pack)
+        if scanner.reloaded:
+            print(f"Loaded {len(scanner.rules)} rules (digest {scanner.digest[:12]})")
+        data = scanner.scan(
+            rule_pack, include, exclude,
+            host=socket.gethostname(),
+            os_name=platform.platform()
+        )
+        probe_cache = scanner.probe_cache
+        if probe_cache is not None:
+            print(f"Incremental: {probe_cache.reused} probes reused, "
+                  f"{probe_cache.executed} executed")
+        return data
+
+
+def parse_retry_after(value):
+    """Retry-After as delta-seconds or an HTTP date; None if absent/invalid."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def jittered(seconds, jitter):
+    return max(MIN_SCAN_DELAY, seconds + random.uniform(-jitter, jitter))
+
+
+def build_upload(config, data):
+    """
+    Payload and headers for one report. The idempotency key is derived from
+    the report content and its scan time: re-sending the same report is
+    recognised by the backend as a retry and answered with the first receipt.
+    """
+    import hashlib
+    content = {k: v for k, v in data.items() if k != "scan_time"}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    content_hash = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    key = hashlib.sha256(f"{content_hash}\x1f{data.get('scan_time', '')}".encode("utf-8")).hexdigest()
+
+    headers = {
+        "Authorization": f"Bearer {config['agent_token']}",
+        "Idempotency-Key": key
+    }
+    payload = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "rule_pack_digest": data.get("rule_pack_digest", ""),
+        "content_hash": content_hash,
+        "results": data
+    }
+    return payload, headers
+
+
+def response_error(r):
+    """The "error" of a JSON error response, or None."""
+    try:
+        return r.json().get("error")
+    except (ValueError, AttributeError):
+        return None
+
+
+def upload_report(session, config, data, reregister=True):
+    """
+    Uploads one report, retrying connection failures and timeouts (safe: the
+    idempotency key makes a repeated upload a no-op). Returns (done, delay):
+    done is False if the report should be sent again later (backend busy),
+    and delay the seconds the backend asked for via Retry-After or a
+    'next_scan_in' hint, or None. A token the backend no longer knows is
+    replaced by registering again (`config` is updated in place); a report
+    it rejects with 409 is dropped.
+    """
+    import requests
+    payload, headers = build_upload(config, data)
+    for attempt in range(UPLOAD_ATTEMPTS):
+        try:
+            r = session.post(BACKEND_UPLOAD_URL, json=payload, headers=headers, timeout=30)
+            break
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt == UPLOAD_ATTEMPTS - 1:
+                raise
+            print(f"Upload attempt {attempt + 1} failed ({e}), retrying")
+            time.sleep(2 ** attempt)
+
+    retry_after = parse_retry_after(r.headers.get("Retry-After"))
+    if r.status_code in (429, 503):
+        print(f"Backend busy ({r.status_code}), upload not accepted")
+        return False, retry_after
+    if r.status_code == 401 and reregister and response_error(r) == "Invalid agent token":
+        # agent deleted or database reset: the old token will never work again
+        print("Agent token rejected. Registering again...")
+        config.clear()
+        config.update(register_agent(session))
+        return upload_report(session, config, data, reregister=False)
+    if r.status_code == 409:
+        # the same idempotency key will be rejected on every retry
+        print(f"Upload rejected: {response_error(r)}. Dropping the report.")
+        return True, retry_after
+    r.raise_for_status()
+
+    try:
+        receipt = r.json()
+    except ValueError:
+        receipt = {}
+    print(f"Upload successful! Status Code: {r.status_code}, "
+          f"scan {receipt.get('scan_id')} {receipt.get('outcome', '')}"
+          f"{' (duplicate)' if receipt.get('duplicate') else ''}")
+    hint = receipt.get("next_scan_in")
+    return True, retry_after if retry_after is not None else hint
+
+
+def run_daemon(interval=None, jitter=DEFAULT_SCAN_JITTER, include=(), exclude=(),
+               incremental=False, cmd_ttl=0):
+    """
+    Scans every `interval` seconds (+/- `jitter`) with a warm scanner and
+    HTTP session. Without an explicit `interval` the server paces the
+    agent: its next_scan_in hint sets the delay. A report the backend does
+    not accept (busy, unreachable) is kept and its upload retried with
+    backoff; it is only replaced by a new scan once an interval has passed.
+    A rejected token and a 409 are handled by upload_report().
+    """
+    os_name_lower = platform.system().lower()
+    if "windows" not in os_name_lower and "linux" not in os_name_lower:
+        print(f"Unsupported OS: {platform.system()}. Agent only supports Windows and Linux.")
+        sys.exit(0)
+
+    import requests
+    server_paced = interval is None
+    interval = DEFAULT_SCAN_INTERVAL if server_paced else interval
+    os.makedirs(OUT_DIR, exist_ok=True)
+    session = requests.Session()
+    scanner = WarmWindowsScanner(incremental, cmd_ttl) if "windows" in os_name_lower else None
+
+    config = load_agent_config()
+    pending, pending_since = None, 0.0     # scanned, not yet accepted by the backend
+    backoff = UPLOAD_RETRY_DELAY
+
+    # Random start offset so a fleet restarted together does not scan together
+    delay = random.uniform(0, jitter)
+    print(f"Daemon started: interval {interval}s{' (server paced)' if server_paced else ''}, "
+          f"jitter {jitter}s, first scan in {delay:.0f}s")
+
+    while True:
+        time.sleep(delay)
+        delay = jittered(interval, jitter)
+        if pending is not None and time.time() - pending_since > interval:
+            print("Unsent report is older than the scan interval, scanning again")
+            pending = None
+        try:
+            if pending is None:
+                if scanner:
+                    pending = scanner.scan(fetch_rule_pack(session), include, exclude)
+                else:
+                    pending = run_linux_scanner()
+                pending_since = time.time()
+                if pending is None:
+                    print("Policy check failed to produce usable results. Skipping upload.")
+                    continue
+
+            if not config:
+                print("Agent not registered. Registering now...")
+                config = register_agent(session)
+
+            done, hint = upload_report(session, config, pending)
+            if not done:
+                delay = max(1.0, hint) if hint is not None else backoff
+                backoff = min(backoff * 2, interval)
+                print(f"Retrying the upload in {delay:.0f}s")
+                continue
+
+            pending, backoff = None, UPLOAD_RETRY_DELAY
+            if server_paced and hint is not None:
+                # Honour the server's schedule, with a little jitter of our own
+                delay = max(MIN_SCAN_DELAY, hint + random.uniform(0, min(jitter, hint / 10 + 1)))
+        except requests.exceptions.RequestException as e:
+            print(f"Error talking to backend: {e}")
+            if pending is not None:
+                delay, backoff = backoff, min(backoff * 2, interval)
+        except Exception as e:
+            print(f"Scan cycle failed: {e}")
+        print(f"Next {'upload attempt' if pending is not None else 'scan'} in {delay:.0f}s")
+
+
+def main(include=(), exclude=(), incremental=False, cmd_ttl=0, use_subprocess=False):
     # 1. OS Detection
     os_name = platform.system()
     os_name_lower = os_name.lower()
@@ -139,7 +446,7 @@ def main():
     # 3. Run appropriate scanner
     data = None
     if "windows" in os_name_lower:
-        data = run_windows_scanner()
+        data = run_windows_scanner(fetch_rule_pack(), include, exclude, incremental, cmd_ttl, use_subprocess)
     elif "linux" in os_name_lower:
         data = run_linux_scanner()
     else:
@@ -157,30 +464,56 @@ def main():
         config = register_agent()
         print("Agent registered successfully.")
 
-    # 5. Auth header using agent token
-    headers = {
-        "Authorization": f"Bearer {config['agent_token']}"
-    }
-
-    # 6. Upload scan results (PRODUCTION WAY)
-    payload = {
-        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-        "results": data
-    }
-
+    # 5. Upload scan results (PRODUCTION WAY), authenticated with the agent token
+    import requests
     print(f"Uploading scan results to {BACKEND_UPLOAD_URL}...")
     try:
-        r = requests.post(
-            BACKEND_UPLOAD_URL,
-            json=payload,
-            headers=headers,
-            timeout=30
-        )
-        r.raise_for_status()
-        print(f"Upload successful! Status Code: {r.status_code}")
+        upload_report(requests, config, data)
     except requests.exceptions.RequestException as e:
         print(f"Error during data upload to backend: {e}")
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    ap = argparse.ArgumentParser(description="TRACE agent")
+    ap.add_argument("--daemon", action="store_true",
+                    help="Keep running and scan on a schedule instead of once")
+    ap.add_argument("--interval", type=int, default=None,
+                    help=f"Seconds between scans in daemon mode (default: the server's "
+                         f"next_scan_in hint, else {DEFAULT_SCAN_INTERVAL})")
+    ap.add_argument("--jitter", type=int, default=DEFAULT_SCAN_JITTER,
+                    help="Random +/- seconds added to every scan delay")
+    ap.add_argument("--include", action="append", default=[],
+                    help="Windows scanner check selectors to run (see windows-audit-cis-main/selection.py)")
+    ap.add_argument("--exclude", action="append", default=[],
+                    help="Windows scanner check selectors to skip")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Reuse probe results whose registry key / file is unchanged since the last scan")
+    ap.add_argument("--cmd-ttl", type=float, default=0,
+                    help="Seconds cmd: probe results may be reused in incremental mode (default: never)")
+    ap.add_argument("--subprocess", action="store_true",
+                    help="Run the Windows scanner as a separate main.py process instead of in process")
+    ap.add_argument("--collect", metavar="INVENTORY",
+                    help="Collector mode: scan every target of an inventory file (see collector.py)")
+    ap.add_argument("--batch-size", type=int, default=5,
+                    help="Collector mode: reports per batch upload")
+    ap.add_argument("--max-concurrency", type=int, default=0,
+                    help="Collector mode: probes in flight across all targets (overrides the inventory)")
+    ap.add_argument("--max-targets", type=int, default=0,
+                    help="Collector mode: targets scanned at the same time (overrides the inventory)")
+    ap.add_argument("--no-upload", action="store_true",
+                    help="Collector mode: only write the reports, do not contact the backend")
+    args = ap.parse_args()
+
+    # comma separated values are accepted too, e.g. --include 2.3.*,L1
+    include = [s.strip() for v in args.include for s in v.split(",") if s.strip()]
+    exclude = [s.strip() for v in args.exclude for s in v.split(",") if s.strip()]
+
+    if args.collect:
+        import collector
+        collector.run_collector(args.collect, include, exclude, not args.no_upload, args.batch_size,
+                                args.max_concurrency, args.max_targets)
+    elif args.daemon:
+        run_daemon(args.interval, args.jitter, include, exclude, args.incremental, args.cmd_ttl)
+    else:
+        main(include, exclude, args.incremental, args.cmd_ttl, args.subprocess)
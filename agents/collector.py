@@ -0,0 +1,269 @@
+''' COLLECTOR MODE: ONE NODE SCANS MANY WINDOWS TARGETS '''
+#
+# For segments where an agent cannot run on every box. The collector reads
+# an inventory, runs the Windows scanner's probe set against every target
+# through a transport (windows-audit-cis-main/transports.py) and uploads the
+# reports in batches over one pooled HTTP session:
+#
+#   python agent.py --collect inventory.json
+#
+#   {
+#     "max_concurrency": 16,          # probes in flight across all targets
+#     "max_targets": 8,               # targets scanned at the same time
+#     "defaults": {"transport": "mock", "max_concurrency": 4},
+#     "targets": [
+#       {"name": "ws-01", "fixture": "hosts/ws-01.json"},
+#       {"name": "ws-02", "fixture": "hosts/ws-02.json", "cmd_latency_ms": 20},
+#       {"name": "collector", "transport": "local"}
+#     ]
+#   }
+#
+# Every target is registered as an agent of its own; the tokens are kept in
+# collector_config.json, and a target whose token the backend rejects is
+# registered again. Per-target "max_concurrency" bounds the probes in
+# flight against that host. Every target needs a "transport", given on the
+# target or in "defaults"; a missing one, or one that is not registered,
+# fails the inventory load. Only "transport": "local" scans this machine.
+
+import json
+import os
+import threading
+import time
+
+import agent
+
+COLLECTOR_CONFIG_FILE = "collector_config.json"
+BACKEND_BATCH_UPLOAD_URL = "http://localhost:8000/api/upload/batch"
+
+COLLECTOR_OUT_DIR = os.path.join(agent.OUT_DIR, "collector")
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MAX_TARGETS = 8
+DEFAULT_TARGET_CONCURRENCY = 4
+DEFAULT_BATCH_SIZE = 5
+
+# --------------------- INVENTORY ---------------------
+
+def load_inventory(path):
+    """
+    Inventory JSON with every target's "defaults" applied; raises ValueError
+    if malformed or if a target has no transport or one that is not registered.
+    """
+    agent.load_windows_scanner()
+    import transports
+
+    with open(path, "r", encoding="utf-8") as f:
+        inventory = json.load(f)
+
+    defaults = inventory.get("defaults") or {}
+    targets, seen = [], set()
+    for entry in inventory.get("targets") or []:
+        target = dict(defaults, **entry)
+        name = target.get("name")
+        if not name:
+            raise ValueError(f"Inventory target without a name: {entry}")
+        if name in seen:
+            raise ValueError(f"Duplicate inventory target: {name}")
+        seen.add(name)
+        transports.transport_opener(target)
+        targets.append(target)
+    if not targets:
+        raise ValueError(f"No targets in inventory {path}")
+
+    inventory["targets"] = targets
+    return inventory
+
+def load_collector_config():
+    if not os.path.exists(COLLECTOR_CONFIG_FILE):
+        return {"targets": {}}
+    with open(COLLECTOR_CONFIG_FILE, "r") as f:
+        return json.load(f)
+
+def save_collector_config(config):
+    tmp_path = COLLECTOR_CONFIG_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(config, f, indent=2)
+    os.replace(tmp_path, COLLECTOR_CONFIG_FILE)
+
+# --------------------- SCANNING ---------------------
+
+def scan_target(scanner, transports, target, rule_pack, include, exclude, gate):
+    """Scan one target through its transport; returns the report dict."""
+    name = target["name"]
+    start = time.perf_counter()
+    with transports.open_transport(target) as transport:
+        data = scanner.scan(
+            rule_pack, include, exclude,
+            host=name,
+            os_name=target.get("os_name", "Windows"),
+            transport=transport,
+            workers=target.get("max_concurrency", DEFAULT_TARGET_CONCURRENCY),
+            gate=gate
+        )
+
+    with open(os.path.join(COLLECTOR_OUT_DIR, f"{name}.json"), "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"[{name}] {data['passed']} passed, {data['failed']} failed "
+          f"in {time.perf_counter() - start:.1f}s")
+    return data
+
+def scan_targets(inventory, rule_pack=None, include=(), exclude=()):
+    """
+    Yields (target, report or None) as targets finish. At most max_targets
+    are scanned at once and max_concurrency probes run across all of them.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    scanner_mod = agent.load_windows_scanner()
+    import transports
+
+    # Rules and the selection index are built once, before the threads start
+    scanner = scanner_mod.Scanner(agent.BUNDLED_RULES_DIR)
+    scanner.load(rule_pack)
+    selected = scanner.select(include, exclude)
+    print(f"Collector: {len(inventory['targets'])} targets, {len(selected)} checks "
+          f"(digest {scanner.digest[:12]})")
+
+    os.makedirs(COLLECTOR_OUT_DIR, exist_ok=True)
+    gate = threading.BoundedSemaphore(inventory.get("max_concurrency", DEFAULT_MAX_CONCURRENCY))
+    max_targets = inventory.get("max_targets", DEFAULT_MAX_TARGETS)
+
+    with ThreadPoolExecutor(max_workers=max_targets) as pool:
+        futures = {
+            pool.submit(scan_target, scanner, transports, target, rule_pack, include, exclude, gate): target
+            for target in inventory["targets"]
+        }
+        for future in as_completed(futures):
+            target = futures[future]
+            try:
+                yield target, future.result()
+            except Exception as e:
+                print(f"[{target['name']}] scan failed: {e}")
+                yield target, None
+
+# --------------------- UPLOAD ---------------------
+
+def target_token(session, config, target):
+    """Agent token of `target`, registering it with the backend on first use."""
+    token = config["targets"].get(target["name"])
+    if token:
+        return token
+
+    payload = {
+        "system_name": target["name"],
+        "os_name": target.get("os_name", "Windows"),
+        "ip_address": target.get("address", "unknown"),
+        "role": "AGENT"
+    }
+    r = session.post(agent.BACKEND_REGISTER_URL, json=payload, timeout=30)
+    r.raise_for_status()
+    token = config["targets"][target["name"]] = r.json()["agent_token"]
+    save_collector_config(config)
+    print(f"[{target['name']}] registered")
+    return token
+
+def upload_batch(session, items):
+    """
+    POSTs [(target, upload item)] to /api/upload/batch; returns the receipts.
+    Connection failures and 429/503 are retried: every item carries its
+    idempotency key, so a repeated batch stores nothing twice.
+    """
+    import requests
+    body = {"uploads": [item for _, item in items]}
+    for attempt in range(agent.UPLOAD_ATTEMPTS):
+        last = attempt == agent.UPLOAD_ATTEMPTS - 1
+        try:
+            r = session.post(BACKEND_BATCH_UPLOAD_URL, json=body, timeout=60)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if last:
+                raise
+            print(f"Batch upload attempt {attempt + 1} failed ({e}), retrying")
+            time.sleep(2 ** attempt)
+            continue
+        if r.status_code in (429, 503) and not last:
+            delay = agent.parse_retry_after(r.headers.get("Retry-After"))
+            delay = 2 ** attempt if delay is None else delay
+            print(f"Backend busy ({r.status_code}), retrying batch in {delay:.0f}s")
+            time.sleep(delay)
+            continue
+        r.raise_for_status()
+        break
+
+    receipts = r.json().get("receipts", [])
+    for receipt in receipts:
+        target, _ = items[receipt["index"]]
+        if "error" in receipt:
+            print(f"[{target['name']}] upload rejected: {receipt['error']}")
+        else:
+            print(f"[{target['name']}] scan {receipt.get('scan_id')} {receipt.get('outcome', '')}"
+                  f"{' (duplicate)' if receipt.get('duplicate') else ''}")
+    return receipts
+
+def upload_pending(session, config, pending):
+    """
+    upload_batch() for the pending items. Targets whose token the backend
+    no longer knows (agent deleted, database reset) are registered again
+    and their items re-sent once.
+    """
+    receipts = upload_batch(session, pending)
+    stale = [r["index"] for r in receipts if r.get("error") == "Invalid agent token"]
+    if not stale:
+        return receipts
+
+    retry = []
+    for i in stale:
+        target, item = pending[i]
+        config["targets"].pop(target["name"], None)
+        retry.append((target, dict(item, agent_token=target_token(session, config, target))))
+    for i, receipt in zip(stale, upload_batch(session, retry)):
+        receipts[i] = dict(receipt, index=i)
+    return receipts
+
+# --------------------- COLLECTOR ---------------------
+
+def run_collector(inventory_path, include=(), exclude=(), upload=True, batch_size=DEFAULT_BATCH_SIZE,
+                  max_concurrency=None, max_targets=None):
+    """
+    Scans every inventory target and, unless `upload` is False, uploads the
+    reports `batch_size` at a time while the remaining targets are scanned.
+    Returns {target name: report or None}.
+    """
+    inventory = load_inventory(inventory_path)
+    if max_concurrency:
+        inventory["max_concurrency"] = max_concurrency
+    if max_targets:
+        inventory["max_targets"] = max_targets
+
+    session = config = None
+    rule_pack = None
+    if upload:
+        import requests
+        session = requests.Session()
+        config = load_collector_config()
+        rule_pack = agent.fetch_rule_pack(session)
+
+    reports, pending = {}, []
+    for target, data in scan_targets(inventory, rule_pack, include, exclude):
+        reports[target["name"]] = data
+        if not upload or data is None:
+            continue
+        try:
+            token = target_token(session, config, target)
+            payload, headers = agent.build_upload({"agent_token": token}, data)
+            pending.append((target, dict(payload, agent_token=token,
+                                         idempotency_key=headers["Idempotency-Key"])))
+            if len(pending) >= batch_size:
+                upload_pending(session, config, pending)
+                pending = []
+        except requests.exceptions.RequestException as e:
+            print(f"Error talking to backend: {e}")
+
+    if pending:
+        try:
+            upload_pending(session, config, pending)
+        except requests.exceptions.RequestException as e:
+            print(f"Error talking to backend: {e}")
+
+    failed = sum(1 for data in reports.values() if data is None)
+    print(f"Collector finished: {len(reports) - failed} targets scanned, {failed} failed")
+    return reports
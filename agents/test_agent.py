@@ -0,0 +1,72 @@
+import pytest
+import requests
+
+import agent
+
+
+class _Response:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.headers = {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}")
+
+
+class FakeBackend:
+    """requests.Session stand-in: answers each upload with the next queued status."""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.registered = 0
+        self.uploads = []
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        if url == agent.BACKEND_REGISTER_URL:
+            self.registered += 1
+            return _Response(200, {"agent_token": f"token-{self.registered}"})
+        self.uploads.append(headers["Authorization"])
+        status = self.statuses.pop(0)
+        if status == 401:
+            return _Response(401, {"error": "Invalid agent token"})
+        if status == 409:
+            return _Response(409, {"error": "Idempotency key already used for a different upload"})
+        return _Response(status, {"scan_id": 1, "outcome": "created", "next_scan_in": 60})
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    monkeypatch.setattr(agent, "CONFIG_FILE", str(tmp_path / "agent_config.json"))
+    monkeypatch.setattr(agent, "get_system_info", lambda: {
+        "system_name": "ws-01", "os_name": "Windows", "ip_address": "10.0.0.1", "role": "AGENT"
+    })
+    return {"agent_token": "stale"}
+
+
+REPORT = {"scan_time": "2026-01-01T00:00:00", "passed": 1, "failed": 0, "checks": []}
+
+
+def test_rejected_token_registers_again(config):
+    session = FakeBackend(401, 200)
+    assert agent.upload_report(session, config, REPORT) == (True, 60)
+    assert session.uploads == ["Bearer stale", "Bearer token-1"]
+    assert config == {"agent_token": "token-1"}
+    assert agent.load_agent_config() == config
+
+
+def test_token_rejected_after_registering_again_is_an_error(config):
+    session = FakeBackend(401, 401)
+    with pytest.raises(requests.exceptions.HTTPError):
+        agent.upload_report(session, config, REPORT)
+    assert session.registered == 1
+
+
+def test_conflicting_upload_is_dropped(config):
+    session = FakeBackend(409)
+    done, _ = agent.upload_report(session, config, REPORT)
+    assert done and session.registered == 0
@@ -0,0 +1,152 @@
+import json
+import os
+
+import pytest
+import requests
+
+import agent
+import collector
+
+SCANNER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "windows-audit-cis-main")
+RULES_DIR = os.path.join(SCANNER_DIR, "rules", "windows")
+
+
+class _Response:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.headers = {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}")
+
+
+class FakeBackend:
+    """requests.Session stand-in: registers targets and answers batch uploads."""
+
+    def __init__(self):
+        self.registered = []
+        self.batches = []
+        self.tokens = set()
+
+    def get(self, url, headers=None, timeout=None):
+        raise requests.exceptions.ConnectionError("no rule pack server")
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        if url == agent.BACKEND_REGISTER_URL:
+            token = f"token-{json['system_name']}-{len(self.registered)}"
+            self.registered.append(json["system_name"])
+            self.tokens.add(token)
+            return _Response(200, {"agent_token": token})
+        assert url == collector.BACKEND_BATCH_UPLOAD_URL
+        self.batches.append(json["uploads"])
+        return _Response(200, {"receipts": [
+            {"index": i, "scan_id": i, "outcome": "created", "duplicate": False}
+            if u["agent_token"] in self.tokens else {"index": i, "error": "Invalid agent token"}
+            for i, u in enumerate(json["uploads"])
+        ]})
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    session = FakeBackend()
+    monkeypatch.setattr(requests, "Session", lambda: session)
+    monkeypatch.setattr(agent, "SCANNER_DIR", SCANNER_DIR)
+    monkeypatch.setattr(agent, "BUNDLED_RULES_DIR", RULES_DIR)
+    monkeypatch.setattr(agent, "RULE_PACK_FILE", str(tmp_path / "cache" / "windows.json"))
+    monkeypatch.setattr(agent, "RULE_PACK_ETAG_FILE", str(tmp_path / "cache" / "windows.etag"))
+    monkeypatch.setattr(collector, "COLLECTOR_OUT_DIR", str(tmp_path / "out"))
+    monkeypatch.setattr(collector, "COLLECTOR_CONFIG_FILE", str(tmp_path / "collector_config.json"))
+    return session
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    agent.load_windows_scanner()
+    from bench_scanner import synthesize_host
+    from parser import load_all_rules
+
+    rules = load_all_rules(RULES_DIR)
+    targets = []
+    for i in range(4):
+        fixture = str(tmp_path / f"ws-{i}.json")
+        synthesize_host(rules, pass_rate=0.3 + 0.15 * i, seed=i).to_fixture(fixture)
+        targets.append({"name": f"ws-{i}", "fixture": fixture})
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps({
+        "max_concurrency": 8, "max_targets": 2,
+        "defaults": {"transport": "mock", "max_concurrency": 4},
+        "targets": targets,
+    }))
+    return str(path)
+
+
+def test_collector_scans_and_uploads_every_target(backend, inventory):
+    import transports
+    from scanner import Scanner
+
+    reports = collector.run_collector(inventory, batch_size=3)
+    assert sorted(reports) == ["ws-0", "ws-1", "ws-2", "ws-3"]
+    assert sorted(backend.registered) == ["ws-0", "ws-1", "ws-2", "ws-3"]
+    assert [len(b) for b in backend.batches] == [3, 1]
+    uploads = [u for b in backend.batches for u in b]
+    assert all(u["agent_token"].startswith(f"token-{u['results']['host']}-") for u in uploads)
+    assert all(u["idempotency_key"] for u in uploads)
+
+    # a collected report matches a local scan of the same host
+    target = json.load(open(inventory))["targets"][2]
+    with transports.open_transport(dict(target, transport="mock")) as t:
+        local = Scanner(RULES_DIR).scan(transport=t)
+    strip = lambda r: [(c["id"], c["status"], c.get("details")) for c in r["checks"]]
+    assert strip(reports["ws-2"]) == strip(local)
+
+    # a second run reuses the tokens; unchanged hosts send the same content
+    collector.run_collector(inventory, batch_size=4)
+    assert len(backend.registered) == 4
+    hashes = lambda batches: sorted(u["content_hash"] for b in batches for u in b)
+    assert hashes(backend.batches[2:]) == hashes(backend.batches[:2])
+
+
+def test_collector_registers_again_on_a_stale_token(backend, inventory):
+    collector.run_collector(inventory, batch_size=4)
+    config = json.load(open(collector.COLLECTOR_CONFIG_FILE))
+    config["targets"] = {name: "stale" for name in config["targets"]}
+    json.dump(config, open(collector.COLLECTOR_CONFIG_FILE, "w"))
+
+    collector.run_collector(inventory, batch_size=4)
+    tokens = json.load(open(collector.COLLECTOR_CONFIG_FILE))["targets"]
+    assert sorted(tokens) == ["ws-0", "ws-1", "ws-2", "ws-3"]
+    assert set(tokens.values()) <= backend.tokens
+    # the rejected batch is re-sent once with the new tokens
+    assert [len(b) for b in backend.batches] == [4, 4, 4]
+    assert {u["agent_token"] for u in backend.batches[2]} == set(tokens.values())
+
+
+def test_inventory_validation(tmp_path, monkeypatch):
+    monkeypatch.setattr(agent, "SCANNER_DIR", SCANNER_DIR)
+    agent.load_windows_scanner()
+    import transports
+
+    def inventory(targets):
+        path = tmp_path / "inv.json"
+        path.write_text(json.dumps({"targets": targets}))
+        return str(path)
+
+    with pytest.raises(ValueError, match="Duplicate"):
+        collector.load_inventory(inventory([{"name": "a", "transport": "local"}] * 2))
+    with pytest.raises(ValueError, match="without a name"):
+        collector.load_inventory(inventory([{"transport": "local"}]))
+    with pytest.raises(ValueError, match="No targets"):
+        collector.load_inventory(inventory([]))
+    with pytest.raises(ValueError, match="No transport for target 'a'"):
+        collector.load_inventory(inventory([{"name": "a"}]))
+    with pytest.raises(ValueError, match="No transport"):
+        transports.open_transport({"name": "a"})
+    with pytest.raises(ValueError, match="Unknown transport 'ssh'"):
+        collector.load_inventory(inventory([{"name": "a", "transport": "ssh"}]))
+    with pytest.raises(TypeError):
+        transports.Transport("abstract")
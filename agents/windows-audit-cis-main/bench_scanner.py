@@ -0,0 +1,426 @@
+# File: bench_scanner.py
+#
+# End-to-end benchmark of the scanner pipeline (Scanner.load -> select ->
+# probe_rules -> scan_rules -> JSON/HTML reporters) against a simulated
+# Windows host, so it runs on Linux and gives repeatable numbers. The host
+# is only the transport the probes run on; everything else is scanner.py.
+#
+#   python bench_scanner.py                          # bundled rules, synthetic host
+#   python bench_scanner.py --scale 10               # 10x cis_win10_enterprise.yml
+#   python bench_scanner.py --scale 100 --no-tracemalloc
+#   python bench_scanner.py --fixture host.json --reg-latency-ms 0.2
+#   python bench_scanner.py --write-fixture host.json   # save the synthetic host
+#   python bench_scanner.py --layout legacy          # Rule / RuleResult as before slimming
+#   python bench_scanner.py --include L1 --workers 4 # selection, concurrent probes
+
+import argparse
+import copy
+import glob
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import yaml
+
+import executor
+from levels import annotated_levels, rule_level
+from parser import load_all_rules
+from executor import split_hive
+from evaluator import evaluate_subrule
+from scanner import Scanner, probe_rules, scan_rules
+from selection import RuleIndex, split_selectors
+from reporter import write_enhanced_json_report, write_enhanced_html_report, write_lazy_html_report
+from transports import MockTransport
+
+BASE_PACK = os.path.join("rules", "windows", "cis_win10_enterprise.yml")
+
+HIVES = {
+    "hklm": "hklm", "hkey_local_machine": "hklm",
+    "hkcu": "hkcu", "hkey_current_user": "hkcu",
+    "hku": "hku", "hkey_users": "hku",
+    "hkcr": "hkcr", "hkey_classes_root": "hkcr",
+}
+
+###################################################
+# Simulated host
+###################################################
+
+class FakeHost(MockTransport):
+    """Registry, files and command outputs of a simulated machine."""
+
+    def __init__(self, registry=None, files=None, commands=None,
+                 reg_latency=0.0, file_latency=0.0, cmd_latency=0.0):
+        super().__init__("bench-host", registry, files, commands,
+                         reg_latency, file_latency, cmd_latency)
+
+    @classmethod
+    def from_fixture(cls, path, **latency):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("registry"), data.get("files"), data.get("commands"), **latency)
+
+    @contextmanager
+    def installed(self):
+        """
+        Point executor's local probes at this host for the duration of the
+        block, for code that only scans locally (the probe cache).
+        """
+        saved = (executor.IS_WINDOWS, getattr(executor, "winreg", None),
+                 executor.path_exists, executor.path_stat, executor.check_output)
+        executor.IS_WINDOWS = True
+        executor.winreg = self.winreg
+        executor.path_exists = self.path_exists
+        executor.path_stat = self.path_stat
+        executor.check_output = self.check_output
+        try:
+            yield self
+        finally:
+            (executor.IS_WINDOWS, executor.winreg, executor.path_exists,
+             executor.path_stat, executor.check_output) = saved
+
+
+def _expected_value(parts):
+    """Literal a sub-rule expects after the value name, e.g. '1' or 'r:^3$' -> '3'."""
+    if len(parts) < 3:
+        return "1"
+    expected = parts[2].strip()
+    if expected.startswith("r:") or expected.startswith("n:"):
+        expected = expected[2:].strip().lstrip("^").rstrip("$")
+        expected = "".join(ch for ch in expected if ch.isalnum()) or "1"
+    return expected
+
+
+def synthesize_host(rules, pass_rate, seed):
+    """Build a FakeHost in which roughly `pass_rate` of the probed values exist."""
+    rng = random.Random(seed)
+    registry, files, commands = {}, set(), {}
+    for rule in rules:
+        for sub_rule in rule.rules:
+            s = sub_rule.strip().lower()
+            if rng.random() >= pass_rate:
+                continue
+            if s.startswith("r:"):
+                parts = s[2:].split("->")
+                if len(parts) < 2:
+                    continue
+                hive, path = split_hive(parts[0].strip())
+                hive = HIVES.get(hive)
+                if hive is None:
+                    continue
+                registry.setdefault(f"{hive}\\{path}", {})[parts[1].strip()] = _expected_value(parts)
+            elif s.startswith("f:"):
+                files.add(s[2:].split("->")[0].strip())
+            elif s.startswith("cmd:"):
+                commands[s[4:].strip()] = "enabled"
+    return FakeHost(registry, files, commands)
+
+###################################################
+# Synthetic rule packs
+###################################################
+
+def write_scaled_pack(base_pack, scale, out_dir, cmd_ratio=0.0, seed=0):
+    """Replicate the checks of `base_pack` `scale` times with fresh ids."""
+    rng = random.Random(seed)
+    with open(base_pack, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+
+    base_checks = data.get("checks", [])
+    checks = []
+    for k in range(scale):
+        for check in base_checks:
+            c = copy.deepcopy(check)
+            c["id"] = int(check.get("id", 0)) + k * 100000
+            if cmd_ratio and rng.random() < cmd_ratio:
+                c["rules"] = list(c.get("rules", [])) + [f"cmd:auditpol /get /subcategory:{c['id']}"]
+            checks.append(c)
+
+    data["checks"] = checks
+    path = os.path.join(out_dir, f"synthetic_x{scale}.yml")
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(data, f, sort_keys=False)
+    return path, len(checks)
+
+###################################################
+# Pre-slimming layout (--layout legacy)
+###################################################
+# Rules and results as they were before Rule was slotted and interned:
+# plain dataclass rules holding their own copy of every YAML string, and
+# results that copy the rule's fields and build details up front. Kept
+# here only so the bench can measure both layouts.
+
+@dataclass
+class LegacyRule:
+    id: int = 0
+    title: str = ""
+    description: str = ""
+    rationale: str = ""
+    remediation: str = ""
+    compliance: List[Dict[str, List[str]]] = field(default_factory=list)
+    references: List[str] = field(default_factory=list)
+    condition: str = "all"
+    rules: List[str] = field(default_factory=list)
+    level: str = ""
+
+class LegacyRuleResult:
+    def __init__(self, rule_id, title, status, details, description, rationale,
+                 remediation, compliance, condition, reused=None):
+        self.rule_id = rule_id
+        self.title = title
+        self.status = status
+        self.details = details
+        self.description = description
+        self.rationale = rationale
+        self.remediation = remediation
+        self.compliance = compliance
+        self.condition = condition
+        self.reused = reused
+
+def load_rules_legacy(rules_dir):
+    rules = []
+    for path in sorted(glob.glob(os.path.join(rules_dir, "*.yml"))):
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        levels = annotated_levels(text)
+        for item in (yaml.safe_load(text) or {}).get("checks", []):
+            rules.append(LegacyRule(
+                id=item.get("id", 0),
+                title=item.get("title", ""),
+                description=item.get("description", ""),
+                rationale=item.get("rationale", ""),
+                remediation=item.get("remediation", ""),
+                compliance=item.get("compliance", []),
+                references=item.get("references", []),
+                condition=item.get("condition", "all"),
+                rules=item.get("rules", []),
+                level=rule_level(item.get("compliance", []), levels)
+            ))
+    return rules
+
+def evaluate_rule_legacy(rule, exec_results):
+    passed_subrules = 0
+    fail_reasons = []
+    for r in exec_results:
+        sub_pass, reason = evaluate_subrule(r)
+        if sub_pass:
+            passed_subrules += 1
+        else:
+            fail_reasons.append(f"[{r.sub_rule}] {reason}")
+
+    total = len(exec_results)
+    cond = rule.condition.lower() if rule.condition else "all"
+    if cond == "any":
+        passed = passed_subrules > 0
+    elif cond == "none":
+        passed = passed_subrules == 0
+    else:
+        passed = passed_subrules == total
+
+    if not passed and fail_reasons:
+        details = "; ".join(fail_reasons)
+    else:
+        details = f"{passed_subrules}/{total} sub-rules passed"
+    return LegacyRuleResult(
+        rule_id=rule.id, title=rule.title, status="PASS" if passed else "FAIL", details=details,
+        description=rule.description, rationale=rule.rationale, remediation=rule.remediation,
+        compliance=rule.compliance, condition=rule.condition
+    )
+
+LAYOUTS = ("slim", "legacy")
+
+###################################################
+# Phase timing
+###################################################
+
+class PhaseTimer:
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        peak = retained = None
+        if self.trace_memory:
+            current, peak_abs = tracemalloc.get_traced_memory()
+            peak = peak_abs - base
+            retained = current - base
+        self.phases.append({
+            "phase": name,
+            "seconds": round(elapsed, 4),
+            "peak_kb": round(peak / 1024, 1) if peak is not None else None,
+            # memory still held after the phase, i.e. what its output costs
+            "retained_kb": round(retained / 1024, 1) if retained is not None else None,
+        })
+
+    def per_check_bytes(self, name, checks):
+        for p in self.phases:
+            if p["phase"] == name and p["retained_kb"] is not None and checks:
+                return round(p["retained_kb"] * 1024 / checks)
+        return None
+
+
+def run_pipeline(rules_dir, host, out_dir, timer, layout="slim", include=(), exclude=(), workers=1):
+    """
+    A collector scan of `host` through scanner.py, timed phase by phase:
+    the same Scanner, selection, probe_rules and scan_rules calls as
+    Scanner.run(transport=host). The legacy layout swaps in the
+    pre-slimming loader and evaluator; probing is shared.
+    """
+    scanner = Scanner(rules_dir)
+    with timer.phase("load_rules"):
+        all_rules = scanner.load() if layout == "slim" else load_rules_legacy(rules_dir)
+
+    with timer.phase("select"):
+        if layout == "slim":
+            rules = scanner.select(include, exclude)
+        else:
+            rules = RuleIndex(all_rules).select(include, exclude) if include or exclude else all_rules
+
+    with timer.phase("execute"):
+        probes = probe_rules(rules, host, workers)
+
+    with timer.phase("evaluate"):
+        if layout == "slim":
+            results = scan_rules(rules, probes=probes)
+        else:
+            results = [evaluate_rule_legacy(rule, [probes[s] for s in rule.rules]) for rule in rules]
+
+    passed_count = sum(1 for r in results if r.status == "PASS")
+    failed_count = len(results) - passed_count
+
+    with timer.phase("json_report"):
+        write_enhanced_json_report(
+            results=results, host="bench-host", os_name="Windows 10",
+            passed_count=passed_count, failed_count=failed_count,
+            json_path=os.path.join(out_dir, "report.json")
+        )
+
+    with timer.phase("html_report"):
+        write_enhanced_html_report(
+            results=results, host="bench-host", os_name="Windows 10",
+            passed_count=passed_count, failed_count=failed_count,
+            html_path=os.path.join(out_dir, "report.html")
+        )
+
+    with timer.phase("lazy_html"):
+        write_lazy_html_report(
+            results=results, host="bench-host", os_name="Windows 10",
+            passed_count=passed_count, failed_count=failed_count,
+            html_path=os.path.join(out_dir, "report_lazy.html")
+        )
+
+    return {
+        "checks": len(results),
+        "sub_rules": sum(len(r.rules) for r in rules),
+        "probes": len(probes),
+        "passed": passed_count,
+        "failed": failed_count,
+    }
+
+###################################################
+# CLI
+###################################################
+
+def main():
+    ap = argparse.ArgumentParser(description="Scanner pipeline benchmark on a simulated host")
+    ap.add_argument("--rules", default="./rules/windows", help="Rules directory (ignored with --scale)")
+    ap.add_argument("--scale", type=int, default=0,
+                    help="Benchmark a synthetic pack N times the size of cis_win10_enterprise.yml")
+    ap.add_argument("--base-pack", default=BASE_PACK, help="Pack replicated by --scale")
+    ap.add_argument("--cmd-ratio", type=float, default=0.0,
+                    help="Fraction of synthetic checks given an extra cmd: sub-rule")
+    ap.add_argument("--fixture", default="", help="JSON fixture with registry/files/commands")
+    ap.add_argument("--write-fixture", default="", help="Save the synthesized host to this path")
+    ap.add_argument("--pass-rate", type=float, default=0.5,
+                    help="Share of probed values present on a synthesized host")
+    ap.add_argument("--reg-latency-ms", type=float, default=0.0)
+    ap.add_argument("--file-latency-ms", type=float, default=0.0)
+    ap.add_argument("--cmd-latency-ms", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--no-tracemalloc", action="store_true",
+                    help="Skip peak-memory tracking (it slows every phase down)")
+    ap.add_argument("--include", action="append", default=[],
+                    help="Selectors to scan, as for main.py (repeatable, comma separated)")
+    ap.add_argument("--exclude", action="append", default=[], help="Selectors to skip")
+    ap.add_argument("--workers", type=int, default=1, help="Concurrent probes (as for a collector target)")
+    ap.add_argument("--layout", choices=LAYOUTS, default="slim",
+                    help="In-memory Rule / RuleResult layout: current (slim) or pre-slimming (legacy)")
+    ap.add_argument("--json", default="", help="Write the results to this JSON file")
+    args = ap.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="trace-scanner-bench-")
+    try:
+        rules_dir = args.rules
+        if args.scale:
+            rules_dir = os.path.join(work_dir, "rules")
+            os.makedirs(rules_dir)
+            pack, n = write_scaled_pack(args.base_pack, args.scale, rules_dir, args.cmd_ratio, args.seed)
+            print(f"Synthetic pack: {n} checks ({args.scale}x {args.base_pack})")
+
+        latency = {
+            "reg_latency": args.reg_latency_ms / 1000,
+            "file_latency": args.file_latency_ms / 1000,
+            "cmd_latency": args.cmd_latency_ms / 1000,
+        }
+        if args.fixture:
+            host = FakeHost.from_fixture(args.fixture, **latency)
+        else:
+            host = synthesize_host(load_all_rules(rules_dir), args.pass_rate, args.seed)
+            host.reg_latency = latency["reg_latency"]
+            host.file_latency = latency["file_latency"]
+            host.cmd_latency = latency["cmd_latency"]
+        if args.write_fixture:
+            host.to_fixture(args.write_fixture)
+
+        timer = PhaseTimer(trace_memory=not args.no_tracemalloc)
+        if timer.trace_memory:
+            tracemalloc.start()
+        summary = run_pipeline(rules_dir, host, work_dir, timer, args.layout,
+                               split_selectors(args.include), split_selectors(args.exclude), args.workers)
+        summary["layout"] = args.layout
+        if timer.trace_memory:
+            tracemalloc.stop()
+
+        summary["html_bytes"] = os.path.getsize(os.path.join(work_dir, "report.html"))
+        summary["lazy_html_bytes"] = os.path.getsize(os.path.join(work_dir, "report_lazy.html"))
+        summary["json_bytes"] = os.path.getsize(os.path.join(work_dir, "report.json"))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    total = sum(p["seconds"] for p in timer.phases)
+    print(f"Checks: {summary['checks']}, sub-rules: {summary['sub_rules']} ({summary['probes']} distinct), "
+          f"passed: {summary['passed']}, failed: {summary['failed']}")
+    print(f"{'phase':<14}{'seconds':>10}{'peak KB':>12}{'kept KB':>12}")
+    for p in timer.phases:
+        peak = "-" if p["peak_kb"] is None else p["peak_kb"]
+        kept = "-" if p["retained_kb"] is None else p["retained_kb"]
+        print(f"{p['phase']:<14}{p['seconds']:>10}{peak:>12}{kept:>12}")
+    print(f"{'total':<14}{round(total, 4):>10}")
+    print(f"Report bytes: json {summary['json_bytes']}, html {summary['html_bytes']}, "
+          f"lazy html {summary['lazy_html_bytes']}")
+    if timer.trace_memory:
+        summary["rule_bytes_per_check"] = timer.per_check_bytes("load_rules", summary["checks"])
+        summary["result_bytes_per_check"] = timer.per_check_bytes("evaluate", summary["checks"])
+        print(f"Per check ({args.layout} layout): {summary['rule_bytes_per_check']} bytes (Rule), "
+              f"{summary['result_bytes_per_check']} bytes (RuleResult)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "phases": timer.phases, "total_seconds": total}, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
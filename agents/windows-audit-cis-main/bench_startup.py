@@ -0,0 +1,107 @@
+# File: bench_startup.py
+#
+# Startup cost of the agent and the scanner: interpreter start, module
+# import time, and one scan launched the old way (a second interpreter
+# running main.py, report re-read from disk) vs in process via scanner.py.
+# Every measurement runs in a fresh interpreter, so caches do not help.
+#
+#   python bench_startup.py                 # 5 runs each, median reported
+#   python bench_startup.py --runs 11 --top 15
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+AGENT_DIR = os.path.dirname(HERE)
+RULES_DIR = os.path.join(HERE, "rules", "windows")
+
+def timed(cmd, cwd):
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def median_ms(samples):
+    return statistics.median(samples) * 1000
+
+def import_profile(module, cwd, top):
+    """Slowest direct imports of `module` (cumulative us) from `python -X importtime`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=cwd, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        if name.strip() == "site" and not name[1:].startswith(" "):
+            rows = []     # everything so far was interpreter startup
+        elif name.startswith("   ") and not name.startswith("    "):
+            # one level below the module itself: nested imports are part of
+            # their parent's cumulative time
+            rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def write_bundled_pack(path):
+    """Rule pack JSON (the format /api/rule-packs serves) from the bundled YAML."""
+    sys.path.insert(0, HERE)
+    from parser import load_all_rules, rules_digest, DIGEST_FIELDS
+    rules = load_all_rules(RULES_DIR)
+    checks = [{name: getattr(r, name) for name in DIGEST_FIELDS} for r in rules]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"digest": rules_digest(rules), "checks": checks}, f)
+    return len(checks)
+
+def main():
+    ap = argparse.ArgumentParser(description="Agent / scanner startup benchmark")
+    ap.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    ap.add_argument("--top", type=int, default=10, help="Slowest imports listed per module")
+    args = ap.parse_args()
+
+    py = sys.executable
+    with tempfile.TemporaryDirectory() as tmp:
+        pack = os.path.join(tmp, "windows.json")
+        checks = write_bundled_pack(pack)
+        json_out = os.path.join(tmp, "scan.json")
+        html_out = os.path.join(tmp, "report.html")
+
+        subprocess_launch = (
+            "import json, subprocess, sys\n"
+            f"subprocess.run([sys.executable, 'main.py', '--rule-pack', {pack!r}, "
+            f"'--json', {json_out!r}, '--html', {html_out!r}], "
+            "stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)\n"
+            f"json.load(open({json_out!r}))\n"
+        )
+        in_process = (
+            f"import sys; sys.path.insert(0, {HERE!r})\n"
+            f"import scanner; scanner.Scanner().scan({pack!r})\n"
+        )
+
+        measurements = [
+            ("interpreter (python -c pass)", [py, "-c", "pass"], HERE),
+            ("import agent", [py, "-c", "import agent"], AGENT_DIR),
+            ("import scanner", [py, "-c", "import scanner"], HERE),
+            ("import main", [py, "-c", "import main"], HERE),
+            ("scan: main.py subprocess + re-read", [py, "-c", subprocess_launch], HERE),
+            ("scan: in process (scanner.py)", [py, "-c", in_process], HERE),
+        ]
+
+        print(f"Python {sys.version.split()[0]}, {checks} checks, median of {args.runs} runs\n")
+        print(f"{'measurement':<38} {'ms':>9} {'- interp':>9}")
+        baseline = None
+        for name, cmd, cwd in measurements:
+            ms = median_ms([timed(cmd, cwd) for _ in range(args.runs)])
+            baseline = ms if baseline is None else baseline
+            print(f"{name:<38} {ms:>9.1f} {ms - baseline:>9.1f}")
+
+    for module, cwd in (("agent", AGENT_DIR), ("scanner", HERE)):
+        print(f"\nSlowest direct imports of 'import {module}' (cumulative ms):")
+        for us, name in import_profile(module, cwd, args.top):
+            print(f"  {us / 1000:>8.1f}  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import os
+
+import pytest
+
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules", "windows")
+
+
+@pytest.fixture(scope="session")
+def bundled_rules():
+    from parser import load_all_rules
+    return load_all_rules(RULES_DIR)
@@ -1,41 +1,73 @@
 # File: evaluator.py
 
 import re
-from typing import List
+from typing import List, Tuple
 from executor import ExecResult
 from sca_structs import Rule
 
 class RuleResult:
     """
-    Holds the final pass/fail status plus the original rule data
-    so we can display it in reports without hardcoding.
+    Pass/fail status of one rule. Holds a reference to the evaluated Rule
+    (reports read title, description, compliance, ... through it) instead
+    of copying its text, and builds the details string only when asked.
     """
+    __slots__ = ("rule", "status", "passed_subrules", "total_subrules", "fail_reasons", "reused")
+
     def __init__(
         self,
-        rule_id: int,
-        title: str,
+        rule: Rule,
         status: str,
-        details: str,
-        description: str,
-        rationale: str,
-        remediation: str,
-        compliance,
-        condition: str
+        passed_subrules: int,
+        total_subrules: int,
+        fail_reasons: Tuple[str, ...] = (),
+        reused: bool = None
     ):
-        self.rule_id = rule_id
-        self.title = title
+        self.rule = rule
         self.status = status       # "PASS" or "FAIL"
-        self.details = details     # e.g. "2/2 sub-rules passed"
-        self.description = description
-        self.rationale = rationale
-        self.remediation = remediation
-        self.compliance = compliance
-        self.condition = condition
+        self.passed_subrules = passed_subrules
+        self.total_subrules = total_subrules
+        self.fail_reasons = fail_reasons
+        self.reused = reused       # None unless a probe cache ran; True if every sub-rule was cached
+
+    @property
+    def details(self) -> str:
+        # e.g. "2/2 sub-rules passed", or the failing sub-rules and why
+        if self.status == "FAIL" and self.fail_reasons:
+            return "; ".join(self.fail_reasons)
+        return f"{self.passed_subrules}/{self.total_subrules} sub-rules passed"
+
+    @property
+    def rule_id(self) -> int:
+        return self.rule.id
+
+    @property
+    def title(self) -> str:
+        return self.rule.title
+
+    @property
+    def description(self) -> str:
+        return self.rule.description
+
+    @property
+    def rationale(self) -> str:
+        return self.rule.rationale
+
+    @property
+    def remediation(self) -> str:
+        return self.rule.remediation
+
+    @property
+    def compliance(self):
+        return self.rule.compliance
+
+    @property
+    def condition(self) -> str:
+        return self.rule.condition
 
 def evaluate_rule(rule: Rule, exec_results: List[ExecResult]) -> RuleResult:
     """
     Evaluate pass/fail for the given 'rule' based on the sub-rule results in exec_results.
-    Then create a RuleResult that includes all relevant fields from the original Rule.
+    The returned RuleResult references 'rule' for all of its descriptive fields.
     """
     passed_subrules = 0
     fail_reasons = []
@@ -61,23 +93,9 @@ def evaluate_rule(rule: Rule, exec_results: List[ExecResult]) -> RuleResult:
         passed = (passed_subrules == total)
 
     status = "PASS" if passed else "FAIL"
-    if not passed and fail_reasons:
-        details = "; ".join(fail_reasons)
-    else:
-        details = f"{passed_subrules}/{total} sub-rules passed"
-
-    # Build a RuleResult with original fields from 'rule'
-    return RuleResult(
-        rule_id=rule.id,
-        title=rule.title,
-        status=status,
-        details=details,
-        description=rule.description,
-        rationale=rule.rationale,
-        remediation=rule.remediation,
-        compliance=rule.compliance,
-        condition=rule.condition
-    )
+    # Reasons only matter for the details of a failed rule
+    reasons = tuple(fail_reasons) if not passed else ()
+    return RuleResult(rule, status, passed_subrules, total, reasons)
 
 def evaluate_subrule(exec_result: ExecResult) -> (bool, str):
     """
@@ -6,36 +6,44 @@ import sys
 from typing import NamedTuple
 
 # If you're on Windows, you can import winreg. For non-Windows, handle differently.
-if sys.platform.startswith("win"):
+IS_WINDOWS = sys.platform.startswith("win")
+if IS_WINDOWS:
     import winreg
 
+# Host access points. bench_scanner.py swaps these (and winreg / IS_WINDOWS)
+# for a simulated host so the pipeline can be measured off Windows.
+path_exists = os.path.exists
+path_stat = os.stat
+check_output = subprocess.check_output
+
 class ExecResult(NamedTuple):
     sub_rule: str
     value: str
     error: str
 
-def execute_subrule(sub_rule: str) -> ExecResult:
+def execute_subrule(sub_rule: str, transport=None) -> ExecResult:
     """
     Decide how to handle the sub_rule based on prefix:
     - r: -> registry check (Windows)
     - f: -> file check
     - cmd: -> run command
+    With a transport (see transports.py) the probe runs on that host instead.
     """
     sub_rule = sub_rule.strip().lower()
 
     if sub_rule.startswith("r:"):
-        if sys.platform.startswith("win"):
-            return read_registry(sub_rule)
+        if IS_WINDOWS if transport is None else transport.is_windows:
+            return read_registry(sub_rule, transport)
         else:
             return ExecResult(sub_rule, "", "Registry check not supported on non-Windows")
     elif sub_rule.startswith("f:"):
-        return check_file(sub_rule)
+        return check_file(sub_rule, transport)
     elif sub_rule.startswith("cmd:"):
-        return run_command(sub_rule)
+        return run_command(sub_rule, transport)
     else:
         return ExecResult(sub_rule, "", f"Unknown prefix in {sub_rule}")
 
-def read_registry(sub_rule: str) -> ExecResult:
+def read_registry(sub_rule: str, transport=None) -> ExecResult:
     """
     Example sub_rule: r:HKLM\Software\Microsoft -> SomeKey -> regex:^....
     We'll parse out the hive (HKLM/HKCU/HKU/HKCR/HKEY_LOCAL_MACHINE, etc.)
@@ -51,9 +59,10 @@ def read_registry(sub_rule: str) -> ExecResult:
     value_name = parts[1].strip()
 
     # If there's more -> splitted, you might parse them. For now, let's assume it's a direct read.
+    reg = winreg if transport is None else transport.winreg
     hive_str, path_str = split_hive(reg_path)
     try:
-        hive = get_hive(hive_str)
+        hive = get_hive(hive_str, reg)
     except ValueError as e:
         return ExecResult(sub_rule, "", str(e))
 
@@ -62,8 +71,8 @@ def read_registry(sub_rule: str) -> ExecResult:
         value_name = None  # default
 
     try:
-        with winreg.OpenKey(hive, path_str) as key:
-            val, regtype = winreg.QueryValueEx(key, value_name)
+        with reg.OpenKey(hive, path_str) as key:
+            val, regtype = reg.QueryValueEx(key, value_name)
         return ExecResult(sub_rule, str(val), "")
     except Exception as e:
         return ExecResult(sub_rule, "", f"Registry error: {e}")
@@ -79,24 +88,26 @@ def split_hive(reg_path: str):
     else:
         return parts[0], parts[1]
 
-def get_hive(hive_str: str):
+def get_hive(hive_str: str, reg=None):
     """
-    Maps short/long hive names to winreg constants.
+    Maps short/long hive names to winreg constants (of `reg`, default winreg).
     Accepts: HKLM or HKEY_LOCAL_MACHINE, HKCU or HKEY_CURRENT_USER, etc.
     """
+    if reg is None:
+        reg = winreg
     hive_str_up = hive_str.upper()
     if hive_str_up in ["HKLM", "HKEY_LOCAL_MACHINE"]:
-        return winreg.HKEY_LOCAL_MACHINE
+        return reg.HKEY_LOCAL_MACHINE
     elif hive_str_up in ["HKCU", "HKEY_CURRENT_USER"]:
-        return winreg.HKEY_CURRENT_USER
+        return reg.HKEY_CURRENT_USER
     elif hive_str_up in ["HKU", "HKEY_USERS"]:
-        return winreg.HKEY_USERS
+        return reg.HKEY_USERS
     elif hive_str_up in ["HKCR", "HKEY_CLASSES_ROOT"]:
-        return winreg.HKEY_CLASSES_ROOT
+        return reg.HKEY_CLASSES_ROOT
     else:
         raise ValueError(f"Unsupported hive: {hive_str}")
 
-def check_file(sub_rule: str) -> ExecResult:
+def check_file(sub_rule: str, transport=None) -> ExecResult:
     """
     e.g. f:C:\Windows\System32\notepad.exe -> exists
     We'll just see if the file is present. 
@@ -105,18 +116,20 @@ def check_file(sub_rule: str) -> ExecResult:
     parts = rule_body.split("->")
     file_path = parts[0].strip()
 
-    if os.path.exists(file_path):
+    exists = path_exists if transport is None else transport.path_exists
+    if exists(file_path):
         return ExecResult(sub_rule, "exists", "")
     else:
         return ExecResult(sub_rule, "missing", "")
 
-def run_command(sub_rule: str) -> ExecResult:
+def run_command(sub_rule: str, transport=None) -> ExecResult:
     """
     e.g. cmd:whoami
     """
     cmd_str = sub_rule[4:].strip()
     try:
-        output = subprocess.check_output(cmd_str, shell=True, universal_newlines=True)
+        run = check_output if transport is None else transport.check_output
+        output = run(cmd_str, shell=True, universal_newlines=True)
         return ExecResult(sub_rule, output.strip(), "")
     except subprocess.CalledProcessError as e:
         return ExecResult(sub_rule, "", f"Command error: {e}")
@@ -0,0 +1,165 @@
+# File: incremental.py
+
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import executor
+from executor import ExecResult, execute_subrule, split_hive, get_hive
+
+###################################################
+# Change-driven probe cache
+###################################################
+#
+# Many sub-rules probe the same source (e.g. several values under one
+# registry key), and most sources do not change between scans. The cache
+# stores the raw value each normalized probe returned last time together
+# with a cheap change signal of its source:
+#   r:   last-write time of the registry key (one QueryInfoKey per key)
+#   f:   mtime + size of the file (or "missing")
+#   cmd: no signal; reused only within an opt-in TTL
+# A probe whose signal is unchanged is answered from the cache.
+
+CACHE_VERSION = 1
+
+# Entries not used by any scan for this long are dropped on save, and the
+# file never holds more than CACHE_MAX_ENTRIES (least recently used go first)
+CACHE_MAX_AGE = 30 * 86400
+CACHE_MAX_ENTRIES = 50000
+
+
+def probe_key(sub_rule: str) -> Tuple[str, Optional[str]]:
+    """
+    (probe key, source key) for a normalized sub-rule. The probe key ignores
+    the expected-value part, so rules that read the same value share it.
+    """
+    s = sub_rule.strip().lower()
+    if s.startswith("r:"):
+        parts = [p.strip() for p in s[2:].split("->")]
+        reg_path = parts[0]
+        value_name = parts[1] if len(parts) > 1 else ""
+        return f"r:{reg_path}->{value_name}", f"r:{reg_path}"
+    if s.startswith("f:"):
+        path = s[2:].split("->")[0].strip()
+        return f"f:{path}", f"f:{path}"
+    # cmd: and anything else: no change signal
+    return s, None
+
+
+class ProbeCache:
+    def __init__(self, path: str, cmd_ttl: float = 0):
+        self.path = path
+        self.cmd_ttl = cmd_ttl
+        self.entries: Dict[str, dict] = {}
+        self._signals: Dict[str, object] = {}   # per-scan memo of source signals
+        self._used: Dict[str, dict] = {}
+        self.reused = 0
+        self.executed = 0
+        self.load()
+
+    # ---------------- persistence ----------------
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = data.get("probes", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        """
+        Merge the probes used by the last scan into the saved ones, so a
+        partial (--include / --exclude) scan keeps the rest of the cache.
+        Entries unused for CACHE_MAX_AGE, then the least recently used
+        beyond CACHE_MAX_ENTRIES, are evicted.
+        """
+        now = time.time()
+        for entry in self._used.values():
+            entry["seen"] = now
+        merged = dict(self.entries)
+        merged.update(self._used)
+        merged = {k: e for k, e in merged.items() if now - e.get("seen", e.get("time", 0)) <= CACHE_MAX_AGE}
+        if len(merged) > CACHE_MAX_ENTRIES:
+            newest = sorted(merged, key=lambda k: merged[k].get("seen", merged[k].get("time", 0)), reverse=True)
+            merged = {k: merged[k] for k in newest[:CACHE_MAX_ENTRIES]}
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "probes": merged}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self.entries = merged
+
+    def begin_scan(self):
+        self._signals = {}
+        self._used = {}
+        self.reused = 0
+        self.executed = 0
+
+    # ---------------- change signals ----------------
+
+    def _source_signal(self, source: str):
+        if source in self._signals:
+            return self._signals[source]
+
+        if source.startswith("r:"):
+            signal = self._registry_signal(source[2:])
+        else:
+            try:
+                st = executor.path_stat(source[2:])
+                signal = [st.st_mtime, st.st_size]
+            except OSError:
+                signal = "missing"
+
+        self._signals[source] = signal
+        return signal
+
+    def _registry_signal(self, reg_path: str):
+        if not executor.IS_WINDOWS:
+            return "unsupported"
+        hive_str, path_str = split_hive(reg_path)
+        try:
+            hive = get_hive(hive_str)
+            with executor.winreg.OpenKey(hive, path_str) as key:
+                return executor.winreg.QueryInfoKey(key)[2]
+        except Exception:
+            return "missing"
+
+    # ---------------- execution ----------------
+
+    def execute(self, sub_rule: str) -> Tuple[ExecResult, bool]:
+        """Run (or reuse) one sub-rule. Returns (result, reused)."""
+        normalized = sub_rule.strip().lower()
+        key, source = probe_key(normalized)
+        now = time.time()
+
+        if source is not None:
+            signal = self._source_signal(source)
+        else:
+            signal = None
+
+        cached = self._used.get(key) or self.entries.get(key)
+        if cached is not None:
+            if source is not None:
+                fresh = cached.get("signal") == signal
+            else:
+                fresh = bool(self.cmd_ttl) and now - cached.get("time", 0) < self.cmd_ttl
+            if fresh:
+                self._used[key] = cached
+                self.reused += 1
+                return ExecResult(normalized, cached["value"], cached["error"]), True
+
+        result = execute_subrule(normalized)
+        self._used[key] = {
+            "signal": signal,
+            "value": result.value,
+            "error": result.error,
+            "time": now,
+        }
+        self.executed += 1
+        return result, False
@@ -0,0 +1,32 @@
+# File: levels.py
+#
+# CIS profile levels of checks. SCA policy files only annotate them in
+# comments ("# 2.3.7.6 (L2) Ensure ..."), and many checks have no
+# annotation at all: their level is "" in Rule / rule packs and UNKNOWN for
+# selection, where the L1 / L2 selectors do not match them.
+#
+# The backend's rule pack compiler has its own copy of these rules
+# (backend/cis_levels.py); the two must agree, so packs compiled there and YAML
+# loaded here get the same levels.
+
+import re
+from typing import Dict
+
+LEVEL_COMMENT_RE = re.compile(r"^\s*#\s*([0-9][0-9.]*)\s*\((L[12])\)", re.MULTILINE)
+
+LEVELS = ("L1", "L2")
+UNKNOWN = "unknown"
+
+def annotated_levels(text: str) -> Dict[str, str]:
+    """{cis id: level} from the level comments of one policy file's source."""
+    return dict(LEVEL_COMMENT_RE.findall(text))
+
+def rule_level(compliance, levels: Dict[str, str]) -> str:
+    """Level of the first CIS id in 'compliance' that has a level annotation, else ""."""
+    for entry in compliance or []:
+        if isinstance(entry, dict):
+            for cis_id in entry.get("cis") or []:
+                level = levels.get(str(cis_id))
+                if level:
+                    return level
+    return ""
@@ -4,12 +4,13 @@ import argparse
 import sys
 import os
 
-from parser import load_all_rules
-from executor import execute_subrule
-from evaluator import evaluate_rule
+from parser import load_all_rules, load_rule_pack, rules_digest
+from selection import RuleIndex, split_selectors
+from scanner import scan_rules
 from reporter import (
     write_enhanced_json_report,
-    write_enhanced_html_report
+    write_enhanced_html_report,
+    write_lazy_html_report
 )
 
 def main():
@@ -24,28 +25,54 @@ def main():
     parser.add_argument("--os", default="Windows 11", help="OS name override")
     parser.add_argument("--benchmark", default="",
                         help="(Optional) Benchmark name to display in reports")
+    parser.add_argument("--rule-pack", default="",
+                        help="(Optional) Precompiled rule pack JSON; used instead of --rules")
+    parser.add_argument("--include", action="append", default=[],
+                        help="Only run matching checks: rule id, CIS id or prefix (2.3.*), "
+                             "L1/L2, framework (pci_dss) or framework:value. Repeatable / comma separated")
+    parser.add_argument("--exclude", action="append", default=[],
+                        help="Skip matching checks (same selectors as --include)")
+    parser.add_argument("--probe-cache", default="",
+                        help="(Optional) Incremental mode: reuse probed values whose source is unchanged, "
+                             "persisted in this JSON file")
+    parser.add_argument("--cmd-ttl", type=float, default=0,
+                        help="Seconds a cached cmd: result may be reused in incremental mode (default 0: never)")
+    parser.add_argument("--html-mode", choices=("full", "lazy"), default="full",
+                        help="full: every check inlined as HTML; lazy: checks embedded once as JSON "
+                             "and rendered in the browser with paging, filter and search")
     args = parser.parse_args()
 
-    # 1. Load rules from .yml files
+    # 1. Load rules from a rule pack or from .yml files
     try:
-        all_rules = load_all_rules(args.rules)
+        if args.rule_pack:
+            all_rules, digest = load_rule_pack(args.rule_pack)
+            source = args.rule_pack
+        else:
+            all_rules = load_all_rules(args.rules)
+            digest = rules_digest(all_rules)
+            source = args.rules
     except Exception as e:
         print(f"Error loading rules: {e}")
         sys.exit(1)
 
-    print(f"Loaded {len(all_rules)} rules from {args.rules}")
+    print(f"Loaded {len(all_rules)} rules from {source} (digest {digest[:12]})")
 
-    # 2. Execute & Evaluate
-    all_results = []
-    for rule in all_rules:
-        exec_results = []
-        for sub_rule in rule.rules:
-            r_exec = execute_subrule(sub_rule)
-            exec_results.append(r_exec)
+    include = split_selectors(args.include)
+    exclude = split_selectors(args.exclude)
+    if include or exclude:
+        all_rules = RuleIndex(all_rules).select(include, exclude)
+        print(f"Selected {len(all_rules)} rules (include={include}, exclude={exclude})")
 
-        # evaluate_rule() returns a RuleResult with original fields from the rule
-        r_result = evaluate_rule(rule, exec_results)
-        all_results.append(r_result)
+    # 2. Execute & Evaluate
+    probe_cache = None
+    if args.probe_cache:
+        from incremental import ProbeCache
+        probe_cache = ProbeCache(args.probe_cache, args.cmd_ttl)
+    all_results = scan_rules(all_rules, probe_cache)
+    if probe_cache is not None:
+        reused_checks = sum(1 for r in all_results if r.reused)
+        print(f"Incremental: {probe_cache.reused} probes reused, {probe_cache.executed} executed; "
+              f"{reused_checks}/{len(all_results)} checks fully from cache")
 
     # 3. Summaries
     passed_count = sum(1 for r in all_results if r.status == "PASS")
@@ -64,10 +91,13 @@ def main():
         passed_count=passed_count,
         failed_count=failed_count,
         json_path=args.json,
-        benchmark_name=args.benchmark
+        benchmark_name=args.benchmark,
+        rule_pack_digest=digest,
+        selection={"include": include, "exclude": exclude} if include or exclude else None
     )
 
-    write_enhanced_html_report(
+    write_html_report = write_lazy_html_report if args.html_mode == "lazy" else write_enhanced_html_report
+    write_html_report(
         results=all_results,
         host=args.host,
         os_name=args.os,
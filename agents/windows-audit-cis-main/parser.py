@@ -1,15 +1,65 @@
 # File: parser.py
 
 import os
+import sys
 import glob
-import yaml
-from typing import List
+import hashlib
+import json
+from typing import Dict, List, Tuple
 from sca_structs import SCAFile, Rule, PolicyBlock, RequirementsBlock
+from levels import annotated_levels, rule_level
 
-def load_sca_file(file_path: str) -> SCAFile:
+# Rule fields that define what a check does; rules_digest hashes only these
+DIGEST_FIELDS = ("id", "title", "description", "rationale", "remediation",
+                 "compliance", "references", "condition", "rules")
+
+def _intern(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [_intern(v) for v in value]
+    return value
+
+def compact_compliance(compliance, shared: Dict[str, dict]) -> list:
+    """
+    Intern compliance keys/values and reuse one dict per distinct entry:
+    thousands of checks carry the same {cis: [...]} / {pci_dss: [...]} maps.
+    """
+    out = []
+    for entry in compliance or []:
+        if not isinstance(entry, dict):
+            out.append(_intern(entry))
+            continue
+        entry = {_intern(k): _intern(v) for k, v in entry.items()}
+        key = json.dumps(entry, sort_keys=True, default=str)
+        out.append(shared.setdefault(key, entry))
+    return out
+
+def make_rule(item: dict, levels: Dict[str, str], shared: Dict[str, dict]) -> Rule:
+    """Rule from one 'checks:' item, with its strings interned."""
+    compliance = item.get("compliance", [])
+    return Rule(
+        id=item.get("id", 0),
+        title=_intern(item.get("title", "")),
+        description=_intern(item.get("description", "")),
+        rationale=_intern(item.get("rationale", "")),
+        remediation=_intern(item.get("remediation", "")),
+        compliance=compact_compliance(compliance, shared),
+        references=_intern(item.get("references", [])),
+        condition=_intern(item.get("condition", "all")),
+        rules=_intern(item.get("rules", [])),
+        level=item.get("level") or rule_level(compliance, levels)
+    )
+
+def load_sca_file(file_path: str, shared: Dict[str, dict] = None) -> SCAFile:
     """Parse a single .yml file into an SCAFile object."""
+    if shared is None:
+        shared = {}
     with open(file_path, 'r', encoding='utf-8') as f:
-        data = yaml.safe_load(f)
+        text = f.read()
+    import yaml  # only the .yml path needs it; rule packs are plain JSON
+    data = yaml.safe_load(text)
+    levels = annotated_levels(text)
 
     sca = SCAFile()
 
@@ -32,18 +82,7 @@ def load_sca_file(file_path: str) -> SCAFile:
     checks_data = data.get("checks", [])
     sca.checks = []
     for item in checks_data:
-        rule_obj = Rule(
-            id=item.get("id", 0),
-            title=item.get("title", ""),
-            description=item.get("description", ""),
-            rationale=item.get("rationale", ""),
-            remediation=item.get("remediation", ""),
-            compliance=item.get("compliance", []),
-            references=item.get("references", []),
-            condition=item.get("condition", "all"),
-            rules=item.get("rules", [])
-        )
-        sca.checks.append(rule_obj)
+        sca.checks.append(make_rule(item, levels, shared))
 
     return sca
 
@@ -53,14 +92,38 @@ def load_all_rules(rules_dir: str) -> List[Rule]:
     and merges the checks into a single list of Rule objects.
     """
     pattern = os.path.join(rules_dir, "*.yml")
-    files = glob.glob(pattern)
+    # sorted so the merged rule order (and rules_digest) is stable across hosts
+    files = sorted(glob.glob(pattern))
     if not files:
         raise FileNotFoundError(f"No .yml files found in {rules_dir}")
 
     all_rules = []
+    shared = {}   # compliance entries shared across every file
     for file_path in files:
-        sca_file = load_sca_file(file_path)
+        sca_file = load_sca_file(file_path, shared)
         # We only append the "checks" from each file, ignoring policy/requirements
         all_rules.extend(sca_file.checks)
 
     return all_rules
+
+
+def rules_digest(rules: List[Rule]) -> str:
+    """
+    sha256 over the canonical JSON of the rules. Matches the digest the
+    backend assigns to the same YAML compiled as a rule pack.
+    """
+    checks = [{name: getattr(r, name) for name in DIGEST_FIELDS} for r in rules]
+    canonical = json.dumps(checks, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def load_rule_pack(pack_path: str) -> Tuple[List[Rule], str]:
+    """
+    Loads a precompiled rule pack (JSON served by the backend at
+    /api/rule-packs/<name>) and returns its rules plus the pack digest.
+    """
+    with open(pack_path, "r", encoding="utf-8") as f:
+        pack = json.load(f)
+
+    shared = {}
+    rules = [make_rule(item, {}, shared) for item in pack.get("checks", [])]
+    return rules, pack.get("digest") or rules_digest(rules)
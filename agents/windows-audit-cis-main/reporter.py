@@ -9,24 +9,29 @@ from evaluator import RuleResult
 # Enhanced JSON Report
 ###################################################
 
-def write_enhanced_json_report(
+def compute_score_percent(passed_count: int, total: int) -> int:
+    """Unweighted score shared by every report format; the backend applies weighting policies."""
+    return round((passed_count / total) * 100) if total > 0 else 0
+
+def build_json_report(
     results: List[RuleResult],
     host: str,
     os_name: str,
     passed_count: int,
     failed_count: int,
-    json_path: str,
-    benchmark_name: str = ""
-):
+    benchmark_name: str = "",
+    rule_pack_digest: str = "",
+    selection: dict = None
+) -> dict:
     """
-    Writes a JSON report with pass/fail counts, plus the fields from each RuleResult
-    (description, rationale, remediation, compliance, condition, etc.).
-    The 'benchmark_name' is optional (can be empty).
+    Builds the report dict written by write_enhanced_json_report: pass/fail
+    counts plus the fields from each RuleResult (description, rationale,
+    remediation, compliance, condition, etc.).
+    'rule_pack_digest' identifies the rule set that produced the results and
+    'selection' records include/exclude filters when only part of it ran.
     """
     total = len(results)
-    score_percent = 0
-    if total > 0:
-        score_percent = round((passed_count / total) * 100)
+    score_percent = compute_score_percent(passed_count, total)
 
     report_data = {
         "benchmark_name": benchmark_name,
@@ -36,8 +41,19 @@ def write_enhanced_json_report(
         "scan_time": datetime.datetime.now().isoformat(),
         "host": host,
         "os": os_name,
+        "rule_pack_digest": rule_pack_digest,
         "checks": []
     }
+    if selection:
+        report_data["selection"] = selection
+
+    incremental = any(r.reused is not None for r in results)
+    if incremental:
+        reused_checks = sum(1 for r in results if r.reused)
+        report_data["incremental"] = {
+            "reused_checks": reused_checks,
+            "executed_checks": total - reused_checks
+        }
 
     for r in results:
         item = {
@@ -51,8 +67,32 @@ def write_enhanced_json_report(
             "compliance": r.compliance,
             "condition": r.condition
         }
+        if incremental:
+            item["reused"] = bool(r.reused)
         report_data["checks"].append(item)
 
+    return report_data
+
+def write_enhanced_json_report(
+    results: List[RuleResult],
+    host: str,
+    os_name: str,
+    passed_count: int,
+    failed_count: int,
+    json_path: str,
+    benchmark_name: str = "",
+    rule_pack_digest: str = "",
+    selection: dict = None
+):
+    """
+    Writes the JSON report from build_json_report() to 'json_path'.
+    The 'benchmark_name' is optional (can be empty).
+    """
+    report_data = build_json_report(
+        results, host, os_name, passed_count, failed_count,
+        benchmark_name, rule_pack_digest, selection
+    )
+
     with open(json_path, "w", encoding="utf-8") as f:
         json.dump(report_data, f, indent=2)
 
@@ -75,9 +115,7 @@ def write_enhanced_html_report(
     The 'benchmark_name' is optional.
     """
     total = len(results)
-    score_percent = 0
-    if total > 0:
-        score_percent = round((passed_count / total) * 100)
+    score_percent = compute_score_percent(passed_count, total)
     date_str = datetime.datetime.now().strftime("%b %d, %Y @ %H:%M:%S")
 
     html = f"""<!DOCTYPE html>
@@ -186,7 +224,7 @@ def write_enhanced_html_report(
       <tr class="{row_class}">
         <td>{r.rule_id}</td>
         <td>{r.title}</td>
-        <td>{r.status}</td>
+        <td>{r.status}{" <small class='text-muted'>(cached)</small>" if r.reused else ""}</td>
         <td>
           <span class="toggle-details" onclick="toggleDetails('{details_id}')">View Details</span>
         </td>
@@ -227,3 +265,275 @@ function toggleDetails(id) {
 
     with open(html_path, "w", encoding="utf-8") as f:
         f.write(html)
+
+###################################################
+# Lazy HTML Report (embedded JSON, rendered on demand)
+###################################################
+
+LAZY_PAGE_SIZE = 50
+
+def _compliance_text(compliance) -> str:
+    comps = []
+    for cdict in compliance or []:
+        if isinstance(cdict, dict):
+            for key, val_list in cdict.items():
+                comps.append(f"{key}: {', '.join(str(v) for v in val_list or [])}")
+    return "; ".join(comps)
+
+def build_lazy_report_data(results: List[RuleResult]) -> dict:
+    """
+    Compact payload for the lazy HTML report. Long texts (description,
+    rationale, remediation, compliance) repeat across benchmarks, so they go
+    into a string table once and each check row refers to them by index:
+    [id, title, status, details, description, rationale, remediation,
+     compliance, condition, reused]
+    """
+    strings: List[str] = []
+    index = {}
+
+    def ref(text) -> int:
+        text = text or ""
+        pos = index.get(text)
+        if pos is None:
+            pos = index[text] = len(strings)
+            strings.append(text)
+        return pos
+
+    checks = []
+    for r in results:
+        checks.append([
+            r.rule_id,
+            ref(r.title),
+            1 if r.status == "PASS" else 0,
+            r.details,
+            ref(r.description),
+            ref(r.rationale),
+            ref(r.remediation),
+            ref(_compliance_text(r.compliance)),
+            ref(r.condition),
+            1 if r.reused else 0,
+        ])
+    return {"strings": strings, "checks": checks}
+
+def _embed_json(data) -> str:
+    # Safe inside <script>: no "</script>" or "<!--" can survive escaping "<"
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).replace("<", "\\u003c")
+
+def write_lazy_html_report(
+    results: List[RuleResult],
+    host: str,
+    os_name: str,
+    passed_count: int,
+    failed_count: int,
+    html_path: str,
+    benchmark_name: str = ""
+):
+    """
+    Same summary as write_enhanced_html_report, but the checks are embedded
+    once as compact JSON and the table, paging, status filter, search and
+    detail panels are rendered in the browser on demand.
+    """
+    from html import escape as html_escape
+    total = len(results)
+    score_percent = compute_score_percent(passed_count, total)
+    date_str = datetime.datetime.now().strftime("%b %d, %Y @ %H:%M:%S")
+    title = html_escape(benchmark_name or "CIS Scan Report")
+
+    html = f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>{title}</title>
+    <!-- Bootstrap CSS -->
+    <link rel="stylesheet"
+          href="https://cdn.jsdelivr.net/npm/bootstrap@5.2.3/dist/css/bootstrap.min.css">
+    <style>
+      body {{ margin: 20px; }}
+      .summary-box {{ display: flex; flex-wrap: wrap; gap: 1.5rem; margin-bottom: 1rem; }}
+      .summary-item {{ background-color: #f8f9fa; padding: 1rem; border-radius: 5px; min-width: 150px; text-align: center; }}
+      .pass {{ background-color: #e0ffe0 !important; }}
+      .fail {{ background-color: #ffe0e0 !important; }}
+      .toggle-details {{ cursor: pointer; color: #0d6efd; text-decoration: underline; }}
+      .details p {{ margin-bottom: 0.4rem; white-space: pre-wrap; }}
+    </style>
+</head>
+<body>
+
+<div class="container">
+
+  <h1 class="my-3">{title}</h1>
+  <div class="summary-box">
+    <div class="summary-item">
+      <h5>Passed</h5>
+      <p style="color: green; font-weight: bold;">{passed_count}</p>
+    </div>
+    <div class="summary-item">
+      <h5>Failed</h5>
+      <p style="color: red; font-weight: bold;">{failed_count}</p>
+    </div>
+    <div class="summary-item">
+      <h5>Score</h5>
+      <p style="color: #0d6efd; font-weight: bold;">{score_percent}%</p>
+    </div>
+    <div class="summary-item">
+      <h5>Scan Date</h5>
+      <p>{date_str}</p>
+    </div>
+    <div class="summary-item">
+      <h5>Host</h5>
+      <p>{html_escape(host)}</p>
+    </div>
+    <div class="summary-item">
+      <h5>OS</h5>
+      <p>{html_escape(os_name)}</p>
+    </div>
+  </div>
+
+  <hr/>
+
+  <h4>Checks (<span id="match-count">{total}</span> / {total})</h4>
+  <div class="row g-2 align-items-center mt-2">
+    <div class="col-md-6">
+      <input id="search" type="search" class="form-control"
+             placeholder="Search id, title, compliance (e.g. 2.3.1, pci_dss) or details">
+    </div>
+    <div class="col-md-3">
+      <select id="status-filter" class="form-select">
+        <option value="">All statuses</option>
+        <option value="FAIL">Failed only</option>
+        <option value="PASS">Passed only</option>
+      </select>
+    </div>
+    <div class="col-md-3 text-end">
+      <button id="prev" class="btn btn-outline-secondary btn-sm">&laquo; Prev</button>
+      <span id="page-info" class="mx-2"></span>
+      <button id="next" class="btn btn-outline-secondary btn-sm">Next &raquo;</button>
+    </div>
+  </div>
+
+  <table class="table table-bordered table-hover mt-3">
+    <thead class="table-light">
+      <tr>
+        <th style="width:5%">ID</th>
+        <th style="width:50%">Title</th>
+        <th style="width:10%">Status</th>
+        <th style="width:35%">Action</th>
+      </tr>
+    </thead>
+    <tbody id="checks"></tbody>
+  </table>
+</div>
+
+<script type="application/json" id="report-data">{_embed_json(build_lazy_report_data(results))}</script>
+<script>
+(function () {{
+  var PAGE_SIZE = {LAZY_PAGE_SIZE};
+  var data = JSON.parse(document.getElementById("report-data").textContent);
+  var S = data.strings, checks = data.checks;
+  var tbody = document.getElementById("checks");
+  var search = document.getElementById("search");
+  var statusFilter = document.getElementById("status-filter");
+  var matches = checks, page = 0, haystacks = null;
+
+  function haystack(i) {{
+    // Built on first search only
+    if (!haystacks) {{
+      haystacks = checks.map(function (c) {{
+        return (c[0] + " " + S[c[1]] + " " + S[c[7]] + " " + c[3]).toLowerCase();
+      }});
+    }}
+    return haystacks[i];
+  }}
+
+  function cell(tr, text) {{
+    var td = document.createElement("td");
+    td.textContent = text;
+    tr.appendChild(td);
+    return td;
+  }}
+
+  function para(parent, label, text) {{
+    var p = document.createElement("p");
+    var b = document.createElement("strong");
+    b.textContent = label + ": ";
+    p.appendChild(b);
+    p.appendChild(document.createTextNode(text));
+    parent.appendChild(p);
+  }}
+
+  function toggleDetails(row, c) {{
+    var next = row.nextSibling;
+    if (next && next.className === "details") {{
+      tbody.removeChild(next);
+      return;
+    }}
+    var tr = document.createElement("tr");
+    tr.className = "details";
+    var td = document.createElement("td");
+    td.colSpan = 4;
+    para(td, "Description", S[c[4]]);
+    para(td, "Rationale", S[c[5]]);
+    para(td, "Remediation", S[c[6]]);
+    para(td, "Compliance", S[c[7]]);
+    para(td, "Condition", S[c[8]]);
+    para(td, "Evaluation", c[3]);
+    tr.appendChild(td);
+    tbody.insertBefore(tr, row.nextSibling);
+  }}
+
+  function render() {{
+    var pages = Math.max(1, Math.ceil(matches.length / PAGE_SIZE));
+    page = Math.min(page, pages - 1);
+    var frag = document.createDocumentFragment();
+    matches.slice(page * PAGE_SIZE, (page + 1) * PAGE_SIZE).forEach(function (i) {{
+      var c = checks[i];
+      var tr = document.createElement("tr");
+      tr.className = c[2] ? "pass" : "fail";
+      cell(tr, c[0]);
+      cell(tr, S[c[1]]);
+      cell(tr, (c[2] ? "PASS" : "FAIL") + (c[9] ? " (cached)" : ""));
+      var link = document.createElement("span");
+      link.className = "toggle-details";
+      link.textContent = "View Details";
+      link.onclick = function () {{ toggleDetails(tr, c); }};
+      cell(tr, "").appendChild(link);
+      frag.appendChild(tr);
+    }});
+    tbody.textContent = "";
+    tbody.appendChild(frag);
+    document.getElementById("match-count").textContent = matches.length;
+    document.getElementById("page-info").textContent = (page + 1) + " / " + pages;
+  }}
+
+  function applyFilters() {{
+    var q = search.value.trim().toLowerCase();
+    var status = statusFilter.value;
+    matches = [];
+    for (var i = 0; i < checks.length; i++) {{
+      if (status && (checks[i][2] ? "PASS" : "FAIL") !== status) continue;
+      if (q && haystack(i).indexOf(q) === -1) continue;
+      matches.push(i);
+    }}
+    page = 0;
+    render();
+  }}
+
+  var timer = null;
+  search.addEventListener("input", function () {{
+    clearTimeout(timer);
+    timer = setTimeout(applyFilters, 150);
+  }});
+  statusFilter.addEventListener("change", applyFilters);
+  document.getElementById("prev").onclick = function () {{ if (page > 0) {{ page--; render(); }} }};
+  document.getElementById("next").onclick = function () {{ page++; render(); }};
+
+  applyFilters();
+}})();
+</script>
+
+</body>
+</html>
+"""
+
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(html)
@@ -1,8 +1,20 @@
 # File: sca_structs.py
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from typing import List, Dict
 
+def slotted(cls):
+    """
+    Rebuild a dataclass with __slots__ and no per-instance __dict__
+    (what dataclass(slots=True) does on Python 3.10+).
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = dict(cls.__dict__)
+    for name in names + ("__dict__", "__weakref__"):
+        namespace.pop(name, None)
+    namespace["__slots__"] = names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
 @dataclass
 class PolicyBlock:
     """Represents the 'policy:' section of a Wazuh-style SCA YAML file."""
@@ -20,9 +32,16 @@ class RequirementsBlock:
     condition: str = "all"
     rules: List[str] = field(default_factory=list)
 
-@dataclass
+@slotted
+@dataclass(frozen=True, eq=False)
 class Rule:
-    """Represents each item in the 'checks:' array of a Wazuh-style SCA YAML file."""
+    """
+    Represents each item in the 'checks:' array of a Wazuh-style SCA YAML file.
+    Frozen and slotted; the parser interns its strings and shares identical
+    compliance entries between rules, so never modify those in place.
+    Equality and hashing are by identity (eq=False): the list fields would
+    make a field-based hash raise TypeError.
+    """
     id: int = 0
     title: str = ""
     description: str = ""
@@ -34,6 +53,8 @@ class Rule:
     condition: str = "all"
     # sub-rules (registry/file/command checks) go here
     rules: List[str] = field(default_factory=list)
+    # CIS profile level ("L1"/"L2") from the policy file's comments, if annotated
+    level: str = ""
 
 @dataclass
 class SCAFile:
@@ -0,0 +1,168 @@
+# File: scanner.py
+#
+# In-process API for embedding the scanner (the TRACE agent uses it):
+#
+#   from scanner import Scanner
+#   report = Scanner().scan(rule_pack="windows.json", include=["L1"])
+#
+# scan() returns the same dict main.py writes with --json, without a second
+# interpreter or a report file in between. Optional parts (YAML parsing,
+# selection, the probe cache) are imported only when used.
+
+import os
+from typing import Dict, Iterable, List, Optional
+
+from parser import load_all_rules, load_rule_pack, rules_digest
+from executor import execute_subrule, ExecResult
+from evaluator import evaluate_rule, RuleResult
+from sca_structs import Rule
+
+DEFAULT_RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules", "windows")
+
+def probe_rules(rules: List[Rule], transport=None, workers: int = 1, gate=None) -> Dict[str, ExecResult]:
+    """
+    Run every distinct sub-rule of `rules` once through `transport`, up to
+    `workers` at a time. `gate` (a semaphore shared by several targets)
+    additionally bounds the probes in flight across all of them.
+    """
+    sub_rules = list(dict.fromkeys(s for rule in rules for s in rule.rules))
+
+    def probe(sub_rule):
+        if gate is None:
+            return execute_subrule(sub_rule, transport)
+        with gate:
+            return execute_subrule(sub_rule, transport)
+
+    if workers <= 1:
+        return {s: probe(s) for s in sub_rules}
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(sub_rules, pool.map(probe, sub_rules)))
+
+def scan_rules(all_rules: List[Rule], probe_cache=None, probes: Dict[str, ExecResult] = None) -> List[RuleResult]:
+    """
+    Execute every sub-rule and evaluate each rule; returns RuleResults in rule order.
+    With a ProbeCache, unchanged probes are answered from the previous scan;
+    with `probes` (from probe_rules) nothing is executed here.
+    """
+    if probe_cache is not None:
+        probe_cache.begin_scan()
+
+    all_results = []
+    for rule in all_rules:
+        exec_results = []
+        all_reused = True
+        for sub_rule in rule.rules:
+            if probes is not None:
+                r_exec = probes[sub_rule]
+            elif probe_cache is not None:
+                r_exec, reused = probe_cache.execute(sub_rule)
+                all_reused = all_reused and reused
+            else:
+                r_exec = execute_subrule(sub_rule)
+            exec_results.append(r_exec)
+
+        # evaluate_rule() returns a RuleResult referencing the rule
+        r_result = evaluate_rule(rule, exec_results)
+        if probe_cache is not None:
+            r_result.reused = all_reused
+        all_results.append(r_result)
+
+    if probe_cache is not None:
+        probe_cache.save()
+    return all_results
+
+def rules_dir_signature(rules_dir: str) -> tuple:
+    """(name, mtime, size) of every .yml file in rules_dir: changes when a file is edited, added or removed."""
+    signature = []
+    for entry in sorted(os.scandir(rules_dir), key=lambda e: e.name):
+        if entry.name.endswith(".yml") and entry.is_file():
+            st = entry.stat()
+            signature.append((entry.name, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+class Scanner:
+    """
+    Keeps the loaded rules (and their selection index and probe cache)
+    between scans; rules are reloaded only when the rule pack file, or a
+    .yml file in rules_dir, changes.
+    """
+
+    def __init__(self, rules_dir: str = DEFAULT_RULES_DIR, probe_cache: str = "", cmd_ttl: float = 0):
+        self.rules_dir = rules_dir
+        self.rules: List[Rule] = []
+        self.digest = ""
+        # True if the last load() (re)loaded the rules, False if it kept them
+        self.reloaded = False
+        self._source_key = None
+        self._index = None
+        self.probe_cache = None
+        if probe_cache:
+            from incremental import ProbeCache
+            self.probe_cache = ProbeCache(probe_cache, cmd_ttl)
+
+    def load(self, rule_pack: Optional[str] = None) -> List[Rule]:
+        """Rules from `rule_pack` (JSON) if given, else the .yml files in rules_dir."""
+        if rule_pack:
+            key = (rule_pack, os.path.getmtime(rule_pack))
+        else:
+            key = (self.rules_dir, rules_dir_signature(self.rules_dir))
+        if key == self._source_key:
+            self.reloaded = False
+            return self.rules
+
+        if rule_pack:
+            self.rules, self.digest = load_rule_pack(rule_pack)
+        else:
+            self.rules = load_all_rules(self.rules_dir)
+            self.digest = rules_digest(self.rules)
+        self._index = None
+        self._source_key = key
+        self.reloaded = True
+        return self.rules
+
+    def select(self, include: Iterable[str] = (), exclude: Iterable[str] = ()) -> List[Rule]:
+        include, exclude = list(include), list(exclude)
+        if not include and not exclude:
+            return self.rules
+        if self._index is None:
+            from selection import RuleIndex
+            self._index = RuleIndex(self.rules)
+        return self._index.select(include, exclude)
+
+    def run(self, rule_pack: Optional[str] = None, include: Iterable[str] = (),
+            exclude: Iterable[str] = (), transport=None, workers: int = 1, gate=None) -> List[RuleResult]:
+        """
+        Load (if needed), select and scan; returns the RuleResults. With a
+        transport the probes run on that host (see probe_rules); the probe
+        cache only applies to local scans.
+        """
+        self.load(rule_pack)
+        rules = self.select(include, exclude)
+        if transport is None:
+            return scan_rules(rules, self.probe_cache)
+        return scan_rules(rules, probes=probe_rules(rules, transport, workers, gate))
+
+    def scan(self, rule_pack: Optional[str] = None, include: Iterable[str] = (),
+             exclude: Iterable[str] = (), host: str = "", os_name: str = "",
+             benchmark_name: str = "", transport=None, workers: int = 1, gate=None) -> dict:
+        """Run a scan and return the JSON report dict."""
+        from reporter import build_json_report
+        include, exclude = list(include), list(exclude)
+        results = self.run(rule_pack, include, exclude, transport, workers, gate)
+        passed_count = sum(1 for r in results if r.status == "PASS")
+        return build_json_report(
+            results=results,
+            host=host,
+            os_name=os_name,
+            passed_count=passed_count,
+            failed_count=len(results) - passed_count,
+            benchmark_name=benchmark_name,
+            rule_pack_digest=self.digest,
+            selection={"include": include, "exclude": exclude} if include or exclude else None
+        )
+
+def scan(rule_pack: Optional[str] = None, rules_dir: str = DEFAULT_RULES_DIR,
+         include: Iterable[str] = (), exclude: Iterable[str] = (), **report_fields) -> dict:
+    """One-shot convenience wrapper around Scanner.scan()."""
+    return Scanner(rules_dir).scan(rule_pack, include, exclude, **report_fields)
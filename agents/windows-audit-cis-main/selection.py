@@ -0,0 +1,109 @@
+# File: selection.py
+
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Set
+from sca_structs import Rule
+from levels import LEVELS, UNKNOWN
+
+# Selector syntax (used by --include / --exclude, comma separated or repeated):
+#   15500            rule id
+#   2.3.1.2          exact CIS id          2.3.*  / cis:2.3.*   CIS section prefix
+#   L1 / L2          CIS profile level
+#   unknown          checks without a level annotation (L1 / L2 never match them)
+#   pci_dss          any check mapped to that framework
+#   pci_dss:8.1      one requirement       pci_dss:8.*          requirement prefix
+
+
+class RuleIndex:
+    """
+    Inverted index over Rule.compliance, built once after the rules are
+    loaded, so include/exclude selection is a handful of set operations.
+    """
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        self.all: Set[int] = set()
+        self.by_rule_id: Dict[str, int] = {}
+        self.by_level: Dict[str, Set[int]] = {}
+        # framework -> value -> positions; sorted value lists serve prefixes
+        self.by_framework: Dict[str, Dict[str, Set[int]]] = {}
+        self.sorted_values: Dict[str, List[str]] = {}
+
+        for pos, rule in enumerate(rules):
+            self.all.add(pos)
+            self.by_rule_id[str(rule.id)] = pos
+            self.by_level.setdefault(rule.level or UNKNOWN, set()).add(pos)
+            for entry in rule.compliance or []:
+                if not isinstance(entry, dict):
+                    continue
+                for framework, values in entry.items():
+                    framework = framework.lower()
+                    bucket = self.by_framework.setdefault(framework, {})
+                    for value in values or []:
+                        bucket.setdefault(str(value), set()).add(pos)
+
+        for framework, bucket in self.by_framework.items():
+            self.sorted_values[framework] = sorted(bucket)
+
+    def _framework_values(self, framework: str, pattern: str) -> Set[int]:
+        bucket = self.by_framework.get(framework, {})
+        if not pattern.endswith("*"):
+            return set(bucket.get(pattern, ()))
+
+        prefix = pattern[:-1]
+        values = self.sorted_values.get(framework, [])
+        matched: Set[int] = set()
+        i = bisect_left(values, prefix)
+        while i < len(values) and values[i].startswith(prefix):
+            matched |= bucket[values[i]]
+            i += 1
+        return matched
+
+    def match(self, selector: str) -> Set[int]:
+        """Positions (in self.rules) of the rules matched by one selector."""
+        sel = selector.strip()
+        if not sel:
+            return set()
+
+        if sel.upper() in LEVELS:
+            return set(self.by_level.get(sel.upper(), ()))
+        if sel.lower() == UNKNOWN:
+            return set(self.by_level.get(UNKNOWN, ()))
+
+        if ":" in sel:
+            framework, pattern = sel.split(":", 1)
+            framework = framework.strip().lower()
+            if framework == "level":
+                level = pattern.strip()
+                return set(self.by_level.get(UNKNOWN if level.lower() == UNKNOWN else level.upper(), ()))
+            return self._framework_values(framework, pattern.strip())
+
+        if sel.isdigit() and sel in self.by_rule_id:
+            return {self.by_rule_id[sel]}
+
+        if sel[0].isdigit():
+            return self._framework_values("cis", sel)
+
+        # Bare framework name: every check mapped to it
+        matched: Set[int] = set()
+        for positions in self.by_framework.get(sel.lower(), {}).values():
+            matched |= positions
+        return matched
+
+    def select(self, include: Iterable[str] = (), exclude: Iterable[str] = ()) -> List[Rule]:
+        """Rules matching any include (all when none given) and no exclude, in load order."""
+        include = [s for s in include if s.strip()]
+        chosen = set(self.all) if not include else set()
+        for sel in include:
+            chosen |= self.match(sel)
+        for sel in exclude:
+            chosen -= self.match(sel)
+        return [self.rules[pos] for pos in sorted(chosen)]
+
+
+def split_selectors(values: Iterable[str]) -> List[str]:
+    """Flatten repeated / comma separated CLI values."""
+    out = []
+    for v in values or []:
+        out.extend(s.strip() for s in v.split(",") if s.strip())
+    return out
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import incremental
+from bench_scanner import synthesize_host
+from incremental import ProbeCache, probe_key
+from main import scan_rules
+from selection import RuleIndex
+
+
+@pytest.fixture(scope="module")
+def host(bundled_rules):
+    return synthesize_host(bundled_rules, pass_rate=0.6, seed=1)
+
+
+def _scan(rules, cache, host):
+    with host.installed():
+        return scan_rules(rules, cache)
+
+
+def test_probe_key_ignores_the_expected_value():
+    assert probe_key(r"r:HKLM\Soft\Key -> Value -> 1") == (r"r:hklm\soft\key->value", r"r:hklm\soft\key")
+    assert probe_key("f:C:\\a.txt -> r:foo") == ("f:c:\\a.txt", "f:c:\\a.txt")
+    assert probe_key("cmd:whoami") == ("cmd:whoami", None)
+
+
+def test_unchanged_probes_are_reused(bundled_rules, host, tmp_path):
+    path = str(tmp_path / "probes.json")
+    cold = ProbeCache(path)
+    first = _scan(bundled_rules, cold, host)
+    # rules probing the same value share it even on a cold cache
+    assert cold.executed > 0
+
+    warm = ProbeCache(path)
+    second = _scan(bundled_rules, warm, host)
+    # only cmd: probes (no change signal, cmd_ttl=0) run again
+    assert warm.reused > cold.reused and warm.executed < cold.executed
+    assert [(r.rule_id, r.status) for r in first] == [(r.rule_id, r.status) for r in second]
+    assert all(r.reused is not None for r in second)
+
+
+def test_partial_scan_keeps_the_rest_of_the_cache(bundled_rules, host, tmp_path):
+    path = str(tmp_path / "probes.json")
+    _scan(bundled_rules, ProbeCache(path), host)
+    baseline = ProbeCache(path)
+    _scan(bundled_rules, baseline, host)
+    saved = len(baseline.entries)
+
+    partial = ProbeCache(path)
+    _scan(RuleIndex(bundled_rules).select(["2.3.*"]), partial, host)
+    assert len(partial.entries) == saved
+
+    full = ProbeCache(path)
+    _scan(bundled_rules, full, host)
+    assert full.executed == baseline.executed
+
+
+def test_save_evicts_least_recently_used(bundled_rules, host, tmp_path, monkeypatch):
+    path = str(tmp_path / "probes.json")
+    _scan(bundled_rules, ProbeCache(path), host)
+
+    monkeypatch.setattr(incremental, "CACHE_MAX_ENTRIES", 10)
+    cache = ProbeCache(path)
+    _scan(bundled_rules[:3], cache, host)
+    with open(path, encoding="utf-8") as f:
+        probes = json.load(f)["probes"]
+    assert len(probes) == 10
+    # the probes of the last scan are the most recently used
+    assert set(cache._used) <= set(probes)
+
+    monkeypatch.setattr(incremental, "CACHE_MAX_AGE", -1)
+    ProbeCache(path).save()
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["probes"] == {}
@@ -0,0 +1,31 @@
+import os
+
+import yaml
+
+from scanner import Scanner
+
+
+def _write_pack(path, ids):
+    checks = [{"id": i, "title": f"Check {i}", "condition": "all",
+               "rules": [f"f:C:\\missing-{i}.txt"]} for i in ids]
+    path.write_text(yaml.safe_dump({"policy": {"id": "test"}, "checks": checks}))
+
+
+def test_yaml_rules_reload_when_a_file_changes(tmp_path):
+    _write_pack(tmp_path / "a.yml", [1, 2])
+    scanner = Scanner(str(tmp_path))
+    assert [r.id for r in scanner.load()] == [1, 2] and scanner.reloaded
+
+    scanner.load()
+    assert not scanner.reloaded
+
+    _write_pack(tmp_path / "a.yml", [1, 2, 3])
+    stat = os.stat(tmp_path / "a.yml")
+    os.utime(tmp_path / "a.yml", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert [r.id for r in scanner.load()] == [1, 2, 3] and scanner.reloaded
+
+    _write_pack(tmp_path / "b.yml", [4])
+    assert [r.id for r in scanner.load()] == [1, 2, 3, 4] and scanner.reloaded
+
+    os.remove(tmp_path / "b.yml")
+    assert [r.id for r in scanner.load()] == [1, 2, 3] and scanner.reloaded
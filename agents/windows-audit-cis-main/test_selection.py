@@ -0,0 +1,48 @@
+from levels import UNKNOWN, annotated_levels, rule_level
+from selection import RuleIndex, split_selectors
+
+
+def test_rule_level_from_comments():
+    text = "# 2.3.1 (L1) Ensure a\n  # 2.3.2 (L2) Ensure b\n# 2.3.3 Ensure c\n"
+    levels = annotated_levels(text)
+    assert levels == {"2.3.1": "L1", "2.3.2": "L2"}
+    assert rule_level([{"cis": ["2.3.2"]}], levels) == "L2"
+    assert rule_level([{"cis": ["2.3.3"]}], levels) == ""
+    assert rule_level(None, levels) == ""
+
+
+def test_selectors(bundled_rules):
+    index = RuleIndex(bundled_rules)
+    ids = lambda rules: [r.id for r in rules]
+    first = bundled_rules[0]
+
+    assert ids(index.select()) == ids(bundled_rules)
+    assert ids(index.select([str(first.id)])) == [first.id]
+    assert ids(index.select(["2.3.*"])) == ids(index.select(["cis:2.3.*"]))
+    assert all(
+        any(str(c).startswith("2.3.") for e in r.compliance if isinstance(e, dict) for c in e.get("cis") or [])
+        for r in index.select(["2.3.*"])
+    )
+    assert index.select(["no-such-framework"]) == []
+
+
+def test_level_selectors_leave_unannotated_checks_to_unknown(bundled_rules):
+    index = RuleIndex(bundled_rules)
+    ids = lambda rules: {r.id for r in rules}
+    l1 = ids(index.select(["L1"]))
+    l2 = ids(index.select(["level:l2"]))
+    unknown = ids(index.select([UNKNOWN]))
+
+    assert l1 and l2 and unknown
+    assert {r.level for r in bundled_rules if r.id in l1} == {"L1"}
+    assert {r.level for r in bundled_rules if r.id in unknown} == {""}
+    assert not (l1 & unknown) and not (l2 & unknown) and not (l1 & l2)
+    assert len(l1) + len(l2) + len(unknown) == len(bundled_rules)
+    # backend/test_rule_packs.py pins the same counts for compiled packs
+    assert (len(l1), len(l2), len(unknown)) == (149, 68, 926)
+    assert ids(index.select(["level:unknown"])) == unknown
+    assert ids(index.select([], ["unknown"])) == l1 | l2
+
+
+def test_split_selectors():
+    assert split_selectors(["L1, 2.3.*", "", "pci_dss:8.*,"]) == ["L1", "2.3.*", "pci_dss:8.*"]
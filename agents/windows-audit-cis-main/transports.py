@@ -0,0 +1,210 @@
+# File: transports.py
+#
+# How probes reach a host. executor.execute_subrule(sub_rule, transport)
+# reads the registry, checks files and runs commands through a transport
+# instead of on this machine, so one collector can scan many targets.
+#
+# A transport (subclass of Transport) provides:
+#   is_windows                          registry probes are supported
+#   winreg                              OpenKey / QueryValueEx / QueryInfoKey + HKEY_* constants
+#   path_exists(path), path_stat(path)  file probes
+#   check_output(cmd, **kwargs)         cmd: probes; raise CalledProcessError on failure
+#   close()
+#
+# Built in: "local" (this machine) and "mock" / "loopback" (a simulated host
+# from a JSON fixture, as written by bench_scanner.py --write-fixture).
+# Further transports are added with register_transport(). Every target must
+# name its transport: there is no default, so a target that leaves it out is
+# never scanned as this machine by mistake.
+
+import abc
+import json
+import os
+import time
+from typing import Dict
+
+import executor
+
+class Transport(abc.ABC):
+    is_windows = False
+    winreg = None
+
+    def __init__(self, name: str = ""):
+        self.name = name
+
+    @abc.abstractmethod
+    def path_exists(self, path: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def path_stat(self, path: str):
+        ...
+
+    @abc.abstractmethod
+    def check_output(self, cmd: str, **kwargs) -> str:
+        ...
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+###################################################
+# Local
+###################################################
+
+class LocalTransport(Transport):
+    """This machine, through the same access points a plain scan uses."""
+
+    def __init__(self, name: str = "localhost"):
+        super().__init__(name)
+        self.is_windows = executor.IS_WINDOWS
+        self.winreg = getattr(executor, "winreg", None)
+
+    def path_exists(self, path):
+        return executor.path_exists(path)
+
+    def path_stat(self, path):
+        return executor.path_stat(path)
+
+    def check_output(self, cmd, **kwargs):
+        return executor.check_output(cmd, **kwargs)
+
+###################################################
+# Mock / loopback
+###################################################
+
+class _MockKey:
+    def __init__(self, values):
+        self.values = values
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class MockWinreg:
+    """Just enough of the winreg module for executor.read_registry."""
+    HKEY_LOCAL_MACHINE = "hklm"
+    HKEY_CURRENT_USER = "hkcu"
+    HKEY_USERS = "hku"
+    HKEY_CLASSES_ROOT = "hkcr"
+    REG_SZ = 1
+
+    def __init__(self, keys, latency=0.0):
+        self.keys = keys          # {"hklm\\path\\lowercased": {"valuename": "value"}}
+        self.latency = latency
+
+    def OpenKey(self, hive, path):
+        if self.latency:
+            time.sleep(self.latency)
+        values = self.keys.get(f"{hive}\\{path.lower()}")
+        if values is None:
+            raise FileNotFoundError(2, "The system cannot find the file specified")
+        return _MockKey(values)
+
+    def QueryInfoKey(self, key):
+        # (subkeys, values, last write) - the simulated registry never changes
+        return 0, len(key.values), 0
+
+    def QueryValueEx(self, key, name):
+        value = key.values.get((name or "").lower())
+        if value is None:
+            raise FileNotFoundError(2, "The system cannot find the file specified")
+        return value, self.REG_SZ
+
+class MockTransport(Transport):
+    """Registry, files and command outputs of a simulated Windows machine."""
+    is_windows = True
+
+    def __init__(self, name: str = "mock", registry=None, files=None, commands=None,
+                 reg_latency=0.0, file_latency=0.0, cmd_latency=0.0):
+        super().__init__(name)
+        self.registry = registry or {}
+        self.files = set(f.lower() for f in (files or []))
+        self.commands = commands or {}
+        self.reg_latency = reg_latency
+        self.file_latency = file_latency
+        self.cmd_latency = cmd_latency
+
+    @classmethod
+    def from_fixture(cls, path, name: str = "mock", **latency):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(name, data.get("registry"), data.get("files"), data.get("commands"), **latency)
+
+    def to_fixture(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "registry": self.registry,
+                "files": sorted(self.files),
+                "commands": self.commands,
+            }, f, indent=1)
+
+    @property
+    def winreg(self):
+        return MockWinreg(self.registry, self.reg_latency)
+
+    def path_exists(self, path):
+        if self.file_latency:
+            time.sleep(self.file_latency)
+        return path.lower() in self.files
+
+    def path_stat(self, path):
+        if self.file_latency:
+            time.sleep(self.file_latency)
+        if path.lower() not in self.files:
+            raise FileNotFoundError(2, "No such file or directory", path)
+        return os.stat_result((0o100644, 0, 0, 1, 0, 0, 0, 0, 0, 0))
+
+    def check_output(self, cmd, **kwargs):
+        if self.cmd_latency:
+            time.sleep(self.cmd_latency)
+        return self.commands.get(cmd, "")
+
+def _open_mock(target: dict) -> MockTransport:
+    latency = {
+        "reg_latency": target.get("reg_latency_ms", 0) / 1000,
+        "file_latency": target.get("file_latency_ms", 0) / 1000,
+        "cmd_latency": target.get("cmd_latency_ms", 0) / 1000,
+    }
+    if target.get("fixture"):
+        return MockTransport.from_fixture(target["fixture"], target["name"], **latency)
+    return MockTransport(target["name"], target.get("registry"), target.get("files"),
+                         target.get("commands"), **latency)
+
+###################################################
+# Registry of transports
+###################################################
+
+TRANSPORTS: Dict[str, object] = {
+    "local": lambda target: LocalTransport(target.get("name") or "localhost"),
+    "mock": _open_mock,
+    "loopback": _open_mock,
+}
+
+def register_transport(name: str, opener):
+    """`opener(target_dict) -> Transport` for inventory entries with "transport": name."""
+    TRANSPORTS[name] = opener
+
+def transport_opener(target: dict):
+    """
+    The opener registered for the target's "transport"; raises ValueError if
+    the target names no transport or one that is not registered.
+    """
+    kind = target.get("transport")
+    if not kind:
+        raise ValueError(f"No transport for target {target.get('name')!r}")
+    opener = TRANSPORTS.get(kind)
+    if opener is None:
+        raise ValueError(f"Unknown transport '{kind}' for target {target.get('name')!r}")
+    return opener
+
+def open_transport(target: dict) -> Transport:
+    return transport_opener(target)(target)
@@ -1,19 +1,50 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-import os, random, datetime
+import os, random, datetime, time
 # from database_models import System, ScanResult
 # from sqlalchemy.orm import Session
-from database import SessionLocal
-from database_models import Agent, ScanResult
+from database import SessionLocal, engine
+from database_models import Agent, ScanResult, UploadReceipt
 # from database_init import SessionLocal
+from ingest import persist_check_details, status_digest, idempotency_key
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from scan_diff import diff_scans, latest_two_scan_ids
+from export import stream_export, parse_time
+from metrics import (
+    instrument_app, instrument_engine, render_metrics,
+    ingest_rows_written, cache_hit, cache_miss
+)
+from fleet_matrix import matrix
+from rule_packs import RULE_PACK_DIR, get_pack, list_packs
+from retention import start_retention_scheduler, score_history, check_history
+from search import search_checks
+from trends import score_trends, BUCKETS, MAX_POINTS
+from events import bus, sse_stream, publish_agent_registered, publish_scan, publish_regressions
+from scoring import (
+    ScoringPolicy, active_policy, set_active_policy, fleet_scores,
+    scan_severities, highest_severity
+)
 import secrets
 
 app = Flask(__name__)
 CORS(app)
+instrument_app(app)
+instrument_engine(engine, SessionLocal)
 
 from database_init import init_db
 init_db()
 
+if not os.path.isdir(RULE_PACK_DIR):
+    print(f"RULE PACKS: {RULE_PACK_DIR} not found, no packs are served "
+          "(set TRACE_SCANNER_DIR or TRACE_RULE_PACK_DIR)")
+
+# Retention runs on one scheduler per deployment: started by `python app.py`
+# below, or at import when TRACE_RETENTION_SCHEDULER=1 (set it for exactly
+# one WSGI worker / process, or run `python retention.py` from cron instead).
+if os.environ.get("TRACE_RETENTION_SCHEDULER") == "1":
+    start_retention_scheduler()
+
 # ------------------ AGENT REGISTER ------------------
 
 @app.route("/api/agents/register", methods=["POST"])
@@ -48,6 +79,7 @@ def register_agent():
 
         db.add(agent)
         db.commit()
+        publish_agent_registered(agent)
 
         return jsonify({
             "agent_token": token
@@ -79,24 +111,40 @@ def get_dashboard_overview():
         return jsonify({"error": "Unauthorized"}), 403
 
     db = SessionLocal()
+    try:
+        total_agents = db.query(func.count(Agent.id)).scalar()
+
+        # Each agent counts once, with its latest scan. Scores from different
+        # rule pack versions are not comparable, so they are also broken down
+        # per digest; ?digest= restricts the totals to one of them.
+        latest = select(func.max(ScanResult.id)).group_by(ScanResult.agent_id)
+        rows = db.query(
+            ScanResult.rule_pack_digest,
+            func.count(ScanResult.id),
+            func.sum(ScanResult.score_percent),
+            func.sum(ScanResult.failed_count)
+        ).filter(ScanResult.id.in_(latest)).group_by(ScanResult.rule_pack_digest).all()
+    finally:
+        db.close()
 
-    agents = db.query(Agent).all()
-    scans = db.query(ScanResult).all()
-
-    total_agents = len(agents)
-    total_issues = sum(s.failed_count for s in scans)
-
-    avg_score = (
-        sum(s.score_percent for s in scans) / len(scans)
-        if scans else 100
-    )
-
-    db.close()
+    digest = request.args.get("digest")
+    by_pack = [
+        {"rulePackDigest": pack, "agents": n,
+         "securityScore": round((score or 0) / n, 2), "totalIssues": issues or 0}
+        for pack, n, score, issues in rows
+    ]
+    selected = [r for r in rows if digest is None or r[0] == digest]
+    scanned = sum(n for _, n, _, _ in selected)
+    score_sum = sum(score or 0 for _, _, score, _ in selected)
 
     return jsonify({
-        "securityScore": round(avg_score, 2),
+        "securityScore": round(score_sum / scanned, 2) if scanned else 100,
         "totalAgents": total_agents,
-        "totalIssues": total_issues
+        "scannedAgents": scanned,
+        "totalIssues": sum(issues or 0 for _, _, _, issues in selected),
+        "rulePackDigest": digest if digest is not None else (
+            selected[0][0] if len(selected) == 1 else None),
+        "byRulePack": by_pack
     })
     
 # ------------------ VULNERBILITIES ------------------
@@ -114,12 +162,17 @@ def get_vulnerabilities():
         ScanResult.agent_id == agent.id
     ).all()
 
+    # Severity of a scan is that of its worst failing check under the scoring policy
+    severities = scan_severities(db, [s.id for s in scans if s.failed_count > 0], active_policy())
+
     vulns = []
     for s in scans:
         if s.failed_count > 0:
+            by_severity = severities.get(s.id, {})
             vulns.append({
                 "system": agent.name,
-                "severity": "High" if s.failed_count > 3 else "Medium",
+                "severity": highest_severity(by_severity) or "Medium",
+                "failingBySeverity": by_severity,
                 "description": f"{s.failed_count} CIS checks failed",
                 "status": "Open"
             })
@@ -143,7 +196,7 @@ def compliance_report():
 
     for s in scans:
         report.append({
-            "system": s.agent.system_name,
+            "system": s.agent.name,
             "benchmark": f"CIS {s.benchmark_name}",
             "status": "Fail" if s.failed_count > 0 else "Pass",
             "score": s.score_percent
@@ -163,39 +216,540 @@ def get_remediation():
     })
     
 # ------------------------------- UPLOAD SCAN -------------------------------
+
+# Agents in daemon mode follow the "next_scan_in" hint. Each agent gets a fixed
+# slot (golden-ratio offset of its id) inside the interval, which spreads the
+# fleet's uploads evenly instead of letting them bunch on the same minute.
+SCAN_INTERVAL = int(os.environ.get("TRACE_SCAN_INTERVAL", 3600))
+
+def next_scan_hint(agent_id, now=None):
+    now = time.time() if now is None else now
+    slot = (agent_id * 0.6180339887 % 1) * SCAN_INTERVAL
+    wait = (slot - now) % SCAN_INTERVAL
+    if wait < SCAN_INTERVAL / 2:
+        wait += SCAN_INTERVAL
+    return round(wait)
     
+def publish_scan_events(db, agent, scan):
+    """Live 'scan' event, plus 'regression' vs the previous scan when anyone listens."""
+    try:
+        if not bus.has_subscribers():
+            publish_scan(agent, scan)
+            return
+        previous = None
+        ids = latest_two_scan_ids(db, agent.id)
+        if len(ids) == 2 and ids[1] == scan.id:
+            previous = db.get(ScanResult, ids[0])
+        publish_scan(agent, scan, previous)
+        if previous is not None:
+            diff = diff_scans(db, previous, scan)
+            if not diff["rulePackChanged"]:
+                publish_regressions(agent, scan, diff["newlyFailing"])
+    except Exception as e:
+        print("EVENT PUBLISH ERROR:", e)
+
+UPLOAD_MESSAGES = {
+    "created": "Scan uploaded successfully",
+    "unchanged": "Scan unchanged since the last upload, last seen updated",
+}
+
+# Uploads accepted per /api/upload/batch request (collector mode)
+MAX_BATCH_UPLOADS = int(os.environ.get("TRACE_MAX_BATCH_UPLOADS", 50))
+
+def receipt_body(receipt, scan, agent_id, duplicate=False):
+    return {
+        "message": "Duplicate upload, already stored" if duplicate else UPLOAD_MESSAGES[receipt.outcome],
+        "scan_id": receipt.scan_id,
+        "outcome": receipt.outcome,
+        "duplicate": duplicate,
+        "last_seen": scan.last_seen.isoformat() if scan is not None and scan.last_seen else None,
+        "next_scan_in": next_scan_hint(agent_id)
+    }
+
+def find_receipt(db, agent_id, key):
+    return db.query(UploadReceipt).filter(
+        UploadReceipt.agent_id == agent_id, UploadReceipt.idempotency_key == key
+    ).first()
+
+def replay_receipt(db, receipt, content_hash, agent_id):
+    """(body, status) for an upload whose key already has a receipt."""
+    if receipt.content_hash and receipt.content_hash != content_hash:
+        return {"error": "Idempotency key already used for a different upload"}, 409
+    return receipt_body(receipt, db.get(ScanResult, receipt.scan_id), agent_id, duplicate=True), 200
+
+def store_upload(db, agent, data, explicit_key=None):
+    """
+    Stores one upload payload for `agent` and commits. Returns (receipt
+    body, status): a retry (same idempotency key and content hash) gets the
+    original receipt back, a key reused for different content a 409.
+    """
+    agent_id = agent.id
+    result = data.get("results", {})
+    checks = result.get("checks", [])
+    rule_pack_digest = data.get("rule_pack_digest") or result.get("rule_pack_digest")
+    digest = status_digest(checks)
+    content_hash = str(data.get("content_hash") or digest)[:64]
+    key = idempotency_key(
+        explicit_key or data.get("idempotency_key"),
+        content_hash,
+        result.get("scan_time") or data.get("timestamp")
+    )
+
+    # A retry of an upload that was already accepted gets the same receipt
+    receipt = find_receipt(db, agent_id, key)
+    if receipt:
+        return replay_receipt(db, receipt, content_hash, agent_id)
+
+    latest = db.query(ScanResult).filter(ScanResult.agent_id == agent_id).order_by(
+        ScanResult.scan_time.desc(), ScanResult.id.desc()
+    ).first()
+
+    rows = 0
+    if (latest is not None and latest.status_digest == digest
+            and latest.rule_pack_digest == rule_pack_digest):
+        # Same results as the previous scan: keep one row, note when it was seen again
+        scan, outcome = latest, "unchanged"
+        scan.last_seen = datetime.datetime.utcnow()
+        scan.seen_count = (scan.seen_count or 1) + 1
+    else:
+        # Extract real values from CIS report
+        # (report.json from main.py uses "passed"/"failed")
+        scan, outcome = ScanResult(
+            agent_id=agent_id,
+            benchmark_name="CIS Benchmark",
+            score_percent=result.get("score_percent", 75),
+            passed_count=result.get("passed_count", result.get("passed", 10)),
+            failed_count=result.get("failed_count", result.get("failed", 5)),
+            status_digest=digest,
+            rule_pack_digest=rule_pack_digest
+        ), "created"
+        db.add(scan)
+        db.flush()
+        rows = persist_check_details(db, scan, checks)
+
+    receipt = UploadReceipt(agent_id=agent_id, idempotency_key=key, scan_id=scan.id,
+                            outcome=outcome, content_hash=content_hash)
+    db.add(receipt)
+    try:
+        db.commit()
+    except IntegrityError:
+        # The same upload arrived concurrently and was committed first
+        db.rollback()
+        return replay_receipt(db, find_receipt(db, agent_id, key), content_hash, agent_id)
+
+    if outcome == "created":
+        ingest_rows_written.observe(rows)
+        matrix.update(agent_id, scan.id, rule_pack_digest, checks)
+        publish_scan_events(db, agent, scan)
+    return receipt_body(receipt, scan, agent_id), 200
+
 @app.route("/api/upload", methods=["POST"])
 def upload_scan():
     token = request.headers.get("Authorization", "").replace("Bearer ", "")
     data = request.json
 
     db = SessionLocal()
+    try:
+        agent = db.query(Agent).filter(Agent.agent_token == token).first()
+        if not agent:
+            return jsonify({"error": "Invalid agent token"}), 401
+        body, status = store_upload(db, agent, data, request.headers.get("Idempotency-Key"))
+        return jsonify(body), status
+    finally:
+        db.close()
 
-    agent = db.query(Agent).filter(Agent.agent_token == token).first()
-    if not agent:
-        return jsonify({"error": "Invalid agent token"}), 401
+@app.route("/api/upload/batch", methods=["POST"])
+def upload_scan_batch():
+    """
+    Several uploads in one request, each authenticated by its own
+    "agent_token" (a collector uploading for many targets). Every item is
+    stored in its own transaction; receipts come back in request order.
+    """
+    uploads = (request.get_json(silent=True) or {}).get("uploads")
+    if not isinstance(uploads, list):
+        return jsonify({"error": "'uploads' must be a list"}), 400
+    if len(uploads) > MAX_BATCH_UPLOADS:
+        return jsonify({"error": f"at most {MAX_BATCH_UPLOADS} uploads per batch"}), 413
 
-    result = data.get("results", {})
+    db = SessionLocal()
+    try:
+        tokens = {u.get("agent_token") for u in uploads if isinstance(u, dict)}
+        agents = {
+            a.agent_token: a
+            for a in db.query(Agent).filter(Agent.agent_token.in_([t for t in tokens if t]))
+        }
+        receipts = []
+        for i, item in enumerate(uploads):
+            agent = agents.get(item.get("agent_token")) if isinstance(item, dict) else None
+            if agent is None:
+                receipts.append({"index": i, "error": "Invalid agent token"})
+                continue
+            try:
+                body, _ = store_upload(db, agent, item)
+                receipts.append(dict(body, index=i))
+            except Exception as e:
+                db.rollback()
+                print("BATCH UPLOAD ERROR:", e)
+                receipts.append({"index": i, "error": "Upload could not be stored"})
+        return jsonify({"receipts": receipts})
+    finally:
+        db.close()
+
+# ------------------------------- HISTORY -------------------------------
 
-    # Extract real values from CIS report
-    score = result.get("score_percent", 75)
-    passed = result.get("passed_count", 10)
-    failed = result.get("failed_count", 5)
-
-    scan = ScanResult(
-        agent_id=agent.id,
-        benchmark_name="CIS Benchmark",
-        score_percent=score,
-        passed_count=passed,
-        failed_count=failed
+@app.route("/api/agents/<int:agent_id>/history", methods=["GET"])
+def agent_history(agent_id):
+    system_name = request.headers.get("X-System") or request.args.get("system")
+
+    if not system_name or not is_admin(system_name):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    period = request.args.get("period", "day")
+    if period not in ("day", "week"):
+        return jsonify({"error": "period must be 'day' or 'week'"}), 400
+
+    db = SessionLocal()
+    try:
+        cis_id = request.args.get("cis")
+        if cis_id:
+            return jsonify(check_history(db, agent_id, cis_id, period))
+        return jsonify(score_history(db, agent_id, period))
+    finally:
+        db.close()
+
+# ------------------------------- SCAN DIFF -------------------------------
+
+@app.route("/api/agents/<int:agent_id>/diff", methods=["GET"])
+def agent_scan_diff(agent_id):
+    system_name = request.headers.get("X-System") or request.args.get("system")
+
+    if not system_name or not is_admin(system_name):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    db = SessionLocal()
+    try:
+        from_id = request.args.get("from", type=int)
+        to_id = request.args.get("to", type=int)
+        if from_id is None and to_id is None:
+            ids = latest_two_scan_ids(db, agent_id)
+            if len(ids) < 2:
+                return jsonify({"error": "agent has fewer than two scans"}), 404
+            from_id, to_id = ids
+        elif from_id is None or to_id is None:
+            return jsonify({"error": "pass both 'from' and 'to' scan ids, or neither"}), 400
+
+        scans = {
+            s.id: s for s in db.query(ScanResult).filter(
+                ScanResult.agent_id == agent_id,
+                ScanResult.id.in_([from_id, to_id])
+            )
+        }
+        if from_id not in scans or to_id not in scans:
+            return jsonify({"error": "scan not found for this agent"}), 404
+
+        return jsonify(diff_scans(db, scans[from_id], scans[to_id]))
+    finally:
+        db.close()
+
+# ------------------------------- LIVE EVENTS -------------------------------
+
+@app.route("/api/events", methods=["GET"])
+def events():
+    # EventSource cannot set headers, so ?system= is the usual way in
+    system_name = request.headers.get("X-System") or request.args.get("system")
+
+    if not system_name or not is_admin(system_name):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    sub = bus.subscribe(last_event_id)
+    return Response(
+        sse_stream(bus, sub),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-    db.add(scan)
-    db.commit()
-    db.close()
+# ------------------------------- TRENDS -------------------------------
+
+@app.route("/api/trends", methods=["GET"])
+def trends():
+    system_name = request.headers.get("X-System") or request.args.get("system")
+
+    if not system_name or not is_admin(system_name):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    bucket = request.args.get("bucket", "day")
+    if bucket not in BUCKETS:
+        return jsonify({"error": "bucket must be 'hour', 'day' or 'week'"}), 400
+
+    points = request.args.get("points", type=int)
+    if points is not None and not 1 <= points <= MAX_POINTS:
+        return jsonify({"error": f"points must be between 1 and {MAX_POINTS}"}), 400
+
+    try:
+        since = parse_time(request.args.get("since"))
+        until = parse_time(request.args.get("until"))
+        # ?agent=3&agent=7 or ?agent=3,7
+        agent_ids = [int(a) for v in request.args.getlist("agent") for a in v.split(",") if a.strip()]
+    except ValueError:
+        return jsonify({"error": "since/until must be ISO-8601 and agent a list of ids"}), 400
+    if since and until and since >= until:
+        return jsonify({"error": "since must be before until"}), 400
+
+    db = SessionLocal()
+    try:
+        return jsonify(score_trends(
+            db, since=since, until=until, bucket=bucket, points=points,
+            agent_ids=agent_ids, digest=request.args.get("digest")
+        ))
+    finally:
+        db.close()
+
+# ------------------------------- SEARCH -------------------------------
+
+@app.route("/api/search", methods=["GET"])
+def search():
+    system_name = request.headers.get("X-System") or request.args.get("system")
+
+    if not system_name or not is_admin(system_name):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "q is required"}), 400
+
+    scope = request.args.get("scope", "latest")
+    if scope not in ("latest", "all"):
+        return jsonify({"error": "scope must be 'latest' or 'all'"}), 400
+
+    page = request.args.get("page", 1, type=int)
+    per_page = request.args.get("per_page", 25, type=int)
+
+    db = SessionLocal()
+    try:
+        result = search_checks(
+            db, q, page=page, per_page=per_page, scope=scope,
+            agent_id=request.args.get("agent_id", type=int),
+            status=request.args.get("status")
+        )
+        result.update({"query": q, "scope": scope, "page": max(1, page), "perPage": per_page})
+        return jsonify(result)
+    finally:
+        db.close()
+
+# ------------------------------- STREAMING EXPORT -------------------------------
+
+EXPORT_MIMETYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _export(kind):
+    system_name = request.headers.get("X-System") or request.args.get("system")
+
+    if not system_name or not is_admin(system_name):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    fmt = request.args.get("format", "ndjson").lower()
+    if fmt not in EXPORT_MIMETYPES:
+        return jsonify({"error": "format must be 'csv' or 'ndjson'"}), 400
+
+    try:
+        filters = {
+            "agent": request.args.get("agent"),
+            "digest": request.args.get("digest"),
+            "status": request.args.get("status"),
+            "since": parse_time(request.args.get("since")),
+            "until": parse_time(request.args.get("until")),
+        }
+    except ValueError:
+        return jsonify({"error": "since/until must be ISO-8601"}), 400
+
+    return Response(
+        stream_export(kind, fmt, filters),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename=trace-{kind}.{fmt}"}
+    )
+
+
+@app.route("/api/export/compliance", methods=["GET"])
+def export_compliance():
+    return _export("scans")
+
+
+@app.route("/api/export/checks", methods=["GET"])
+def export_checks():
+    return _export("checks")
+
+# ------------------------------- FLEET MATRIX -------------------------------
+
+def _fleet_db():
+    """Admin check + session with the failure matrix loaded, or (None, error response)."""
+    system_name = request.headers.get("X-System") or request.args.get("system")
+    if not system_name or not is_admin(system_name):
+        return None, (jsonify({"error": "Unauthorized"}), 403)
+
+    db = SessionLocal()
+    if matrix.loaded:
+        cache_hit("fleet_matrix")
+    else:
+        cache_miss("fleet_matrix")
+        matrix.ensure_loaded(db)
+    return db, None
+
+
+@app.route("/api/fleet/cis/<cis_id>/failing-hosts", methods=["GET"])
+def fleet_failing_hosts(cis_id):
+    db, error = _fleet_db()
+    if error:
+        return error
+    try:
+        agent_ids = matrix.failing_agents(cis_id)
+        names = dict(
+            db.query(Agent.id, Agent.name).filter(Agent.id.in_(agent_ids)).all()
+        ) if agent_ids else {}
+        return jsonify({
+            "cisId": cis_id,
+            "count": len(agent_ids),
+            "hosts": [{"agentId": a, "system": names.get(a)} for a in agent_ids]
+        })
+    finally:
+        db.close()
+
+
+@app.route("/api/fleet/agents/<int:agent_id>/failing-checks", methods=["GET"])
+def fleet_failing_checks(agent_id):
+    db, error = _fleet_db()
+    if error:
+        return error
+    try:
+        checks = matrix.failing_checks(agent_id)
+        return jsonify({
+            "agentId": agent_id,
+            "count": len(checks),
+            "checks": [
+                {"checkId": check_id, "cisId": cis_id, "title": title, "rulePackDigest": digest}
+                for check_id, cis_id, title, digest in checks
+            ]
+        })
+    finally:
+        db.close()
+
+
+@app.route("/api/fleet/top-failing", methods=["GET"])
+def fleet_top_failing():
+    db, error = _fleet_db()
+    if error:
+        return error
+    try:
+        limit = max(1, min(request.args.get("limit", 20, type=int), 500))
+        digest = request.args.get("digest")
+        return jsonify({
+            "agents": matrix.agent_count(),
+            "checks": [
+                {"checkId": check_id, "cisId": cis_id, "title": title,
+                 "rulePackDigest": check_digest, "failingHosts": n}
+                for check_id, cis_id, title, check_digest, n in matrix.top_failing(limit, digest)
+            ]
+        })
+    finally:
+        db.close()
+
+# ------------------------------- SCORING -------------------------------
+
+def _policy_body():
+    spec = request.get_json(silent=True)
+    if spec is None:
+        raise ValueError("a JSON scoring policy is required")
+    return spec
+
+
+def _scores_response(db, policy):
+    result = fleet_scores(matrix, policy)
+    agent_ids = [a["agentId"] for a in result["agents"]]
+    names = dict(
+        db.query(Agent.id, Agent.name).filter(Agent.id.in_(agent_ids)).all()
+    ) if agent_ids else {}
+    for a in result["agents"]:
+        a["system"] = names.get(a["agentId"])
+    return jsonify(result)
+
+
+@app.route("/api/fleet/scores", methods=["GET", "POST"])
+def fleet_weighted_scores():
+    """Latest weighted score of every agent; POST a policy to preview it without activating."""
+    db, error = _fleet_db()
+    if error:
+        return error
+    try:
+        if request.method == "POST":
+            try:
+                policy = ScoringPolicy(_policy_body())
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        else:
+            policy = active_policy()
+        return _scores_response(db, policy)
+    finally:
+        db.close()
+
+
+@app.route("/api/scoring/policy", methods=["GET", "PUT"])
+def scoring_policy():
+    """Active scoring policy; PUT replaces it and returns the fleet re-scored with it."""
+    db, error = _fleet_db()
+    if error:
+        return error
+    try:
+        if request.method == "GET":
+            return jsonify(active_policy().to_dict())
+        try:
+            policy = set_active_policy(_policy_body())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return _scores_response(db, policy)
+    finally:
+        db.close()
+
+# ------------------------------- RULE PACKS -------------------------------
+
+@app.route("/api/rule-packs", methods=["GET"])
+def rule_pack_index():
+    return jsonify(list_packs())
+
+
+@app.route("/api/rule-packs/<name>", methods=["GET"])
+def rule_pack(name):
+    pack = get_pack(name)
+    if not pack:
+        return jsonify({"error": "Unknown rule pack"}), 404
+
+    if request.if_none_match.contains(pack.digest):
+        response = Response(status=304)
+    elif "gzip" in request.accept_encodings:
+        response = Response(pack.gzip_body, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(pack.body, mimetype="application/json")
+
+    response.set_etag(pack.digest)
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["X-Rule-Pack-Digest"] = pack.digest
+    return response
+
+# ------------------------------- METRICS -------------------------------
 
-    return jsonify({"message": "Scan uploaded successfully"})
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
+    # The debug reloader runs this file in a watcher and a serving process;
+    # only the serving one (WERKZEUG_RUN_MAIN) schedules retention
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true" and os.environ.get("TRACE_RETENTION_SCHEDULER") != "1":
+        start_retention_scheduler()
     app.run(host="0.0.0.0", port=8000, debug=True)
\ No newline at end of file
@@ -0,0 +1,30 @@
+import re
+
+# ---------------- CIS PROFILE LEVELS ----------------
+# SCA policy files only annotate levels in comments
+# ("# 2.3.7.6 (L2) Ensure ..."), and many checks have no annotation at all.
+# Their level is "" in compiled packs and UNKNOWN for scoring, as in the
+# scanner's selectors. The scanner parses the same comments for YAML it
+# loads itself (agents/windows-audit-cis-main/levels.py); the two must
+# agree, or a pack and its YAML get different levels.
+
+LEVEL_COMMENT_RE = re.compile(r"^\s*#\s*([0-9][0-9.]*)\s*\((L[12])\)", re.MULTILINE)
+
+LEVELS = ("L1", "L2")
+UNKNOWN = "unknown"
+
+
+def annotated_levels(text):
+    """{cis id: level} from the level comments of one policy file's source."""
+    return dict(LEVEL_COMMENT_RE.findall(text))
+
+
+def rule_level(compliance, levels):
+    """Level of the first CIS id in `compliance` that has a level annotation, else ""."""
+    for entry in compliance or []:
+        if isinstance(entry, dict):
+            for cis_id in entry.get("cis") or []:
+                level = levels.get(str(cis_id))
+                if level:
+                    return level
+    return ""
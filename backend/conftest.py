@@ -0,0 +1,84 @@
+import itertools
+import os
+import tempfile
+
+import pytest
+
+# database.py binds its engine at import: point it at a throwaway database first
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="trace-tests-"), "trace.db")
+
+
+@pytest.fixture
+def db():
+    """A session on an emptied database."""
+    import app  # noqa: F401  (creates the schema)
+    from database import SessionLocal
+    from database_models import Base
+
+    session = SessionLocal()
+    for table in reversed(Base.metadata.sorted_tables):
+        session.execute(table.delete())
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    import app
+    return app.app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    """register(name, role="AGENT") -> agent token."""
+    def register(name, role="AGENT"):
+        r = client.post("/api/agents/register", json={
+            "system_name": name, "os_name": "Windows", "ip_address": "10.0.0.1", "role": role
+        })
+        assert r.status_code == 200
+        return r.get_json()["agent_token"]
+    return register
+
+
+@pytest.fixture
+def admin(register):
+    """X-System headers of an admin system."""
+    register("admin-console", role="ADMIN")
+    return {"X-System": "admin-console"}
+
+
+@pytest.fixture
+def upload(client):
+    """upload(token, [(id, status[, details[, cis]])], **result fields) -> response."""
+    # every report gets its own scan_time, which the default idempotency key hashes
+    seconds = itertools.count()
+
+    def upload(token, checks, headers=None, **fields):
+        rows = []
+        for c in checks:
+            check_id, status = c[0], c[1]
+            rows.append({
+                "id": check_id, "title": f"Check {check_id}", "status": status,
+                "details": c[2] if len(c) > 2 else "",
+                "compliance": [{"cis": [c[3] if len(c) > 3 else f"1.{check_id}"]}],
+            })
+        passed = sum(1 for r in rows if r["status"] == "PASS")
+        result = {"scan_time": f"2026-01-01T00:00:{next(seconds):02d}",
+                  "passed": passed, "failed": len(rows) - passed,
+                  "score_percent": round(100 * passed / len(rows), 2) if rows else 100,
+                  "checks": rows}
+        result.update(fields)
+        return client.post("/api/upload", json={"results": result},
+                           headers=dict(headers or {}, Authorization=f"Bearer {token}"))
+    return upload
+
+
+@pytest.fixture
+def agent_id(db):
+    def agent_id(name):
+        from database_models import Agent
+        return db.query(Agent).filter(Agent.name == name).one().id
+    return agent_id
@@ -1,19 +1,50 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import inspect, text
+
+from database import engine, SessionLocal
 from database_models import Base
+from search import ensure_search_index
+
+
+def _column_ddl(column, dialect):
+    ddl = f"{column.name} {column.type.compile(dialect=dialect)}"
+    default = column.default
+    if default is not None and default.is_scalar:
+        ddl += f" DEFAULT {default.arg!r}"
+    return ddl
+
 
-DATABASE_URL = "sqlite:///trace.db"
+def upgrade_schema(bind=engine):
+    """
+    create_all() only creates missing tables. Columns and indexes added to
+    existing tables since a trace.db was created are added here; safe to
+    run on every start. Returns the statements it ran.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    statements = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                statements.append(
+                    f"ALTER TABLE {table.name} ADD COLUMN {_column_ddl(column, bind.dialect)}"
+                )
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+    with bind.begin() as conn:
+        for statement in statements:
+            print("SCHEMA UPGRADE:", statement)
+            conn.execute(text(statement))
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    return statements
 
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine
-)
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    ensure_search_index(engine)
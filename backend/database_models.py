@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Index, UniqueConstraint
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
@@ -33,7 +33,12 @@ class ScanResult(Base):
     score_percent = Column(Float)
     passed_count = Column(Integer)
     failed_count = Column(Integer)
+    status_digest = Column(String(64))  # sha256 over (check_id, status, details)
+    rule_pack_digest = Column(String(64))  # rule pack the agent scanned with
     scan_time = Column(DateTime, default=datetime.utcnow)
+    # Identical consecutive uploads are stored once: these track the repeats
+    last_seen = Column(DateTime, default=datetime.utcnow)
+    seen_count = Column(Integer, default=1)
 
     agent = relationship("Agent", back_populates="scan_results")
     check_details = relationship(
@@ -42,6 +47,34 @@ class ScanResult(Base):
         cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        Index("ix_scan_results_agent_time", "agent_id", "scan_time"),
+        # covers fleet-wide time-range aggregates (trends) without table reads
+        Index("ix_scan_results_time", "scan_time", "score_percent", "failed_count", "agent_id"),
+    )
+
+
+# ---------------- UPLOAD RECEIPT ----------------
+class UploadReceipt(Base):
+    """
+    One per accepted upload; a retried upload (same key and content hash)
+    gets the same receipt back.
+    """
+    __tablename__ = "upload_receipts"
+
+    id = Column(Integer, primary_key=True)
+    agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False)
+    idempotency_key = Column(String(128), nullable=False)
+    scan_id = Column(Integer, ForeignKey("scan_results.id"))
+    outcome = Column(String(16))        # "created" or "unchanged"
+    content_hash = Column(String(64))   # NULL on receipts stored before it was recorded
+    received_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("agent_id", "idempotency_key", name="uq_upload_receipt"),
+        Index("ix_upload_receipts_scan", "scan_id"),
+    )
+
 
 # ---------------- CHECK DETAIL ----------------
 class CheckDetail(Base):
@@ -49,10 +82,58 @@ class CheckDetail(Base):
 
     id = Column(Integer, primary_key=True)
     scan_id = Column(Integer, ForeignKey("scan_results.id"))
+    check_id = Column(Integer)      # rule id from the SCA policy file
     cis_id = Column(String(128))
     title = Column(String(256))
     status = Column(String(32))
+    details = Column(Text)
     remediation = Column(Text)
     compliance_tags = Column(String(256))
 
     scan_result = relationship("ScanResult", back_populates="check_details")
+
+    __table_args__ = (
+        Index("ix_check_details_scan_check", "scan_id", "check_id"),
+    )
+
+
+# ---------------- ROLLUPS (COMPACTED HISTORY) ----------------
+class ScanRollup(Base):
+    """Daily / weekly score summary per agent for scans past the retention window."""
+    __tablename__ = "scan_rollups"
+
+    id = Column(Integer, primary_key=True)
+    agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False)
+    # "" for scans without a digest: NULLs never collide in the unique constraint
+    rule_pack_digest = Column(String(64), nullable=False, default="")
+    period = Column(String(8), nullable=False)          # "day" or "week"
+    period_start = Column(DateTime, nullable=False)
+    scan_count = Column(Integer, default=0)
+    score_sum = Column(Float, default=0)
+    score_min = Column(Float)
+    score_max = Column(Float)
+    passed_sum = Column(Integer, default=0)
+    failed_sum = Column(Integer, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("agent_id", "rule_pack_digest", "period", "period_start", name="uq_scan_rollup"),
+    )
+
+
+class CheckRollup(Base):
+    """Daily / weekly failure counts per agent and CIS ID."""
+    __tablename__ = "check_rollups"
+
+    id = Column(Integer, primary_key=True)
+    agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False)
+    rule_pack_digest = Column(String(64), nullable=False, default="")
+    cis_id = Column(String(128), nullable=False)
+    period = Column(String(8), nullable=False)
+    period_start = Column(DateTime, nullable=False)
+    checked_count = Column(Integer, default=0)
+    fail_count = Column(Integer, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("agent_id", "rule_pack_digest", "cis_id", "period", "period_start",
+                         name="uq_check_rollup"),
+    )
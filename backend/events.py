@@ -0,0 +1,182 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from metrics import Counter, Gauge
+
+# ---------------- LIVE EVENTS (SERVER-SENT EVENTS) ----------------
+# In-process pub/sub between the ingest path and /api/events streams.
+# Every subscriber gets its own bounded queue; publishing never blocks, and
+# a subscriber whose queue is full (a slow or stalled client) is evicted
+# rather than slowing ingest down or growing memory. Evicted clients are
+# told so and can reconnect with Last-Event-ID to replay what they missed
+# from a short history ring.
+#
+# Events:
+#   reset       {}  replay impossible, refetch full state
+#   agent       {agentId, system, role}                     agent registered
+#   scan        {agentId, system, scanId, score, ...}       scan ingested
+#   regression  {agentId, scanId, count, checks: [...]}     checks newly failing
+
+SUBSCRIBER_BUFFER = int(os.environ.get("TRACE_EVENTS_BUFFER", 256))
+HISTORY_SIZE = int(os.environ.get("TRACE_EVENTS_HISTORY", 1024))
+HEARTBEAT_SECONDS = 15
+MAX_REGRESSION_CHECKS = 20     # checks listed per regression event
+
+events_published = Counter(
+    "trace_events_published_total", "Live events published by type", labels=("type",)
+)
+events_evicted = Counter(
+    "trace_events_subscribers_evicted_total", "SSE clients dropped for falling behind"
+)
+
+_EVICTED = object()
+
+
+class Subscriber:
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.evicted = False
+
+
+class EventBus:
+    def __init__(self, buffer_size=SUBSCRIBER_BUFFER, history_size=HISTORY_SIZE):
+        self.buffer_size = buffer_size
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.history = deque(maxlen=history_size)   # (id, frame)
+        self.ids = itertools.count(1)
+
+    def subscribe(self, last_event_id=None):
+        """
+        New subscriber. With `last_event_id` (a reconnect) the events it
+        missed are replayed, or a 'reset' event is queued when they are no
+        longer all in history or would not fit its buffer.
+        """
+        sub = Subscriber(self.buffer_size)
+        with self.lock:
+            if last_event_id is not None:
+                first = self.history[0][0] if self.history else None
+                newest = self.history[-1][0] if self.history else 0
+                missed = [frame for event_id, frame in self.history if event_id > last_event_id]
+                # ids restart with the process: an id from the future means a restart
+                complete = (
+                    last_event_id <= newest
+                    and (first is None or first <= last_event_id + 1)
+                )
+                if complete and len(missed) < self.buffer_size:
+                    for frame in missed:
+                        sub.queue.put_nowait(frame)
+                else:
+                    sub.queue.put_nowait(format_event(newest, "reset", {}))
+            self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self.lock:
+            self.subscribers.discard(sub)
+
+    def _offer(self, sub, frame):
+        try:
+            sub.queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            sub.evicted = True
+            # Make room for the marker so the stream can say goodbye
+            try:
+                sub.queue.get_nowait()
+            except queue.Empty:
+                pass
+            sub.queue.put_nowait(_EVICTED)
+            events_evicted.inc()
+            return False
+
+    def publish(self, event_type, data):
+        """Fan one event out to every subscriber without blocking."""
+        with self.lock:
+            event_id = next(self.ids)
+            frame = format_event(event_id, event_type, data)
+            self.history.append((event_id, frame))
+            for sub in list(self.subscribers):
+                if not self._offer(sub, frame):
+                    self.subscribers.discard(sub)
+        events_published.inc(event_type)
+        return event_id
+
+    def has_subscribers(self):
+        return bool(self.subscribers)
+
+    def subscriber_count(self):
+        return len(self.subscribers)
+
+
+def format_event(event_id, event_type, data):
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+def sse_stream(bus, sub, heartbeat=HEARTBEAT_SECONDS):
+    """Generator for a streaming Response; ends when the client is evicted or disconnects."""
+    try:
+        yield f"retry: 3000\n: connected {int(time.time())}\n\n"
+        while True:
+            try:
+                frame = sub.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                # Comment line: keeps proxies from timing out, surfaces dead sockets
+                yield ": keepalive\n\n"
+                continue
+            if frame is _EVICTED:
+                yield "event: evicted\ndata: {}\n\n"
+                return
+            yield frame
+    finally:
+        bus.unsubscribe(sub)
+
+
+bus = EventBus()
+
+Gauge("trace_events_subscribers", "Connected SSE clients", lambda: {(): bus.subscriber_count()})
+
+
+# ---------------- EVENT BUILDERS ----------------
+
+def publish_agent_registered(agent):
+    bus.publish("agent", {"agentId": agent.id, "system": agent.name, "role": agent.role})
+
+
+def publish_scan(agent, scan, previous=None):
+    bus.publish("scan", {
+        "agentId": agent.id,
+        "system": agent.name,
+        "scanId": scan.id,
+        "score": scan.score_percent,
+        "passed": scan.passed_count,
+        "failed": scan.failed_count,
+        "scoreDelta": (
+            round(scan.score_percent - previous.score_percent, 2)
+            if previous is not None and previous.score_percent is not None
+            and scan.score_percent is not None else None
+        ),
+        "rulePackDigest": scan.rule_pack_digest,
+        "scanTime": scan.scan_time.isoformat() if scan.scan_time else None,
+    })
+
+
+def publish_regressions(agent, scan, newly_failing):
+    if not newly_failing:
+        return
+    bus.publish("regression", {
+        "agentId": agent.id,
+        "system": agent.name,
+        "scanId": scan.id,
+        "count": len(newly_failing),
+        "checks": [
+            {"checkId": c["checkId"], "cisId": c["cisId"], "title": c["title"]}
+            for c in newly_failing[:MAX_REGRESSION_CHECKS]
+        ],
+    })
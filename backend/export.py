@@ -0,0 +1,142 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from database import SessionLocal
+from database_models import Agent, ScanResult, CheckDetail
+
+# ---------------- STREAMING EXPORT ----------------
+# Rows are pulled with yield_per + stream_results (a server-side cursor on
+# Postgres) and written out in small chunks, so memory stays flat however
+# many rows match.
+
+EXPORT_CHUNK_ROWS = 1000
+
+SCAN_FIELDS = ["scan_id", "system", "benchmark", "scan_time", "status", "score", "passed", "failed"]
+CHECK_FIELDS = ["scan_id", "system", "benchmark", "scan_time", "check_id", "cis_id",
+                "title", "status", "details", "remediation", "compliance_tags"]
+
+
+def parse_time(value):
+    """
+    ISO-8601 date or datetime from a query string, or None. Offsets are
+    converted to naive UTC, which is how scan times are stored.
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _filter_scans(q, filters):
+    if filters.get("agent"):
+        q = q.filter(Agent.name == filters["agent"])
+    if filters.get("digest"):
+        q = q.filter(ScanResult.rule_pack_digest == filters["digest"])
+    if filters.get("since"):
+        q = q.filter(ScanResult.scan_time >= filters["since"])
+    if filters.get("until"):
+        q = q.filter(ScanResult.scan_time < filters["until"])
+    return q
+
+
+def scan_rows(db, filters):
+    q = (
+        db.query(
+            ScanResult.id, Agent.name, ScanResult.benchmark_name, ScanResult.scan_time,
+            ScanResult.score_percent, ScanResult.passed_count, ScanResult.failed_count
+        )
+        .join(Agent, Agent.id == ScanResult.agent_id)
+    )
+    q = _filter_scans(q, filters)
+
+    status = (filters.get("status") or "").upper()
+    if status == "FAIL":
+        q = q.filter(ScanResult.failed_count > 0)
+    elif status == "PASS":
+        q = q.filter(ScanResult.failed_count == 0)
+
+    q = q.order_by(ScanResult.id).execution_options(stream_results=True).yield_per(EXPORT_CHUNK_ROWS)
+    for scan_id, system, benchmark, scan_time, score, passed, failed in q:
+        yield {
+            "scan_id": scan_id,
+            "system": system,
+            "benchmark": benchmark,
+            "scan_time": scan_time.isoformat() if scan_time else None,
+            "status": "Fail" if failed else "Pass",
+            "score": score,
+            "passed": passed,
+            "failed": failed,
+        }
+
+
+def check_rows(db, filters):
+    q = (
+        db.query(
+            CheckDetail.scan_id, Agent.name, ScanResult.benchmark_name, ScanResult.scan_time,
+            CheckDetail.check_id, CheckDetail.cis_id, CheckDetail.title, CheckDetail.status,
+            CheckDetail.details, CheckDetail.remediation, CheckDetail.compliance_tags
+        )
+        .join(ScanResult, ScanResult.id == CheckDetail.scan_id)
+        .join(Agent, Agent.id == ScanResult.agent_id)
+    )
+    q = _filter_scans(q, filters)
+
+    if filters.get("status"):
+        q = q.filter(CheckDetail.status == filters["status"].upper())
+
+    q = q.order_by(CheckDetail.id).execution_options(stream_results=True).yield_per(EXPORT_CHUNK_ROWS)
+    for row in q:
+        item = dict(zip(CHECK_FIELDS, row))
+        if item["scan_time"]:
+            item["scan_time"] = item["scan_time"].isoformat()
+        yield item
+
+
+def _csv_chunks(rows, fields):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields)
+    writer.writeheader()
+    n = 0
+    for row in rows:
+        writer.writerow(row)
+        n += 1
+        if n % EXPORT_CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+    yield buf.getvalue()
+
+
+def _ndjson_chunks(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, separators=(",", ":")))
+        if len(lines) >= EXPORT_CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def stream_export(kind, fmt, filters):
+    """
+    Generator of text chunks for kind 'scans' or 'checks' in fmt 'csv' or
+    'ndjson'. Owns its own session so it can outlive the request handler.
+    """
+    db = SessionLocal()
+    try:
+        if kind == "checks":
+            rows, fields = check_rows(db, filters), CHECK_FIELDS
+        else:
+            rows, fields = scan_rows(db, filters), SCAN_FIELDS
+
+        if fmt == "csv":
+            yield from _csv_chunks(rows, fields)
+        else:
+            yield from _ndjson_chunks(rows)
+    finally:
+        db.close()
@@ -0,0 +1,191 @@
+import heapq
+import threading
+
+from sqlalchemy import func, select
+
+from database_models import ScanResult, CheckDetail
+from ingest import extract_cis_id, compliance_tags
+
+# ---------------- FLEET FAILURE MATRIX ----------------
+# Latest status of every check on every agent, held as Python int bitsets:
+#   check_bits[c]  -> bit a set when agent slot a currently fails check slot c
+#   agent_bits[a]  -> bit c set when agent slot a currently fails check slot c
+# Both directions are kept so either slice is a single lookup, and
+# fail_counts[c] (popcount of check_bits[c]) keeps top-N a heap selection.
+# agent_checked[a] marks every check in the agent's latest scan, so
+# pass counts (checked & ~failing) can be derived for scoring.
+
+
+def _iter_bits(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class FailureMatrix:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.loaded = False
+
+        self.agent_slots = {}     # agent_id -> slot
+        self.agent_ids = []       # slot -> agent_id
+        self.agent_scan = []      # slot -> scan_id the row reflects
+        self.agent_bits = []      # slot -> failing-check bitset
+        self.agent_checked = []   # slot -> bitset of checks in its latest scan
+
+        # Checks are keyed by (rule pack digest, rule id) so results of
+        # different rule versions never share a slot.
+        self.check_slots = {}     # (digest, check_id) -> slot
+        self.check_meta = []      # slot -> (check_id, cis_id, title, digest)
+        self.check_tags = []      # slot -> compliance tags ('cis:2.3.1;pci_dss:8.1')
+        self.check_bits = []      # slot -> failing-agent bitset
+        self.fail_counts = []     # slot -> number of failing agents
+        self.cis_slots = {}       # cis_id -> [check slots]
+
+    # ---------------- MAINTENANCE ----------------
+
+    def _agent_slot(self, agent_id):
+        slot = self.agent_slots.get(agent_id)
+        if slot is None:
+            slot = len(self.agent_ids)
+            self.agent_slots[agent_id] = slot
+            self.agent_ids.append(agent_id)
+            self.agent_scan.append(0)
+            self.agent_bits.append(0)
+            self.agent_checked.append(0)
+        return slot
+
+    def _check_slot(self, digest, check_id, cis_id, title, tags):
+        key = (digest, check_id)
+        slot = self.check_slots.get(key)
+        if slot is None:
+            slot = len(self.check_meta)
+            self.check_slots[key] = slot
+            self.check_meta.append((check_id, cis_id, title, digest))
+            self.check_tags.append(tags or "")
+            self.check_bits.append(0)
+            self.fail_counts.append(0)
+            self.cis_slots.setdefault(cis_id, []).append(slot)
+        return slot
+
+    def _apply(self, agent_id, scan_id, digest, rows):
+        """rows: iterable of (check_id, cis_id, title, status, tags). Caller holds the lock."""
+        a = self._agent_slot(agent_id)
+        if scan_id < self.agent_scan[a]:
+            return  # an older scan arrived late, the matrix is already newer
+
+        new_bits = checked = 0
+        for check_id, cis_id, title, status, tags in rows:
+            c = self._check_slot(digest, check_id, cis_id, title, tags)
+            checked |= 1 << c
+            if status == "FAIL":
+                new_bits |= 1 << c
+
+        old_bits = self.agent_bits[a]
+        agent_bit = 1 << a
+        # Only checks whose status flipped touch the per-check side
+        for c in _iter_bits(old_bits & ~new_bits):
+            self.check_bits[c] &= ~agent_bit
+            self.fail_counts[c] -= 1
+        for c in _iter_bits(new_bits & ~old_bits):
+            self.check_bits[c] |= agent_bit
+            self.fail_counts[c] += 1
+
+        self.agent_bits[a] = new_bits
+        self.agent_checked[a] = checked
+        self.agent_scan[a] = scan_id
+
+    def update(self, agent_id, scan_id, digest, checks):
+        """Fold one ingested report ('checks' array of report.json) into the matrix."""
+        rows = [
+            (c.get("id"), extract_cis_id(c), c.get("title") or "", c.get("status"), compliance_tags(c))
+            for c in checks
+        ]
+        with self.lock:
+            if self.loaded:
+                self._apply(agent_id, scan_id, digest, rows)
+
+    def load(self, db):
+        """Build the matrix from the latest retained scan of every agent."""
+        latest = select(func.max(ScanResult.id)).group_by(ScanResult.agent_id)
+        q = (
+            db.query(
+                ScanResult.agent_id, CheckDetail.scan_id, ScanResult.rule_pack_digest, CheckDetail.check_id,
+                CheckDetail.cis_id, CheckDetail.title, CheckDetail.status, CheckDetail.compliance_tags
+            )
+            .join(ScanResult, ScanResult.id == CheckDetail.scan_id)
+            .filter(CheckDetail.scan_id.in_(latest))
+            .order_by(CheckDetail.scan_id)
+            .yield_per(5000)
+        )
+
+        with self.lock:
+            self._reset()
+            current, rows = None, []
+            for agent_id, scan_id, digest, check_id, cis_id, title, status, tags in q:
+                if current and current[1] != scan_id:
+                    self._apply(*current, rows)
+                    rows = []
+                current = (agent_id, scan_id, digest)
+                rows.append((check_id, cis_id, title, status, tags))
+            if current:
+                self._apply(*current, rows)
+            self.loaded = True
+
+    def ensure_loaded(self, db):
+        if not self.loaded:
+            self.load(db)
+
+    # ---------------- QUERIES ----------------
+
+    def failing_agents(self, cis_id):
+        """Agent ids failing any rule mapped to `cis_id`."""
+        with self.lock:
+            bits = 0
+            for c in self.cis_slots.get(cis_id, []):
+                bits |= self.check_bits[c]
+            return [self.agent_ids[a] for a in _iter_bits(bits)]
+
+    def failing_checks(self, agent_id):
+        with self.lock:
+            a = self.agent_slots.get(agent_id)
+            if a is None:
+                return []
+            return [self.check_meta[c] for c in _iter_bits(self.agent_bits[a])]
+
+    def top_failing(self, limit=20, digest=None):
+        """
+        [(check_id, cis_id, title, digest, failing_agents)] with the highest
+        counts first, optionally limited to one rule pack digest.
+        """
+        with self.lock:
+            counts = self.fail_counts
+            meta = self.check_meta
+            slots = heapq.nlargest(
+                limit,
+                (c for c in range(len(counts))
+                 if counts[c] and (digest is None or meta[c][3] == digest)),
+                key=counts.__getitem__
+            )
+            return [self.check_meta[c] + (counts[c],) for c in slots]
+
+    def columns(self):
+        """
+        Consistent snapshot for batch passes over the whole fleet:
+        (agent_ids, agent_bits, agent_checked, check_meta, check_tags).
+        The lists are copies; the bitsets themselves are immutable ints.
+        """
+        with self.lock:
+            return (list(self.agent_ids), list(self.agent_bits), list(self.agent_checked),
+                    list(self.check_meta), list(self.check_tags))
+
+    def agent_count(self):
+        with self.lock:
+            return len(self.agent_ids)
+
+
+matrix = FailureMatrix()
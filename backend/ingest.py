@@ -0,0 +1,70 @@
+import hashlib
+
+from sqlalchemy import insert
+from database_models import CheckDetail
+
+# ---------------- CHECK DETAIL HELPERS ----------------
+
+def extract_cis_id(check):
+    """First CIS id from a check's compliance list, falling back to the rule id."""
+    for entry in check.get("compliance") or []:
+        if isinstance(entry, dict) and entry.get("cis"):
+            return str(entry["cis"][0])
+    return str(check.get("id", ""))
+
+
+def compliance_tags(check):
+    """Flatten [{cis: [...]}, {pci_dss: [...]}] into 'cis:2.3.1.2;pci_dss:8.1'."""
+    tags = []
+    for entry in check.get("compliance") or []:
+        if not isinstance(entry, dict):
+            continue
+        for key, values in entry.items():
+            tags.append(f"{key}:{','.join(str(v) for v in values or [])}")
+    return ";".join(tags)[:256]
+
+
+def check_rows(scan_id, checks):
+    """Map the 'checks' array of report.json to check_details rows."""
+    rows = []
+    for c in checks:
+        rows.append({
+            "scan_id": scan_id,
+            "check_id": c.get("id"),
+            "cis_id": extract_cis_id(c),
+            "title": (c.get("title") or "")[:256],
+            "status": c.get("status"),
+            "details": c.get("details"),
+            "remediation": c.get("remediation"),
+            "compliance_tags": compliance_tags(c),
+        })
+    return rows
+
+
+def persist_check_details(db, scan, checks):
+    """Bulk insert one row per check for an already flushed ScanResult."""
+    rows = check_rows(scan.id, checks)
+    if rows:
+        db.execute(insert(CheckDetail), rows)
+    return len(rows)
+
+
+def status_digest(checks):
+    """Order-independent sha256 over (rule id, status, details) of every check."""
+    h = hashlib.sha256()
+    for check_id, status, details in sorted(
+        (str(c.get("id")), c.get("status") or "", c.get("details") or "") for c in checks
+    ):
+        h.update(f"{check_id}\x1f{status}\x1f{details}\x1e".encode("utf-8"))
+    return h.hexdigest()
+
+
+def idempotency_key(explicit, content_hash, scan_time):
+    """
+    Key identifying one upload: the client's own key when it sends one, else
+    sha256 over the report content and its scan time, which a retry of the
+    same report reproduces while a new scan with the same results does not.
+    """
+    if explicit:
+        return str(explicit)[:128]
+    return hashlib.sha256(f"{content_hash}\x1f{scan_time or ''}".encode("utf-8")).hexdigest()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+''' SYNTHETIC FLEET LOAD GENERATOR / BACKEND BENCHMARK '''
+#
+# Simulates N agents that register and upload report.json payloads (built
+# from the sample scan in agents/windows-audit-cis-main/outputs/) while M
+# dashboard pollers hit the read endpoints, then reports throughput,
+# p50/p95/p99 latency per operation and database growth.
+#
+#   python loadtest.py --agents 200 --scans 3 --pollers 4
+#   python loadtest.py --db postgresql://postgres:pw@localhost/trace_bench
+#   python loadtest.py --url http://localhost:8000 --agents 50
+#   python loadtest.py --max-p95-ms upload=800 --min-throughput 20   # regression gate
+#
+# Without --url the Flask app runs in process against --db (a throwaway
+# SQLite file by default), so no server is needed.
+
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_REPORT = os.path.join(
+    HERE, "..", "agents", "windows-audit-cis-main", "outputs", "report.json"
+)
+
+POLL_ENDPOINTS = [
+    "/api/dashboard/overview",
+    "/api/fleet/top-failing",
+    "/api/compliance",
+]
+
+
+# ---------------- PAYLOADS ----------------
+
+def load_template(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_report(template, rng, flip_rate):
+    """Copy of the template report with a fraction of check statuses flipped."""
+    report = copy.deepcopy(template)
+    passed = 0
+    for check in report["checks"]:
+        if rng.random() < flip_rate:
+            check["status"] = "PASS" if check["status"] == "FAIL" else "FAIL"
+        if check["status"] == "PASS":
+            passed += 1
+    total = len(report["checks"])
+    report["passed"] = passed
+    report["failed"] = total - passed
+    report["score_percent"] = round(passed / total * 100) if total else 0
+    return report
+
+
+# ---------------- TRANSPORTS ----------------
+
+class InProcessClient:
+    """Flask test client; one per thread."""
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        r = self.client.open(path, method=method, json=body, headers=headers or {})
+        return r.status_code, r.get_json(silent=True)
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, body=None, headers=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        req.add_header("Content-Type", "application/json")
+        for k, v in (headers or {}).items():
+            req.add_header(k, v)
+        try:
+            with urllib.request.urlopen(req, timeout=120) as r:
+                raw = r.read()
+                status = r.status
+        except urllib.error.HTTPError as e:
+            return e.code, None
+        try:
+            return status, json.loads(raw)
+        except ValueError:
+            return status, None
+
+
+# ---------------- STATS ----------------
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, op, seconds, ok):
+        with self.lock:
+            self.samples.setdefault(op, []).append(seconds)
+            if not ok:
+                self.errors[op] = self.errors.get(op, 0) + 1
+
+    def timed(self, op, fn):
+        start = time.perf_counter()
+        ok = False
+        try:
+            status, body = fn()
+            ok = status < 400
+            return body
+        finally:
+            self.record(op, time.perf_counter() - start, ok)
+
+    def summary(self, wall):
+        out = {}
+        for op, values in sorted(self.samples.items()):
+            values = sorted(values)
+            out[op] = {
+                "count": len(values),
+                "errors": self.errors.get(op, 0),
+                "throughput_per_s": round(len(values) / wall, 2) if wall else 0,
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+        return out
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+# ---------------- DATABASE SIZE ----------------
+
+def database_size(db_url):
+    if not db_url:
+        return None
+    if db_url.startswith("sqlite:///"):
+        path = db_url[len("sqlite:///"):]
+        total = 0
+        for suffix in ("", "-wal", "-journal"):
+            if os.path.exists(path + suffix):
+                total += os.path.getsize(path + suffix)
+        return total
+    try:
+        from sqlalchemy import create_engine, text
+        with create_engine(db_url).connect() as conn:
+            return conn.execute(text("SELECT pg_database_size(current_database())")).scalar()
+    except Exception:
+        return None
+
+
+# ---------------- SCENARIO ----------------
+
+def run(args):
+    rng = random.Random(args.seed)
+    template = load_template(args.template)
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+        db_url = args.db
+    else:
+        db_url = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="trace-bench-"), "trace.db")
+        os.environ["DATABASE_URL"] = db_url
+        sys.path.insert(0, HERE)
+        from app import app
+        make_client = lambda: InProcessClient(app)
+
+    # Payloads are built up front so generation cost never shows up as latency
+    reports = [make_report(template, rng, args.flip_rate) for _ in range(args.payload_variants)]
+
+    stats = Stats()
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, "client"):
+            local.client = make_client()
+        return local.client
+
+    admin_name = f"bench-admin-{args.seed}"
+    client().request("POST", "/api/agents/register", {
+        "system_name": admin_name, "os_name": "Linux", "ip_address": "127.0.0.1", "role": "ADMIN"
+    })
+
+    size_before = database_size(db_url)
+    done = threading.Event()
+
+    def poller(i):
+        prng = random.Random(args.seed * 1000 + i)
+        headers = {"X-System": admin_name}
+        while not done.is_set():
+            path = prng.choice(POLL_ENDPOINTS)
+            stats.timed("poll " + path, lambda: client().request("GET", path, headers=headers))
+            time.sleep(args.poll_interval)
+
+    def agent(i):
+        body = stats.timed("register", lambda: client().request("POST", "/api/agents/register", {
+            "system_name": f"bench-agent-{args.seed}-{i:05d}",
+            "os_name": "Windows",
+            "ip_address": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+            "role": "AGENT",
+        }))
+        if not body or "agent_token" not in body:
+            return
+        headers = {"Authorization": f"Bearer {body['agent_token']}"}
+        for n in range(args.scans):
+            payload = {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                # Payload variants repeat: a key per upload keeps them from counting as retries
+                "idempotency_key": f"{args.seed}-{i}-{n}",
+                "results": reports[(i + n) % len(reports)],
+            }
+            stats.timed("upload", lambda: client().request("POST", "/api/upload", payload, headers))
+
+    start = time.perf_counter()
+    # --pollers 0 measures uploads alone
+    poll_threads = [threading.Thread(target=poller, args=(i,), daemon=True) for i in range(args.pollers)]
+    for t in poll_threads:
+        t.start()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as agents:
+        list(agents.map(agent, range(args.agents)))
+    done.set()
+    for t in poll_threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    size_after = database_size(db_url)
+    uploads = len(stats.samples.get("upload", []))
+    return {
+        "agents": args.agents,
+        "scans_per_agent": args.scans,
+        "concurrency": args.concurrency,
+        "pollers": args.pollers,
+        "wall_seconds": round(wall, 2),
+        "upload_throughput_per_s": round(uploads / wall, 2) if wall else 0,
+        "db_bytes_before": size_before,
+        "db_bytes_after": size_after,
+        "db_bytes_per_scan": (
+            round((size_after - size_before) / uploads) if uploads and size_before is not None and size_after is not None else None
+        ),
+        "operations": stats.summary(wall),
+    }
+
+
+def check_gates(result, args):
+    """Return a list of violated thresholds (empty when the run passes)."""
+    failures = []
+    for gate in args.max_p95_ms:
+        op, _, limit = gate.partition("=")
+        ops = result["operations"]
+        matches = [k for k in ops if k == op or k.startswith(op + " ")] or [op]
+        for name in matches:
+            p95 = ops.get(name, {}).get("p95_ms")
+            if p95 is None:
+                failures.append(f"{name}: no samples")
+            elif p95 > float(limit):
+                failures.append(f"{name}: p95 {p95}ms > {limit}ms")
+    if args.min_throughput and result["upload_throughput_per_s"] < args.min_throughput:
+        failures.append(
+            f"upload throughput {result['upload_throughput_per_s']}/s < {args.min_throughput}/s"
+        )
+    errors = sum(o["errors"] for o in result["operations"].values())
+    if errors > args.max_errors:
+        failures.append(f"{errors} failed requests > {args.max_errors}")
+    return failures
+
+
+def print_report(result):
+    print(f"Agents: {result['agents']} x {result['scans_per_agent']} scans, "
+          f"concurrency {result['concurrency']}, pollers {result['pollers']}")
+    print(f"Wall time: {result['wall_seconds']}s, uploads/s: {result['upload_throughput_per_s']}")
+    if result["db_bytes_after"] is not None:
+        print(f"DB size: {result['db_bytes_before']} -> {result['db_bytes_after']} bytes "
+              f"({result['db_bytes_per_scan']} bytes/scan)")
+    print(f"{'operation':<34}{'count':>8}{'err':>6}{'ops/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for op, s in result["operations"].items():
+        print(f"{op:<34}{s['count']:>8}{s['errors']:>6}{s['throughput_per_s']:>9}"
+              f"{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}")
+
+
+def count(minimum):
+    """argparse type: an int of at least `minimum`."""
+    def parse(value):
+        n = int(value)
+        if n < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}")
+        return n
+    return parse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TRACE backend fleet load generator")
+    parser.add_argument("--agents", type=count(1), default=50, help="Number of simulated agents")
+    parser.add_argument("--scans", type=count(1), default=2, help="Uploads per agent")
+    parser.add_argument("--concurrency", type=count(1), default=8, help="Agents uploading at once")
+    parser.add_argument("--pollers", type=count(0), default=2, help="Concurrent dashboard pollers (0: none)")
+    parser.add_argument("--poll-interval", type=float, default=0.2, help="Seconds between polls per poller")
+    parser.add_argument("--flip-rate", type=float, default=0.05,
+                        help="Fraction of check statuses randomised per payload variant")
+    parser.add_argument("--payload-variants", type=count(1), default=16, help="Distinct payloads to rotate through")
+    parser.add_argument("--template", default=TEMPLATE_REPORT, help="report.json used as the payload template")
+    parser.add_argument("--url", default="", help="Benchmark a running backend instead of the in-process app")
+    parser.add_argument("--db", default="", help="DATABASE_URL (SQLite or Postgres); temp SQLite by default")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", default="", help="Also write the results to this JSON file")
+    parser.add_argument("--max-p95-ms", action="append", default=[], metavar="OP=MS",
+                        help="Fail if p95 of OP exceeds MS (repeatable; OP 'poll' matches all polls)")
+    parser.add_argument("--min-throughput", type=float, default=0, help="Fail if uploads/s falls below this")
+    parser.add_argument("--max-errors", type=int, default=0, help="Failed requests tolerated")
+    args = parser.parse_args()
+
+    result = run(args)
+    print_report(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    failures = check_gates(result, args)
+    for f in failures:
+        print("GATE FAILED:", f)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
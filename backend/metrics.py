@@ -0,0 +1,214 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+from sqlalchemy import event
+
+# ---------------- METRICS ----------------
+# Small in-process registry rendered in the Prometheus text format, so the
+# backend needs no extra dependency to expose /metrics.
+
+SLOW_QUERY_SECONDS = float(os.environ.get("TRACE_SLOW_QUERY_MS", 200)) / 1000
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 5e7)
+ROW_BUCKETS = (0, 10, 100, 500, 1000, 2500, 5000, 10000)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name, doc, labels=()):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+        _registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for lv, v in sorted(self.values.items()):
+                lines.append(f"{self.name}{_label_str(self.labels, lv)} {v}")
+        return lines
+
+
+class Gauge:
+    """Value is read from `fn()` at scrape time; fn returns {label_values: value}."""
+    def __init__(self, name, doc, fn, labels=()):
+        self.name, self.doc, self.fn, self.labels = name, doc, fn, tuple(labels)
+        _registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.fn()
+        except Exception:
+            values = {}
+        for lv, v in sorted(values.items()):
+            lines.append(f"{self.name}{_label_str(self.labels, lv)} {v}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, doc, buckets, labels=()):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.values = {}   # label_values -> [bucket counts..., sum, count]
+        _registry.append(self)
+
+    def observe(self, value, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            v = self.values.get(label_values)
+            if v is None:
+                v = self.values[label_values] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                v[i] += 1
+            v[-2] += value
+            v[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for lv, v in sorted(self.values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, v):
+                    cumulative += n
+                    lines.append(
+                        f"{self.name}_bucket{_label_str(self.labels + ('le',), lv + (bound,))} {cumulative}"
+                    )
+                lines.append(f"{self.name}_bucket{_label_str(self.labels + ('le',), lv + ('+Inf',))} {v[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(self.labels, lv)} {v[-2]}")
+                lines.append(f"{self.name}_count{_label_str(self.labels, lv)} {v[-1]}")
+        return lines
+
+
+def render_metrics():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- HOT-PATH METRICS ----------------
+
+http_latency = Histogram(
+    "trace_http_request_duration_seconds", "Request latency per route",
+    LATENCY_BUCKETS, labels=("route", "method", "status")
+)
+ingest_payload_bytes = Histogram(
+    "trace_ingest_payload_bytes", "Size of upload request bodies (single upload or batch)",
+    SIZE_BUCKETS, labels=("endpoint",)
+)
+ingest_rows_written = Histogram(
+    "trace_ingest_rows_written", "check_details rows written per uploaded scan", ROW_BUCKETS
+)
+db_query_duration = Histogram(
+    "trace_db_query_duration_seconds", "SQL statement execution time", LATENCY_BUCKETS
+)
+db_slow_queries = Counter(
+    "trace_db_slow_queries_total", f"SQL statements slower than {SLOW_QUERY_SECONDS}s"
+)
+db_sessions_opened = Counter(
+    "trace_db_sessions_opened_total", "ORM sessions that began a transaction"
+)
+db_pool_checkouts = Counter(
+    "trace_db_pool_checkouts_total", "Connections checked out of the pool"
+)
+cache_requests = Counter(
+    "trace_cache_requests_total", "Cache lookups by cache and result (hit/miss)",
+    labels=("cache", "result")
+)
+
+
+def cache_hit(cache):
+    cache_requests.inc(cache, "hit")
+
+
+def cache_miss(cache):
+    cache_requests.inc(cache, "miss")
+
+
+def _pool_stats(engine):
+    pool = engine.pool
+    stats = {}
+    for name in ("size", "checkedout", "checkedin", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            stats[(name,)] = fn()
+    return stats
+
+
+# ---------------- WIRING ----------------
+
+def instrument_engine(engine, session_factory):
+    """SQLAlchemy event hooks: query timing, slow queries, pool and session use."""
+    # The start time lives on the statement's execution context, which is
+    # discarded with it: a statement that raises leaves nothing behind.
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context.trace_query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "trace_query_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        db_query_duration.observe(elapsed)
+        if elapsed >= SLOW_QUERY_SECONDS:
+            db_slow_queries.inc()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_conn, conn_record, conn_proxy):
+        db_pool_checkouts.inc()
+
+    @event.listens_for(session_factory, "after_begin")
+    def _session_begin(session, transaction, connection):
+        db_sessions_opened.inc()
+
+    Gauge(
+        "trace_db_pool_connections", "Connection pool state at scrape time",
+        lambda: _pool_stats(engine), labels=("state",)
+    )
+
+
+# Flask endpoint -> "endpoint" label of trace_ingest_payload_bytes
+INGEST_ENDPOINTS = {"upload_scan": "upload", "upload_scan_batch": "batch"}
+
+
+def instrument_app(app):
+    """Per-route latency and ingest payload size for every request."""
+    @app.before_request
+    def _start_timer():
+        g.trace_request_start = time.perf_counter()
+        endpoint = INGEST_ENDPOINTS.get(request.endpoint)
+        if endpoint and request.content_length:
+            ingest_payload_bytes.observe(request.content_length, endpoint)
+
+    @app.after_request
+    def _record_latency(response):
+        start = g.pop("trace_request_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            http_latency.observe(
+                time.perf_counter() - start, route, request.method, response.status_code
+            )
+        return response
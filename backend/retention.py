@@ -0,0 +1,320 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, case
+
+from database import SessionLocal
+from database_models import ScanResult, CheckDetail, ScanRollup, CheckRollup, UploadReceipt
+
+# ---------------- CONFIG ----------------
+# Full scan + check detail is kept only for the newest N scans of each agent.
+# Anything older is folded into daily and weekly rollups and then deleted.
+RETENTION_KEEP_SCANS = int(os.environ.get("TRACE_RETENTION_KEEP_SCANS", 10))
+RETENTION_BATCH_SIZE = int(os.environ.get("TRACE_RETENTION_BATCH_SIZE", 50))
+RETENTION_INTERVAL = int(os.environ.get("TRACE_RETENTION_INTERVAL", 3600))
+# Pause between batches so ingest writers are never starved of the write lock
+RETENTION_BATCH_PAUSE = 0.05
+
+PERIODS = ("day", "week")
+
+# Upload receipts (idempotency keys) are kept this long, or until their scan
+# is compacted
+RECEIPT_TTL = int(os.environ.get("TRACE_RECEIPT_TTL", 7 * 86400))
+
+
+def period_start(ts, period):
+    day = datetime(ts.year, ts.month, ts.day)
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def sightings(scan):
+    """
+    (time, count) pairs one stored scan stands for. An upload with the same
+    results as the previous scan only bumps that row's seen_count and
+    last_seen; those repeats are counted at last_seen (the times in between
+    are not kept).
+    """
+    yield scan.scan_time, 1
+    repeats = (scan.seen_count or 1) - 1
+    if repeats > 0:
+        yield scan.last_seen or scan.scan_time, repeats
+
+
+# ---------------- COMPACTION ----------------
+
+def expired_scan_ids(db, keep_last, limit):
+    """Ids of scans that fall outside the newest `keep_last` of their agent."""
+    ranked = db.query(
+        ScanResult.id.label("scan_id"),
+        func.row_number().over(
+            partition_by=ScanResult.agent_id,
+            order_by=(ScanResult.scan_time.desc(), ScanResult.id.desc())
+        ).label("rn")
+    ).subquery()
+
+    rows = (
+        db.query(ranked.c.scan_id)
+        .filter(ranked.c.rn > keep_last)
+        .order_by(ranked.c.scan_id)
+        .limit(limit)
+        .all()
+    )
+    return [r[0] for r in rows]
+
+
+def _fold_scans(db, scans):
+    totals = {}
+    for s in scans:
+        score = s.score_percent or 0
+        for ts, n in sightings(s):
+            for period in PERIODS:
+                key = (s.agent_id, s.rule_pack_digest or "", period, period_start(ts, period))
+                t = totals.setdefault(key, {"n": 0, "sum": 0.0, "min": None, "max": None, "passed": 0, "failed": 0})
+                t["n"] += n
+                t["sum"] += score * n
+                t["min"] = score if t["min"] is None else min(t["min"], score)
+                t["max"] = score if t["max"] is None else max(t["max"], score)
+                t["passed"] += (s.passed_count or 0) * n
+                t["failed"] += (s.failed_count or 0) * n
+
+    if not totals:
+        return
+
+    agent_ids = {k[0] for k in totals}
+    starts = {k[3] for k in totals}
+    existing = {
+        (r.agent_id, r.rule_pack_digest, r.period, r.period_start): r
+        for r in db.query(ScanRollup).filter(
+            ScanRollup.agent_id.in_(agent_ids),
+            ScanRollup.period_start.in_(starts)
+        )
+    }
+
+    for key, t in totals.items():
+        row = existing.get(key)
+        if row is None:
+            row = ScanRollup(
+                agent_id=key[0], rule_pack_digest=key[1], period=key[2], period_start=key[3],
+                scan_count=0, score_sum=0, passed_sum=0, failed_sum=0
+            )
+            db.add(row)
+        row.scan_count += t["n"]
+        row.score_sum += t["sum"]
+        row.score_min = t["min"] if row.score_min is None else min(row.score_min, t["min"])
+        row.score_max = t["max"] if row.score_max is None else max(row.score_max, t["max"])
+        row.passed_sum += t["passed"]
+        row.failed_sum += t["failed"]
+
+
+def _fold_checks(db, scans):
+    by_scan = {s.id: s for s in scans}
+    grouped = (
+        db.query(
+            CheckDetail.scan_id,
+            CheckDetail.cis_id,
+            func.count(CheckDetail.id),
+            func.sum(case((CheckDetail.status == "FAIL", 1), else_=0))
+        )
+        .filter(CheckDetail.scan_id.in_(by_scan.keys()))
+        .group_by(CheckDetail.scan_id, CheckDetail.cis_id)
+        .all()
+    )
+
+    totals = {}
+    for scan_id, cis_id, checked, failed in grouped:
+        s = by_scan[scan_id]
+        for ts, n in sightings(s):
+            for period in PERIODS:
+                key = (s.agent_id, s.rule_pack_digest or "", cis_id, period, period_start(ts, period))
+                t = totals.setdefault(key, [0, 0])
+                t[0] += checked * n
+                t[1] += (failed or 0) * n
+
+    if not totals:
+        return
+
+    agent_ids = {k[0] for k in totals}
+    starts = {k[4] for k in totals}
+    existing = {
+        (r.agent_id, r.rule_pack_digest, r.cis_id, r.period, r.period_start): r
+        for r in db.query(CheckRollup).filter(
+            CheckRollup.agent_id.in_(agent_ids),
+            CheckRollup.period_start.in_(starts)
+        )
+    }
+
+    for key, (checked, failed) in totals.items():
+        row = existing.get(key)
+        if row is None:
+            row = CheckRollup(
+                agent_id=key[0], rule_pack_digest=key[1], cis_id=key[2],
+                period=key[3], period_start=key[4],
+                checked_count=0, fail_count=0
+            )
+            db.add(row)
+        row.checked_count += checked
+        row.fail_count += failed
+
+
+def compact_batch(db, keep_last=RETENTION_KEEP_SCANS, batch_size=RETENTION_BATCH_SIZE):
+    """
+    Fold up to `batch_size` expired scans into rollups and delete them, delete
+    up to `batch_size` receipts older than RECEIPT_TTL, and commit. Returns
+    (scans compacted, receipts deleted); (0, 0) when nothing is left to do.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=RECEIPT_TTL)
+    receipt_ids = [r[0] for r in db.query(UploadReceipt.id).filter(
+        UploadReceipt.received_at < cutoff
+    ).order_by(UploadReceipt.id).limit(batch_size)]
+    if receipt_ids:
+        db.query(UploadReceipt).filter(UploadReceipt.id.in_(receipt_ids)).delete(synchronize_session=False)
+
+    ids = expired_scan_ids(db, keep_last, batch_size)
+    if not ids:
+        db.commit()
+        return 0, len(receipt_ids)
+
+    scans = db.query(ScanResult).filter(ScanResult.id.in_(ids)).all()
+    _fold_scans(db, scans)
+    _fold_checks(db, scans)
+
+    db.query(CheckDetail).filter(CheckDetail.scan_id.in_(ids)).delete(synchronize_session=False)
+    db.query(UploadReceipt).filter(UploadReceipt.scan_id.in_(ids)).delete(synchronize_session=False)
+    db.query(ScanResult).filter(ScanResult.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
+    return len(ids), len(receipt_ids)
+
+
+def run_retention(keep_last=RETENTION_KEEP_SCANS, batch_size=RETENTION_BATCH_SIZE, max_batches=None):
+    """
+    Compact in short transactions until no expired scans or receipts remain.
+    Returns the number of scans compacted.
+    """
+    compacted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        db = SessionLocal()
+        try:
+            n, receipts = compact_batch(db, keep_last, batch_size)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if not n and not receipts:
+            break
+        compacted += n
+        batches += 1
+        time.sleep(RETENTION_BATCH_PAUSE)
+    return compacted
+
+
+# ---------------- SCHEDULER ----------------
+
+_stop = threading.Event()
+
+
+def start_retention_scheduler(interval=RETENTION_INTERVAL):
+    """Run `run_retention` every `interval` seconds on a daemon thread."""
+    def loop():
+        while not _stop.wait(interval):
+            try:
+                n = run_retention()
+                if n:
+                    print(f"RETENTION: compacted {n} scans")
+            except Exception as e:
+                print("RETENTION ERROR:", e)
+
+    t = threading.Thread(target=loop, name="trace-retention", daemon=True)
+    t.start()
+    return t
+
+
+def stop_retention_scheduler():
+    _stop.set()
+
+
+# ---------------- HISTORY (ROLLUPS + RETAINED SCANS) ----------------
+
+def _sort_key(item):
+    (digest, start), _ = item
+    return start, digest
+
+
+def score_history(db, agent_id, period="day"):
+    """
+    Per-period score summary for one agent, one series per rule pack digest.
+    Compacted history comes from scan_rollups; the retained scans are
+    bucketed on top of it.
+    """
+    buckets = {}
+    for r in db.query(ScanRollup).filter(
+        ScanRollup.agent_id == agent_id,
+        ScanRollup.period == period
+    ):
+        buckets[(r.rule_pack_digest or "", r.period_start)] = {
+            "scans": r.scan_count, "score_sum": r.score_sum,
+            "min": r.score_min, "max": r.score_max, "failed": r.failed_sum
+        }
+
+    for s in db.query(ScanResult).filter(ScanResult.agent_id == agent_id):
+        score = s.score_percent or 0
+        for ts, n in sightings(s):
+            key = (s.rule_pack_digest or "", period_start(ts, period))
+            b = buckets.setdefault(key, {"scans": 0, "score_sum": 0.0, "min": None, "max": None, "failed": 0})
+            b["scans"] += n
+            b["score_sum"] += score * n
+            b["min"] = score if b["min"] is None else min(b["min"], score)
+            b["max"] = score if b["max"] is None else max(b["max"], score)
+            b["failed"] += (s.failed_count or 0) * n
+
+    return [
+        {
+            "periodStart": start.isoformat(),
+            "rulePackDigest": digest or None,
+            "scans": b["scans"],
+            "avgScore": round(b["score_sum"] / b["scans"], 2) if b["scans"] else None,
+            "minScore": b["min"],
+            "maxScore": b["max"],
+            "failed": b["failed"],
+        }
+        for (digest, start), b in sorted(buckets.items(), key=_sort_key)
+    ]
+
+
+def check_history(db, agent_id, cis_id, period="day"):
+    """Per-period failure counts of one CIS id for one agent, per rule pack digest."""
+    buckets = {}
+    for r in db.query(CheckRollup).filter(
+        CheckRollup.agent_id == agent_id,
+        CheckRollup.cis_id == cis_id,
+        CheckRollup.period == period
+    ):
+        buckets[(r.rule_pack_digest or "", r.period_start)] = [r.checked_count, r.fail_count]
+
+    live = (
+        db.query(ScanResult, CheckDetail.status)
+        .join(CheckDetail, CheckDetail.scan_id == ScanResult.id)
+        .filter(ScanResult.agent_id == agent_id, CheckDetail.cis_id == cis_id)
+    )
+    for s, status in live:
+        for ts, n in sightings(s):
+            b = buckets.setdefault((s.rule_pack_digest or "", period_start(ts, period)), [0, 0])
+            b[0] += n
+            if status == "FAIL":
+                b[1] += n
+
+    return [
+        {"periodStart": start.isoformat(), "rulePackDigest": digest or None, "checked": c, "failed": f}
+        for (digest, start), (c, f) in sorted(buckets.items(), key=_sort_key)
+    ]
+
+
+if __name__ == "__main__":
+    from database_init import init_db
+    init_db()
+    print(f"Compacted {run_retention()} scans")
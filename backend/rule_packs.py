@@ -0,0 +1,144 @@
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+import yaml
+
+from cis_levels import annotated_levels, rule_level
+
+# ---------------- RULE PACKS ----------------
+# Every sub-directory of RULE_PACK_DIR holding *.yml SCA policy files is one
+# pack (e.g. "windows"). Packs are compiled once to compact JSON, identified
+# by a sha256 digest of their checks, and recompiled only when a source file
+# changes. Agents fetch them with If-None-Match and get a 304 when current.
+
+# The Windows scanner's bundled rules are the default packs. The default
+# path is the checkout layout (backend/../agents/...). An image built from
+# backend/ alone does not contain it: mount the scanner directory and point
+# TRACE_SCANNER_DIR at it, as docker-compose.yml does, or mount only the
+# rules and set TRACE_RULE_PACK_DIR.
+SCANNER_DIR = os.environ.get(
+    "TRACE_SCANNER_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agents", "windows-audit-cis-main")
+)
+RULE_PACK_DIR = os.environ.get("TRACE_RULE_PACK_DIR", os.path.join(SCANNER_DIR, "rules"))
+
+PACK_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Same keys and defaults as sca_structs.Rule on the agent, so a pack compiled
+# here and the same YAML loaded locally by the scanner hash identically.
+# Checks also carry a "level" which is metadata only and not hashed.
+CHECK_FIELDS = (
+    ("id", 0), ("title", ""), ("description", ""), ("rationale", ""),
+    ("remediation", ""), ("compliance", []), ("references", []),
+    ("condition", "all"), ("rules", []),
+)
+
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def checks_digest(checks):
+    hashed = [{key: c[key] for key, _ in CHECK_FIELDS} for c in checks]
+    canonical = json.dumps(hashed, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CompiledPack:
+    def __init__(self, name, policies, checks, signature):
+        self.name = name
+        self.signature = signature
+        self.digest = checks_digest(checks)
+        self.check_count = len(checks)
+        self.levels = {c["id"]: c["level"] for c in checks if c.get("level")}
+        self.compiled_at = datetime.utcnow().isoformat()
+        self.body = json.dumps({
+            "name": name,
+            "digest": self.digest,
+            "compiled_at": self.compiled_at,
+            "policies": policies,
+            "checks": checks,
+        }, separators=(",", ":")).encode("utf-8")
+        self.gzip_body = gzip.compress(self.body, compresslevel=6)
+
+    def summary(self):
+        return {
+            "name": self.name,
+            "digest": self.digest,
+            "checks": self.check_count,
+            "compiledAt": self.compiled_at,
+            "bytes": len(self.body),
+        }
+
+
+def _pack_files(name):
+    return sorted(glob.glob(os.path.join(RULE_PACK_DIR, name, "*.yml")))
+
+
+def _signature(files):
+    return tuple((os.path.basename(f), os.path.getmtime(f), os.path.getsize(f)) for f in files)
+
+
+def compile_pack(name, files):
+    policies, checks = [], []
+    for path in files:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        data = yaml.load(text, Loader=_Loader) or {}
+        levels = annotated_levels(text)
+        policy = data.get("policy", {}) or {}
+        policies.append({
+            "id": policy.get("id", ""),
+            "file": os.path.basename(path),
+            "name": policy.get("name", ""),
+        })
+        for item in data.get("checks", []) or []:
+            check = {key: item.get(key, default) for key, default in CHECK_FIELDS}
+            check["level"] = rule_level(check["compliance"], levels)
+            checks.append(check)
+    return CompiledPack(name, policies, checks, _signature(files))
+
+
+_cache = {}
+_lock = threading.Lock()
+_levels = {}    # digest -> {check id: level} of every pack compiled since start
+
+
+def get_pack(name):
+    """Compiled pack `name`, rebuilt if its files changed; None if unknown."""
+    if not PACK_NAME_RE.match(name):
+        return None
+    files = _pack_files(name)
+    if not files:
+        return None
+
+    signature = _signature(files)
+    with _lock:
+        pack = _cache.get(name)
+        if pack is None or pack.signature != signature:
+            pack = _cache[name] = compile_pack(name, files)
+            _levels[pack.digest] = pack.levels
+        return pack
+
+
+def list_packs():
+    if not os.path.isdir(RULE_PACK_DIR):
+        return []
+    packs = []
+    for name in sorted(os.listdir(RULE_PACK_DIR)):
+        if os.path.isdir(os.path.join(RULE_PACK_DIR, name)):
+            pack = get_pack(name)
+            if pack:
+                packs.append(pack.summary())
+    return packs
+
+
+def check_levels():
+    """{digest: {check id: 'L1' | 'L2'}} for every known pack version."""
+    list_packs()
+    with _lock:
+        return dict(_levels)
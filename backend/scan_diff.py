@@ -0,0 +1,94 @@
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import aliased
+
+from database_models import ScanResult, CheckDetail
+
+# ---------------- SCAN-TO-SCAN DIFF ----------------
+# Checks are matched by rule id (CIS ids repeat across the bundled
+# benchmarks, rule ids do not). Only rows that differ ever leave the database.
+
+
+def latest_two_scan_ids(db, agent_id):
+    rows = (
+        db.query(ScanResult.id)
+        .filter(ScanResult.agent_id == agent_id)
+        .order_by(ScanResult.scan_time.desc(), ScanResult.id.desc())
+        .limit(2)
+        .all()
+    )
+    return [r[0] for r in reversed(rows)]
+
+
+def _row(check_id, cis_id, title, before, after, details):
+    return {
+        "checkId": check_id,
+        "cisId": cis_id,
+        "title": title,
+        "before": before,
+        "after": after,
+        "details": details,
+    }
+
+
+def diff_scans(db, old_scan, new_scan):
+    """Compare two ScanResult rows of the same agent check by check."""
+    result = {
+        "fromScan": old_scan.id,
+        "toScan": new_scan.id,
+        # Rule ids may mean different things across rule pack versions
+        "rulePackChanged": old_scan.rule_pack_digest != new_scan.rule_pack_digest,
+        "newlyFailing": [],
+        "newlyPassing": [],
+        "changedDetails": [],
+        "statusChanged": [],     # other transitions, e.g. PASS -> ERROR
+        "added": [],
+        "removed": [],
+    }
+
+    # Identical digests: nothing changed, skip the join entirely
+    if old_scan.status_digest and old_scan.status_digest == new_scan.status_digest:
+        return result
+
+    a = aliased(CheckDetail)
+    b = aliased(CheckDetail)
+
+    changed = (
+        db.query(b.check_id, b.cis_id, b.title, a.status, b.status, b.details)
+        .join(a, and_(a.check_id == b.check_id, a.scan_id == old_scan.id))
+        .filter(
+            b.scan_id == new_scan.id,
+            or_(a.status.is_distinct_from(b.status), a.details.is_distinct_from(b.details))
+        )
+    )
+    for check_id, cis_id, title, before, after, details in changed:
+        row = _row(check_id, cis_id, title, before, after, details)
+        if before == after:
+            result["changedDetails"].append(row)
+        elif after == "FAIL":
+            result["newlyFailing"].append(row)
+        elif after == "PASS":
+            result["newlyPassing"].append(row)
+        else:
+            result["statusChanged"].append(row)
+
+    old_ids = select(CheckDetail.check_id).where(CheckDetail.scan_id == old_scan.id)
+    new_ids = select(CheckDetail.check_id).where(CheckDetail.scan_id == new_scan.id)
+
+    added = (
+        db.query(b.check_id, b.cis_id, b.title, b.status, b.details)
+        .filter(b.scan_id == new_scan.id, b.check_id.not_in(old_ids))
+    )
+    for check_id, cis_id, title, status, details in added:
+        row = _row(check_id, cis_id, title, None, status, details)
+        result["added"].append(row)
+        if status == "FAIL":
+            result["newlyFailing"].append(row)
+
+    removed = (
+        db.query(a.check_id, a.cis_id, a.title, a.status)
+        .filter(a.scan_id == old_scan.id, a.check_id.not_in(new_ids))
+    )
+    for check_id, cis_id, title, status in removed:
+        result["removed"].append(_row(check_id, cis_id, title, status, None, None))
+
+    return result
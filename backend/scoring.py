@@ -0,0 +1,306 @@
+import json
+import os
+import threading
+import time
+
+from database_models import CheckDetail, ScanResult
+from cis_levels import UNKNOWN
+from metrics import Histogram, LATENCY_BUCKETS
+from rule_packs import check_levels
+
+# ---------------- WEIGHTED SCORING ----------------
+# Scores and severities under a configurable policy. A policy maps every
+# check to a (weight, severity) pair by CIS id, compliance framework or CIS
+# level:
+#
+#   {
+#     "name": "pci-first",
+#     "weights":  {"default": 1, "level": {"L1": 2, "L2": 1},
+#                  "framework": {"pci_dss": 3, "pci_dss:8.*": 5}, "cis": {"2.3.*": 4}},
+#     "severity": {"default": "Medium", "level": {"L1": "High"},
+#                  "framework": {"pci_dss": "Critical"}}
+#   }
+#
+# Precedence is cis > framework > level > default; when several cis or
+# framework patterns match, the highest weight / severity wins. Patterns are
+# exact values or prefixes ending in '*'. Checks without a level annotation
+# (most of the bundled ones) have level "unknown", as in the scanner's
+# selectors: they get "level": {"unknown": ...} if the policy sets it, else
+# the default. They never count as L1.
+#
+# With TRACE_SCORING_POLICY set, every worker re-reads the file when its
+# mtime changes, so a policy PUT to one worker reaches the others.
+#
+# Fleet re-scoring runs over the failure matrix: checks are grouped into one
+# bitset mask per distinct (weight, severity), and each agent's failing /
+# checked bitsets are ANDed with every mask and popcounted. The work per
+# agent is one AND + popcount per class, whatever the number of checks.
+
+SEVERITIES = ("Info", "Low", "Medium", "High", "Critical")
+SEVERITY_RANK = {s: i for i, s in enumerate(SEVERITIES)}
+
+DEFAULT_POLICY = {
+    "name": "default",
+    "weights": {"default": 1},
+    "severity": {"default": "Medium", "level": {"L1": "High", "L2": "Medium"}},
+}
+
+DEFAULT_RULE_VALUES = {"weights": 1, "severity": "Medium"}
+
+POLICY_FILE = os.environ.get("TRACE_SCORING_POLICY")
+
+rescore_duration = Histogram(
+    "trace_fleet_rescore_seconds", "Duration of a fleet-wide re-scoring pass", LATENCY_BUCKETS
+)
+
+
+def _match(pattern, value):
+    if pattern.endswith("*"):
+        return value.startswith(pattern[:-1])
+    return value == pattern
+
+
+def parse_tags(tags):
+    """'cis:2.3.1.2;pci_dss:8.1,8.2' -> {'cis': ['2.3.1.2'], 'pci_dss': ['8.1', '8.2']}"""
+    frameworks = {}
+    for tag in (tags or "").split(";"):
+        name, _, values = tag.partition(":")
+        if name:
+            frameworks[name] = [v for v in values.split(",") if v]
+    return frameworks
+
+
+def _framework_match(pattern, frameworks):
+    name, _, value = pattern.partition(":")
+    if name not in frameworks:
+        return False
+    return not value or any(_match(value, v) for v in frameworks[name])
+
+
+def _rule_set(spec, what, parse_value):
+    spec = spec or {}
+    if not isinstance(spec, dict):
+        raise ValueError(f"'{what}' must be an object")
+    unknown = set(spec) - {"default", "level", "framework", "cis"}
+    if unknown:
+        raise ValueError(f"unknown '{what}' keys: {', '.join(sorted(unknown))}")
+    rules = {"default": parse_value(spec.get("default", DEFAULT_RULE_VALUES[what]), f"{what}.default")}
+    for key in ("level", "framework", "cis"):
+        mapping = spec.get(key) or {}
+        if not isinstance(mapping, dict):
+            raise ValueError(f"'{what}.{key}' must be an object")
+        rules[key] = {str(k): parse_value(v, f"{what}.{key}.{k}") for k, v in mapping.items()}
+    return rules
+
+
+def _weight(value, where):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError(f"{where}: weight must be a number >= 0")
+    return float(value)
+
+
+def _severity(value, where):
+    if value not in SEVERITY_RANK:
+        raise ValueError(f"{where}: severity must be one of {', '.join(SEVERITIES)}")
+    return value
+
+
+class ScoringPolicy:
+    def __init__(self, spec=None):
+        spec = DEFAULT_POLICY if spec is None else spec
+        if not isinstance(spec, dict):
+            raise ValueError("policy must be a JSON object")
+        unknown = set(spec) - {"name", "weights", "severity"}
+        if unknown:
+            raise ValueError(f"unknown policy keys: {', '.join(sorted(unknown))}")
+        self.name = str(spec.get("name") or "custom")
+        self.weights = _rule_set(spec.get("weights"), "weights", _weight)
+        self.severity = _rule_set(spec.get("severity"), "severity", _severity)
+        self._memo = {}
+
+    def to_dict(self):
+        return {"name": self.name, "weights": self.weights, "severity": self.severity}
+
+    @staticmethod
+    def _resolve(rules, level, frameworks, cis_ids, rank):
+        hits = [v for p, v in rules["cis"].items() if any(_match(p, c) for c in cis_ids)]
+        if not hits:
+            hits = [v for p, v in rules["framework"].items() if _framework_match(p, frameworks)]
+        if hits:
+            return max(hits, key=rank)
+        return rules["level"].get(level, rules["default"])
+
+    def classify(self, level, tags, cis_id):
+        """(weight, severity) of one check."""
+        key = (level, tags, cis_id)
+        result = self._memo.get(key)
+        if result is None:
+            frameworks = parse_tags(tags)
+            cis_ids = frameworks.get("cis") or ([cis_id] if cis_id else [])
+            level = level or UNKNOWN
+            result = self._memo[key] = (
+                self._resolve(self.weights, level, frameworks, cis_ids, float),
+                self._resolve(self.severity, level, frameworks, cis_ids, SEVERITY_RANK.get),
+            )
+        return result
+
+
+def highest_severity(counts):
+    present = [s for s, n in counts.items() if n]
+    return max(present, key=SEVERITY_RANK.get) if present else None
+
+
+# ---------------- ACTIVE POLICY ----------------
+
+_active = None
+_active_mtime = None
+_active_lock = threading.Lock()
+
+
+def _policy_mtime():
+    try:
+        return os.stat(POLICY_FILE).st_mtime_ns if POLICY_FILE else None
+    except OSError:
+        return None
+
+
+def active_policy():
+    """The policy in effect: TRACE_SCORING_POLICY (a JSON file) if set, else the default."""
+    global _active, _active_mtime
+    with _active_lock:
+        mtime = _policy_mtime()
+        if _active is None or mtime != _active_mtime:
+            spec = None
+            if mtime is not None:
+                try:
+                    with open(POLICY_FILE, "r", encoding="utf-8") as f:
+                        spec = json.load(f)
+                except (OSError, ValueError) as e:
+                    print("SCORING POLICY LOAD ERROR:", e)
+                    if _active is not None:
+                        # remembered, so the broken file is read (and reported) once
+                        _active_mtime = mtime
+                        return _active
+            try:
+                _active = ScoringPolicy(spec)
+            except ValueError as e:
+                print("SCORING POLICY LOAD ERROR:", e)
+                _active = _active or ScoringPolicy()
+            _active_mtime = mtime
+        return _active
+
+
+def set_active_policy(spec):
+    """Validate and activate `spec` (raises ValueError); persisted to TRACE_SCORING_POLICY if set."""
+    global _active, _active_mtime
+    policy = ScoringPolicy(spec)
+    with _active_lock:
+        if POLICY_FILE:
+            tmp_path = POLICY_FILE + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(policy.to_dict(), f, indent=2)
+            os.replace(tmp_path, POLICY_FILE)
+        _active = policy
+        _active_mtime = _policy_mtime()
+    return policy
+
+
+# ---------------- FLEET RE-SCORING ----------------
+
+def _mask(slots, size):
+    bitmap = bytearray((size + 7) // 8)
+    for c in slots:
+        bitmap[c >> 3] |= 1 << (c & 7)
+    return int.from_bytes(bitmap, "little")
+
+
+def check_classes(policy, check_meta, check_tags, levels=None):
+    """[(weight, severity, mask)]: check slots grouped by their classification."""
+    levels = check_levels() if levels is None else levels
+    groups = {}
+    for c, (check_id, cis_id, _title, digest) in enumerate(check_meta):
+        level = levels.get(digest, {}).get(check_id, "")
+        groups.setdefault(policy.classify(level, check_tags[c], cis_id), []).append(c)
+    size = len(check_meta)
+    return [(weight, severity, _mask(slots, size)) for (weight, severity), slots in groups.items()]
+
+
+def fleet_scores(matrix, policy, levels=None):
+    """
+    Weighted score and failing checks by severity for every agent in the
+    failure matrix (its latest scan), plus fleet totals. One batched pass.
+    """
+    start = time.perf_counter()
+    agent_ids, agent_bits, agent_checked, check_meta, check_tags = matrix.columns()
+    classes = check_classes(policy, check_meta, check_tags, levels)
+
+    agents = []
+    fleet_severity = dict.fromkeys(SEVERITIES, 0)
+    score_sum = scored = 0
+    for agent_id, failing, checked in zip(agent_ids, agent_bits, agent_checked):
+        if not checked:
+            continue
+        total_w = failed_w = 0.0
+        total = failed = 0
+        by_severity = {}
+        for weight, severity, mask in classes:
+            n = (checked & mask).bit_count()
+            if not n:
+                continue
+            f = (failing & mask).bit_count()
+            total += n
+            failed += f
+            total_w += weight * n
+            failed_w += weight * f
+            if f:
+                by_severity[severity] = by_severity.get(severity, 0) + f
+
+        score = round(100 * (1 - failed_w / total_w), 2) if total_w else 100.0
+        for severity, n in by_severity.items():
+            fleet_severity[severity] += n
+        score_sum += score
+        scored += 1
+        agents.append({
+            "agentId": agent_id,
+            "score": score,
+            "unweightedScore": round(100 * (total - failed) / total, 2),
+            "checked": total,
+            "failed": failed,
+            "severity": highest_severity(by_severity),
+            "failingBySeverity": by_severity,
+        })
+
+    elapsed = time.perf_counter() - start
+    rescore_duration.observe(elapsed)
+    return {
+        "policy": policy.name,
+        "agents": agents,
+        "fleet": {
+            "agents": scored,
+            "avgScore": round(score_sum / scored, 2) if scored else None,
+            "failingBySeverity": {s: n for s, n in fleet_severity.items() if n},
+        },
+        "classes": len(classes),
+        "elapsedMs": round(elapsed * 1000, 2),
+    }
+
+
+# ---------------- PER-SCAN SEVERITY ----------------
+
+def scan_severities(db, scan_ids, policy):
+    """{scan_id: {severity: failing checks}} for the given scans, from check_details."""
+    if not scan_ids:
+        return {}
+    levels = check_levels()
+    rows = (
+        db.query(CheckDetail.scan_id, CheckDetail.check_id, CheckDetail.cis_id,
+                 CheckDetail.compliance_tags, ScanResult.rule_pack_digest)
+        .join(ScanResult, ScanResult.id == CheckDetail.scan_id)
+        .filter(CheckDetail.scan_id.in_(scan_ids), CheckDetail.status == "FAIL")
+    )
+    result = {}
+    for scan_id, check_id, cis_id, tags, digest in rows:
+        _, severity = policy.classify(levels.get(digest, {}).get(check_id, ""), tags, cis_id)
+        counts = result.setdefault(scan_id, {})
+        counts[severity] = counts.get(severity, 0) + 1
+    return result
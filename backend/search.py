@@ -0,0 +1,247 @@
+import logging
+import re
+
+from sqlalchemy import text
+
+# ---------------- FULL-TEXT SEARCH ----------------
+# Full-text index over check_details.title, details (the evaluation output)
+# and remediation, kept in the database so a search never pulls check rows
+# into Python:
+#   SQLite   - external-content FTS5 table kept in sync by triggers
+#   Postgres - generated tsvector column with a GIN index
+# Both are maintained by the database itself, so bulk ingest inserts and
+# retention deletes update the index incrementally. Engines without either
+# fall back to an unranked LIKE scan.
+
+FTS_TABLE = "check_details_fts"
+
+# Column weights for bm25(): a title hit counts most, then remediation
+FTS_WEIGHTS = (10.0, 1.0, 4.0)     # title, details, remediation
+SNIPPET_TOKENS = 16
+MAX_PER_PAGE = 200
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, details, remediation,
+        content='check_details', content_rowid='id',
+        tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS check_details_fts_ai AFTER INSERT ON check_details BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, details, remediation)
+        VALUES (new.id, new.title, new.details, new.remediation);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS check_details_fts_ad AFTER DELETE ON check_details BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, details, remediation)
+        VALUES ('delete', old.id, old.title, old.details, old.remediation);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS check_details_fts_au AFTER UPDATE ON check_details BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, details, remediation)
+        VALUES ('delete', old.id, old.title, old.details, old.remediation);
+        INSERT INTO {FTS_TABLE}(rowid, title, details, remediation)
+        VALUES (new.id, new.title, new.details, new.remediation);
+    END""",
+]
+
+_POSTGRES_DDL = [
+    """ALTER TABLE check_details ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(remediation, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(details, '')), 'C')
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_check_details_search ON check_details USING GIN (search_vector)",
+]
+
+_PROBES = {
+    "sqlite": ("fts5", f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{FTS_TABLE}'"),
+    "postgresql": ("tsvector", "SELECT 1 FROM information_schema.columns "
+                               "WHERE table_name = 'check_details' AND column_name = 'search_vector'"),
+}
+
+_backends = {}      # engine url -> backend, detected on first use
+
+log = logging.getLogger(__name__)
+
+
+def search_backend(bind):
+    """
+    'fts5', 'tsvector' or 'like' for the given engine / connection. Detected
+    from the database on first use (whether the index exists), so processes
+    that never ran ensure_search_index() still use it.
+    """
+    engine = getattr(bind, "engine", bind)
+    key = str(engine.url)
+    backend = _backends.get(key)
+    if backend is None:
+        backend = "like"
+        probe = _PROBES.get(engine.dialect.name)
+        if probe is not None:
+            try:
+                with engine.connect() as conn:
+                    if conn.execute(text(probe[1])).first() is not None:
+                        backend = probe[0]
+            except Exception as e:
+                log.warning("Search backend detection failed, using LIKE: %s", e)
+        _backends[key] = backend
+    return backend
+
+
+def ensure_search_index(engine):
+    """Create the index (and backfill existing rows) if it does not exist yet."""
+    name = engine.dialect.name
+    key = str(engine.url)
+
+    if name == "postgresql":
+        with engine.begin() as conn:
+            for ddl in _POSTGRES_DDL:
+                conn.execute(text(ddl))
+        _backends[key] = "tsvector"
+        return "tsvector"
+
+    if name != "sqlite":
+        _backends[key] = "like"
+        return "like"
+
+    try:
+        with engine.begin() as conn:
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE}
+            ).first() is not None
+            for ddl in _SQLITE_DDL:
+                conn.execute(text(ddl))
+            if not existed:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except Exception as e:
+        # SQLite built without FTS5
+        log.warning("Search index unavailable, using LIKE: %s", e)
+        _backends[key] = "like"
+        return "like"
+
+    _backends[key] = "fts5"
+    return "fts5"
+
+
+# ---------------- QUERY ----------------
+
+TOKEN_RE = re.compile(r"\w+\*?", re.UNICODE)
+
+
+def like_pattern(word):
+    """Substring LIKE pattern for `word`, with its wildcards escaped (ESCAPE '\\')."""
+    word = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{word}%"
+
+
+def fts5_query(q):
+    """
+    User input -> FTS5 MATCH expression. Every whitespace separated word
+    becomes a quoted phrase (all must match), so punctuation such as '2.3.1'
+    or 'SMB-signing' is matched as a phrase and never parsed as FTS5 syntax;
+    a trailing '*' keeps prefix search.
+    """
+    terms = []
+    for word in q.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if not TOKEN_RE.search(word):
+            continue
+        terms.append('"%s"%s' % (word.replace('"', '""'), "*" if prefix else ""))
+    return " ".join(terms)
+
+
+def _filters(scope, agent_id, status, params):
+    where = []
+    if scope == "latest":
+        where.append("cd.scan_id IN (SELECT MAX(id) FROM scan_results GROUP BY agent_id)")
+    if agent_id is not None:
+        where.append("s.agent_id = :agent_id")
+        params["agent_id"] = agent_id
+    if status:
+        where.append("cd.status = :status")
+        params["status"] = status.upper()
+    return where
+
+
+def search_checks(db, q, page=1, per_page=25, scope="latest", agent_id=None, status=None):
+    """
+    Ranked, paginated full-text search over check results. `scope` is
+    'latest' (each agent's newest scan) or 'all' (every retained scan).
+    """
+    page = max(1, page)
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    params = {"limit": per_page, "offset": (page - 1) * per_page}
+    where = _filters(scope, agent_id, status, params)
+    backend = search_backend(db.get_bind())
+
+    if backend == "fts5":
+        match = fts5_query(q)
+        if not match:
+            return {"total": 0, "results": []}
+        params["match"] = match
+        source = f"{FTS_TABLE} JOIN check_details cd ON cd.id = {FTS_TABLE}.rowid"
+        where.insert(0, f"{FTS_TABLE} MATCH :match")
+        w_title, w_details, w_remediation = FTS_WEIGHTS
+        # bm25() is lower-is-better; negate so every backend sorts score DESC
+        rank = f"-bm25({FTS_TABLE}, {w_title}, {w_details}, {w_remediation})"
+        snippet = f"snippet({FTS_TABLE}, -1, '[', ']', '...', {SNIPPET_TOKENS})"
+        order = "score DESC"
+    elif backend == "tsvector":
+        params["q"] = q
+        source = "check_details cd"
+        where.insert(0, "cd.search_vector @@ websearch_to_tsquery('english', :q)")
+        rank = "ts_rank_cd(cd.search_vector, websearch_to_tsquery('english', :q))"
+        snippet = (
+            "ts_headline('english', coalesce(cd.title, '') || ' ' || coalesce(cd.remediation, ''), "
+            "websearch_to_tsquery('english', :q), "
+            f"'StartSel=[, StopSel=], MaxWords={SNIPPET_TOKENS}, MinWords=5')"
+        )
+        order = "score DESC"
+    else:
+        words = TOKEN_RE.findall(q)
+        if not words:
+            return {"total": 0, "results": []}
+        for i, word in enumerate(words):
+            params[f"w{i}"] = like_pattern(word.rstrip("*"))
+            where.insert(0, "(" + " OR ".join(
+                f"lower(cd.{column}) LIKE lower(:w{i}) ESCAPE '\\'"
+                for column in ("title", "details", "remediation")
+            ) + ")")
+        source = "check_details cd"
+        rank = "0"
+        snippet = "cd.title"
+        order = "cd.id DESC"
+
+    joins = (
+        f"FROM {source} "
+        "JOIN scan_results s ON s.id = cd.scan_id "
+        "LEFT JOIN agents a ON a.id = s.agent_id "
+        f"WHERE {' AND '.join(where)}"
+    )
+
+    total = db.execute(text(f"SELECT COUNT(*) {joins}"), params).scalar()
+    rows = db.execute(text(
+        "SELECT cd.id, cd.scan_id, s.agent_id, a.name, s.scan_time, cd.check_id, cd.cis_id, "
+        f"cd.title, cd.status, {rank} AS score, {snippet} AS snippet "
+        f"{joins} ORDER BY {order} LIMIT :limit OFFSET :offset"
+    ), params).all()
+
+    return {
+        "total": total,
+        "results": [
+            {
+                "checkDetailId": r[0],
+                "scanId": r[1],
+                "agentId": r[2],
+                "system": r[3],
+                "scanTime": r[4].isoformat() if hasattr(r[4], "isoformat") else r[4],
+                "checkId": r[5],
+                "cisId": r[6],
+                "title": r[7],
+                "status": r[8],
+                "score": round(float(r[9]), 4) if r[9] is not None else None,
+                "snippet": r[10],
+            }
+            for r in rows
+        ],
+    }
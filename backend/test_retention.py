@@ -0,0 +1,78 @@
+from sqlalchemy import create_engine, inspect, text
+
+from database_models import CheckDetail, ScanResult, ScanRollup, CheckRollup
+from retention import compact_batch, score_history
+
+
+def test_upload_writes_one_detail_row_per_check(db, register, upload):
+    token = register("ws-01")
+    assert upload(token, [(1, "PASS"), (2, "FAIL", "missing"), (3, "PASS")]).status_code == 200
+
+    scan = db.query(ScanResult).one()
+    assert (scan.passed_count, scan.failed_count) == (2, 1)
+    rows = db.query(CheckDetail).filter(CheckDetail.scan_id == scan.id).order_by(CheckDetail.check_id).all()
+    assert [(c.check_id, c.status, c.cis_id) for c in rows] == [(1, "PASS", "1.1"), (2, "FAIL", "1.2"), (3, "PASS", "1.3")]
+    assert rows[1].details == "missing"
+    assert rows[1].compliance_tags == "cis:1.2"
+
+
+def test_retention_folds_old_scans_into_rollups(db, register, upload, agent_id):
+    token = register("ws-01")
+    for status in ("PASS", "FAIL", "PASS"):
+        upload(token, [(1, status), (2, "FAIL")])
+    aid = agent_id("ws-01")
+    before = score_history(db, aid)
+
+    assert compact_batch(db, keep_last=1) == (2, 0)
+    assert db.query(ScanResult).count() == 1
+    assert db.query(CheckDetail).count() == 2
+    day = db.query(ScanRollup).filter(ScanRollup.period == "day").one()
+    assert (day.scan_count, day.failed_sum) == (2, 3)
+    fails = {r.cis_id: (r.checked_count, r.fail_count) for r in db.query(CheckRollup).filter(CheckRollup.period == "week")}
+    assert fails == {"1.1": (2, 1), "1.2": (2, 2)}
+
+    # history reads the rollups plus the retained scan
+    assert score_history(db, aid) == before
+    assert compact_batch(db, keep_last=1) == (0, 0)
+
+
+def test_history_endpoint(client, admin, register, upload, agent_id):
+    token = register("ws-01")
+    upload(token, [(1, "PASS"), (2, "FAIL")])
+    upload(token, [(1, "FAIL"), (2, "FAIL")])
+    aid = agent_id("ws-01")
+
+    assert client.get(f"/api/agents/{aid}/history").status_code == 403
+    assert client.get(f"/api/agents/{aid}/history?period=month", headers=admin).status_code == 400
+    history = client.get(f"/api/agents/{aid}/history", headers=admin).get_json()
+    assert [(h["scans"], h["failed"]) for h in history] == [(2, 3)]
+    checks = client.get(f"/api/agents/{aid}/history?cis=1.1&period=week", headers=admin).get_json()
+    assert [(h["checked"], h["failed"]) for h in checks] == [(2, 1)]
+
+
+def test_upgrade_schema_adds_missing_columns_and_indexes(tmp_path):
+    from database_init import upgrade_schema
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE upload_receipts (id INTEGER PRIMARY KEY, agent_id INTEGER NOT NULL, "
+            "idempotency_key VARCHAR(128) NOT NULL, scan_id INTEGER, outcome VARCHAR(16), "
+            "received_at DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO upload_receipts (agent_id, idempotency_key, outcome) VALUES (1, 'k', 'created')"
+        ))
+
+    statements = upgrade_schema(engine)
+    assert statements == ["ALTER TABLE upload_receipts ADD COLUMN content_hash VARCHAR(64)"]
+    inspector = inspect(engine)
+    assert "content_hash" in {c["name"] for c in inspector.get_columns("upload_receipts")}
+    assert "ix_upload_receipts_scan" in {i["name"] for i in inspector.get_indexes("upload_receipts")}
+    # tables that do not exist yet are left to create_all()
+    assert "scan_results" not in inspector.get_table_names()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT outcome, content_hash FROM upload_receipts")).one() == ("created", None)
+
+    # safe to run on every start
+    assert upgrade_schema(engine) == []
@@ -0,0 +1,31 @@
+import json
+from collections import Counter
+
+import rule_packs
+from cis_levels import annotated_levels, rule_level
+
+
+def test_annotated_levels_and_rule_level():
+    text = "# 2.3.1 (L1) Ensure a\n  # 2.3.2 (L2) Ensure b\n# 2.3.3 Ensure c\n"
+    levels = annotated_levels(text)
+    assert levels == {"2.3.1": "L1", "2.3.2": "L2"}
+    assert rule_level([{"cis": ["2.3.3"]}, {"cis": ["2.3.2"]}], levels) == "L2"
+    assert rule_level([{"cis": ["2.3.3"]}], levels) == ""
+    assert rule_level(None, levels) == ""
+
+
+def test_bundled_pack_levels():
+    # the scanner's test_selection.py pins the same counts for the YAML it loads
+    pack = rule_packs.get_pack("windows")
+    checks = json.loads(pack.body)["checks"]
+    assert len(checks) == 1143
+    assert Counter(c["level"] for c in checks) == {"L1": 149, "L2": 68, "": 926}
+    assert pack.levels == {c["id"]: c["level"] for c in checks if c["level"]}
+
+
+def test_rule_pack_endpoint_revalidates(client):
+    r = client.get("/api/rule-packs/windows")
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+    assert client.get("/api/rule-packs/windows", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/rule-packs/nope").status_code == 404
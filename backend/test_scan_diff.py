@@ -0,0 +1,62 @@
+def _ids(rows):
+    return sorted(r["checkId"] for r in rows)
+
+
+def test_diff_of_the_latest_two_scans(client, admin, register, upload, agent_id):
+    token = register("ws-01")
+    upload(token, [(1, "PASS"), (2, "FAIL"), (3, "PASS", "a"), (4, "PASS"), (7, "FAIL")])
+    upload(token, [(1, "FAIL"), (2, "PASS"), (3, "PASS", "b"), (4, "PASS"), (5, "FAIL")])
+
+    r = client.get(f"/api/agents/{agent_id('ws-01')}/diff", headers=admin)
+    assert r.status_code == 200
+    diff = r.get_json()
+    assert _ids(diff["newlyFailing"]) == [1, 5]
+    assert _ids(diff["newlyPassing"]) == [2]
+    assert _ids(diff["changedDetails"]) == [3]
+    assert _ids(diff["added"]) == [5]
+    assert _ids(diff["removed"]) == [7]
+    assert diff["newlyFailing"][0]["before"] == "PASS"
+
+
+def test_identical_scans_have_an_empty_diff(client, admin, register, upload, agent_id, db):
+    from database_models import ScanResult
+
+    token = register("ws-01")
+    first = [(1, "PASS"), (2, "FAIL")]
+    upload(token, first)
+    upload(token, [(1, "FAIL"), (2, "FAIL")])
+    upload(token, list(reversed(first)))
+
+    a, _, c = [s.id for s in db.query(ScanResult).order_by(ScanResult.id)]
+    diff = client.get(f"/api/agents/{agent_id('ws-01')}/diff?from={a}&to={c}", headers=admin).get_json()
+    assert all(diff[k] == [] for k in ("newlyFailing", "newlyPassing", "changedDetails", "added", "removed"))
+
+
+def test_diff_arguments(client, admin, register, upload, agent_id, db):
+    from database_models import ScanResult
+
+    token = register("ws-01")
+    aid = agent_id("ws-01")
+    url = f"/api/agents/{aid}/diff"
+    assert client.get(url).status_code == 403
+    upload(token, [(1, "PASS")])
+    assert client.get(url, headers=admin).status_code == 404
+
+    upload(token, [(1, "FAIL")])
+    upload(token, [(1, "PASS")])
+    first, _, last = [s.id for s in db.query(ScanResult).order_by(ScanResult.id)]
+    assert client.get(f"{url}?from={first}", headers=admin).status_code == 400
+    assert client.get(f"{url}?from={first}&to=999", headers=admin).status_code == 404
+    diff = client.get(f"{url}?from={first}&to={last}", headers=admin).get_json()
+    assert (diff["fromScan"], diff["toScan"], diff["newlyFailing"]) == (first, last, [])
+
+
+def test_missing_details_and_other_statuses(client, admin, register, upload, agent_id):
+    token = register("ws-01")
+    upload(token, [(1, "PASS", None), (2, "PASS"), (3, "FAIL")])
+    upload(token, [(1, "PASS", "now set"), (2, "ERROR"), (3, "ERROR")])
+
+    diff = client.get(f"/api/agents/{agent_id('ws-01')}/diff", headers=admin).get_json()
+    assert _ids(diff["changedDetails"]) == [1]
+    assert _ids(diff["statusChanged"]) == [2, 3]
+    assert diff["newlyPassing"] == diff["newlyFailing"] == []
@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+
+import scoring
+from scoring import ScoringPolicy
+
+
+@pytest.fixture
+def policy_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "policy.json")
+    monkeypatch.setattr(scoring, "POLICY_FILE", path)
+    monkeypatch.setattr(scoring, "_active", None)
+    monkeypatch.setattr(scoring, "_active_mtime", None)
+    return path
+
+
+@pytest.fixture
+def fleet(db):
+    import app
+    app.matrix._reset()  # the failure matrix caches rows of the emptied database
+
+
+def test_unannotated_checks_get_the_default():
+    assert ScoringPolicy().classify("", "", "1.1") == (1.0, "Medium")
+    custom = ScoringPolicy({
+        "weights": {"default": 2, "level": {"L1": 5}},
+        "severity": {"default": "Low", "level": {"L1": "Critical", "unknown": "Info"}},
+    })
+    assert custom.classify("", "", "1.1") == (2.0, "Info")
+    assert custom.classify("L1", "", "1.1") == (5.0, "Critical")
+
+
+def test_precedence_and_validation():
+    policy = ScoringPolicy({
+        "weights": {"level": {"L2": 2}, "framework": {"pci_dss": 3, "pci_dss:8.*": 5}, "cis": {"2.3.*": 4}},
+        "severity": {"framework": {"pci_dss": "Critical"}},
+    })
+    assert policy.classify("L2", "", "1.1") == (2.0, "Medium")
+    assert policy.classify("", "cis:1.1;pci_dss:8.2", "1.1") == (5.0, "Critical")
+    assert policy.classify("", "cis:2.3.1;pci_dss:8.2", "2.3.1") == (4.0, "Critical")
+    assert ScoringPolicy().classify("L2", "", "1.1") == (1.0, "Medium")
+    assert ScoringPolicy().classify("L1", "", "1.1") == (1.0, "High")
+
+    for spec in ({"severity": {"default": "Severe"}}, {"weights": {"level": {"L1": -1}}},
+                 {"weights": {"levels": {}}}, {"bonus": 1}, []):
+        with pytest.raises(ValueError):
+            ScoringPolicy(spec)
+
+
+def test_policy_is_persisted(policy_file):
+    assert scoring.active_policy().name == "default"
+    scoring.set_active_policy({"name": "mine", "weights": {"default": 2}})
+    scoring._active = None
+    assert scoring.active_policy().to_dict()["weights"]["default"] == 2.0
+    assert scoring.active_policy().name == "mine"
+
+
+def test_policy_file_changes_reach_every_worker(policy_file, capsys):
+    scoring.set_active_policy({"name": "mine"})
+
+    # another worker replaces the file
+    tmp_path = policy_file + ".w"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"name": "theirs"}, f)
+    os.replace(tmp_path, policy_file)
+    mtime = os.stat(policy_file).st_mtime_ns + 10 ** 9
+    os.utime(policy_file, ns=(mtime, mtime))
+    assert scoring.active_policy().name == "theirs"
+
+    # a broken file keeps the policy in effect
+    with open(policy_file, "w", encoding="utf-8") as f:
+        f.write("{")
+    os.utime(policy_file, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+    assert scoring.active_policy().name == "theirs"
+    assert capsys.readouterr().out.count("SCORING POLICY LOAD ERROR") == 1
+
+    # ...and is not read again until it changes
+    assert scoring.active_policy().name == "theirs"
+    assert "SCORING POLICY LOAD ERROR" not in capsys.readouterr().out
+
+
+def test_fleet_scores_and_policy_endpoints(client, fleet, register, upload, admin, policy_file):
+    token = register("ws-01")
+    upload(token, [(1, "FAIL", "", "2.3.1"), (2, "PASS"), (3, "PASS"), (4, "PASS")])
+
+    assert client.get("/api/fleet/scores").status_code == 403
+    scores = client.get("/api/fleet/scores", headers=admin).get_json()
+    [agent] = scores["agents"]
+    assert (agent["score"], agent["unweightedScore"], agent["failed"]) == (75.0, 75.0, 1)
+
+    # a preview does not change the active policy
+    preview = client.post("/api/fleet/scores", headers=admin, json={"weights": {"cis": {"2.3.*": 4}}})
+    assert preview.get_json()["agents"][0]["score"] == round(100 * (1 - 4 / 7), 2)
+    assert client.get("/api/scoring/policy", headers=admin).get_json()["name"] == "default"
+
+    r = client.put("/api/scoring/policy", headers=admin, json={"severity": {"default": "Severe"}})
+    assert r.status_code == 400
+    r = client.put("/api/scoring/policy", headers=admin,
+                   json={"name": "sec", "severity": {"cis": {"2.3.*": "Critical"}}})
+    assert r.get_json()["agents"][0]["failingBySeverity"] == {"Critical": 1}
+    assert client.get("/api/scoring/policy", headers=admin).get_json()["name"] == "sec"
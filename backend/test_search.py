@@ -0,0 +1,31 @@
+import pytest
+
+
+@pytest.fixture(params=["fts5", "like"])
+def backend(request, db, monkeypatch):
+    import search
+    monkeypatch.setitem(search._backends, str(db.get_bind().engine.url), request.param)
+    return request.param
+
+
+def _check_ids(client, admin, q):
+    r = client.get("/api/search", query_string={"q": q}, headers=admin)
+    assert r.status_code == 200
+    return sorted(row["checkId"] for row in r.get_json()["results"])
+
+
+def test_search_matches_details(client, admin, register, upload, backend):
+    token = register("ws-01")
+    upload(token, [(1, "FAIL", "SMB signing is disabled"), (2, "PASS", "Guest account disabled")])
+
+    assert _check_ids(client, admin, "smb") == [1]
+    assert _check_ids(client, admin, "disabled") == [1, 2]
+
+
+def test_like_wildcards_are_literal(client, admin, register, upload, backend):
+    token = register("ws-01")
+    upload(token, [(1, "FAIL", "value of max_size"), (2, "FAIL", "value of maxXsize"),
+                   (3, "FAIL", "100% coverage")])
+
+    assert _check_ids(client, admin, "max_size") == [1]
+    assert _check_ids(client, admin, "%") == []
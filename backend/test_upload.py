@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+
+
+def test_retried_upload_gets_the_first_receipt(client, db, register, upload):
+    from database_models import ScanResult, UploadReceipt
+
+    token = register("ws-01")
+    checks = [(1, "PASS"), (2, "FAIL")]
+    first = upload(token, checks, scan_time="2026-01-01T00:00:00").get_json()
+    retry = upload(token, checks, scan_time="2026-01-01T00:00:00").get_json()
+
+    assert first["outcome"] == "created" and not first["duplicate"]
+    assert retry["duplicate"] and retry["scan_id"] == first["scan_id"]
+    assert db.query(ScanResult).count() == 1
+    assert db.query(UploadReceipt).count() == 1
+
+    keyed = upload(token, [(1, "FAIL")], headers={"Idempotency-Key": "k1"}).get_json()
+    again = upload(token, [(1, "FAIL")], headers={"Idempotency-Key": "k1"}).get_json()
+    assert keyed["outcome"] == "created" and again["duplicate"]
+    assert again["scan_id"] == keyed["scan_id"]
+    assert db.query(ScanResult).count() == 2
+
+
+def test_unchanged_results_extend_the_previous_scan(client, db, register, upload):
+    from database_models import ScanResult
+
+    token = register("ws-01")
+    checks = [(1, "PASS"), (2, "FAIL")]
+    first = upload(token, checks, scan_time="2026-01-01T00:00:00").get_json()
+    again = upload(token, checks, scan_time="2026-01-02T00:00:00").get_json()
+
+    assert again["outcome"] == "unchanged" and not again["duplicate"]
+    assert again["scan_id"] == first["scan_id"]
+    assert db.query(ScanResult).count() == 1
+    assert db.get(ScanResult, first["scan_id"]).seen_count == 2
+
+    changed = upload(token, [(1, "FAIL"), (2, "FAIL")], scan_time="2026-01-03T00:00:00").get_json()
+    assert changed["outcome"] == "created" and changed["scan_id"] != first["scan_id"]
+
+
+def test_unchanged_results_count_in_history(client, db, admin, register, upload, agent_id):
+    token = register("ws-01")
+    checks = [(1, "PASS"), (2, "FAIL")]
+    upload(token, checks)
+    upload(token, checks)
+
+    aid = agent_id("ws-01")
+    history = client.get(f"/api/agents/{aid}/history", headers=admin).get_json()
+    assert [(h["scans"], h["failed"]) for h in history] == [(2, 2)]
+    checks_history = client.get(f"/api/agents/{aid}/history?cis=1.2", headers=admin).get_json()
+    assert [(h["checked"], h["failed"]) for h in checks_history] == [(2, 2)]
+    trends = client.get(f"/api/trends?agents={aid}", headers=admin).get_json()
+    assert [p["scans"] for p in trends["fleet"]] == [2]
+
+
+def test_repeats_are_counted_at_last_seen(client, db, register, upload):
+    from database_models import ScanResult
+    from retention import score_history
+
+    token = register("ws-01")
+    checks = [(1, "PASS"), (2, "FAIL")]
+    scan_id = upload(token, checks).get_json()["scan_id"]
+    upload(token, checks)
+    upload(token, checks)
+    scan = db.get(ScanResult, scan_id)
+    scan.scan_time = datetime(2026, 1, 1, 12)
+    scan.last_seen = datetime(2026, 1, 3, 12)
+    db.commit()
+
+    history = score_history(db, scan.agent_id)
+    assert [(h["periodStart"], h["scans"]) for h in history] == [
+        ("2026-01-01T00:00:00", 1), ("2026-01-03T00:00:00", 2)
+    ]
+
+
+def test_reused_key_with_other_content_is_rejected(client, db, register, upload):
+    token = register("ws-01")
+    key = {"Idempotency-Key": "k1"}
+    assert upload(token, [(1, "PASS")], headers=key).status_code == 200
+    assert upload(token, [(1, "PASS")], headers=key).get_json()["duplicate"]
+
+    r = upload(token, [(1, "FAIL")], headers=key)
+    assert r.status_code == 409
+    assert "error" in r.get_json()
+
+
+def test_receipts_expire(client, db, register, upload, monkeypatch):
+    import retention
+    from database_models import ScanResult, UploadReceipt
+
+    token = register("ws-01")
+    upload(token, [(1, "PASS")])
+    upload(token, [(1, "FAIL")])
+    old = db.query(UploadReceipt).order_by(UploadReceipt.id).first()
+    old.received_at = datetime.utcnow() - timedelta(days=8)
+    db.commit()
+
+    monkeypatch.setattr(retention, "RECEIPT_TTL", 7 * 86400)
+    assert retention.compact_batch(db, keep_last=10) == (0, 1)
+    assert db.query(UploadReceipt).count() == 1
+    assert db.query(ScanResult).count() == 2
+
+
+def test_batch_upload_receipts(client, db, register):
+    from database_models import ScanResult
+
+    ws1, ws2 = register("ws-01"), register("ws-02")
+
+    def item(token, status, key):
+        return {"agent_token": token, "idempotency_key": key, "results": {
+            "scan_time": "2026-01-01T00:00:00", "passed": int(status == "PASS"),
+            "failed": int(status == "FAIL"), "checks": [{"id": 1, "title": "Check 1", "status": status}]
+        }}
+
+    uploads = [
+        item(ws1, "PASS", "a"), item(ws2, "FAIL", "b"), item("nope", "PASS", "c"), item(ws1, "PASS", "a"), "junk",
+        item(ws1, "FAIL", "a"),
+    ]
+    receipts = client.post("/api/upload/batch", json={"uploads": uploads}).get_json()["receipts"]
+
+    assert [r["index"] for r in receipts] == [0, 1, 2, 3, 4, 5]
+    assert receipts[0]["outcome"] == receipts[1]["outcome"] == "created"
+    assert receipts[2]["error"] == receipts[4]["error"] == "Invalid agent token"
+    assert receipts[3]["duplicate"] and receipts[3]["scan_id"] == receipts[0]["scan_id"]
+    assert "different upload" in receipts[5]["error"]
+    assert db.query(ScanResult).count() == 2
+
+    assert client.post("/api/upload/batch", json={}).status_code == 400
+    assert client.post("/api/upload/batch", json={"uploads": [{}] * 51}).status_code == 413
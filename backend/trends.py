@@ -0,0 +1,213 @@
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, cast, BigInteger, literal
+
+from database_models import ScanResult, ScanRollup
+
+# ---------------- SCORE TRENDS ----------------
+# Fleet-wide and per-agent score / failure series over a time range.
+# Bucketing happens in SQL (GROUP BY a truncated timestamp), so only one
+# row per bucket leaves the database. Retained scans come from
+# scan_results, compacted history from scan_rollups (daily rows for day
+# buckets, weekly rows for week buckets). A rollup cannot be split, so
+# buckets finer than a day (hour, or `points` narrower than a day) leave
+# compacted history out; the response's rollupPeriod is then null.
+#
+# With `points`, the range is split into that many equal-width buckets
+# instead (epoch seconds floored to the width), which downsamples any span
+# to a fixed number of points. A rollup counts in the bucket its period
+# starts in (the first one if it starts before `since`).
+#
+# A stored scan stands for seen_count uploads: its own at scan_time and the
+# unchanged repeats at last_seen (see retention.sightings).
+
+BUCKETS = ("hour", "day", "week")
+MAX_POINTS = 2000
+DEFAULT_RANGE = timedelta(days=30)
+EPOCH = datetime(1970, 1, 1)
+PERIOD_LENGTH = {"day": timedelta(days=1), "week": timedelta(days=7)}
+
+
+def _is_sqlite(db):
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def _calendar_bucket(db, column, bucket):
+    if not _is_sqlite(db):
+        return func.date_trunc(bucket, column)
+    if bucket == "hour":
+        return func.strftime("%Y-%m-%d %H:00:00", column)
+    if bucket == "week":
+        # Monday of the week, like retention.period_start
+        return func.date(column, "weekday 0", "-6 days")
+    return func.date(column)
+
+
+def _epoch(db, column):
+    if _is_sqlite(db):
+        return cast(func.strftime("%s", column), BigInteger)
+    return cast(func.extract("epoch", column), BigInteger)
+
+
+def _epoch_seconds(ts):
+    # Timestamps are naive UTC throughout (datetime.utcnow)
+    return int((ts - EPOCH).total_seconds())
+
+
+def _width_bucket(db, column, since, width):
+    """Start (epoch seconds) of the fixed-width bucket `column` falls in."""
+    origin = _epoch_seconds(since)
+    greatest = func.max if _is_sqlite(db) else func.greatest
+    offset = greatest(_epoch(db, column), literal(origin)) - literal(origin)
+    return (offset // literal(width)) * literal(width) + literal(origin)
+
+
+def _bucket_key(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return EPOCH + timedelta(seconds=value)
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value.replace(tzinfo=None)
+
+
+def _with_agent(row, grouped):
+    return tuple(row) if grouped else (None,) + tuple(row)
+
+
+def _series_rows(db, bucket_for, rollup_bucket_for, since, until, agent_ids, digest, rollup_period):
+    """(agent_id or None, bucket, scans, score_sum, min, max, failed_sum) rows."""
+    group_agent = agent_ids is not None
+
+    repeats = func.coalesce(ScanResult.seen_count, 1) - 1
+    rows = []
+    for time_col, weight, only_repeated in (
+        (ScanResult.scan_time, literal(1), False),
+        (func.coalesce(ScanResult.last_seen, ScanResult.scan_time), repeats, True),
+    ):
+        scan_bucket = bucket_for(time_col).label("bucket")
+        scan_cols = [
+            scan_bucket,
+            func.sum(weight),
+            func.sum(ScanResult.score_percent * weight),
+            func.min(ScanResult.score_percent),
+            func.max(ScanResult.score_percent),
+            func.sum(ScanResult.failed_count * weight),
+        ]
+        q = db.query(*([ScanResult.agent_id] if group_agent else []), *scan_cols).filter(
+            time_col >= since, time_col < until
+        )
+        if only_repeated:
+            q = q.filter(repeats > 0)
+        if group_agent:
+            q = q.filter(ScanResult.agent_id.in_(agent_ids)).group_by(ScanResult.agent_id, scan_bucket)
+        else:
+            q = q.group_by(scan_bucket)
+        if digest:
+            q = q.filter(ScanResult.rule_pack_digest == digest)
+        rows += [_with_agent(r, group_agent) for r in q]
+    if rollup_period is None:
+        return rows
+
+    roll_bucket = rollup_bucket_for(ScanRollup.period_start).label("bucket")
+    roll_cols = [
+        roll_bucket,
+        func.sum(ScanRollup.scan_count),
+        func.sum(ScanRollup.score_sum),
+        func.min(ScanRollup.score_min),
+        func.max(ScanRollup.score_max),
+        func.sum(ScanRollup.failed_sum),
+    ]
+    q = db.query(*([ScanRollup.agent_id] if group_agent else []), *roll_cols).filter(
+        ScanRollup.period == rollup_period,
+        # every period overlapping the range, including one that starts before `since`
+        ScanRollup.period_start > since - PERIOD_LENGTH[rollup_period],
+        ScanRollup.period_start < until
+    )
+    if group_agent:
+        q = q.filter(ScanRollup.agent_id.in_(agent_ids)).group_by(ScanRollup.agent_id, roll_bucket)
+    else:
+        q = q.group_by(roll_bucket)
+    if digest:
+        q = q.filter(ScanRollup.rule_pack_digest == digest)
+    rows += [_with_agent(r, group_agent) for r in q]
+    return rows
+
+
+def _merge(rows):
+    """Combine scan and rollup rows of the same (agent, bucket) into points."""
+    series = {}
+    for agent_id, bucket, scans, score_sum, score_min, score_max, failed in rows:
+        key = _bucket_key(bucket)
+        if not scans or key is None:
+            continue
+        p = series.setdefault(agent_id, {}).setdefault(
+            key, {"scans": 0, "score_sum": 0.0, "min": None, "max": None, "failed": 0}
+        )
+        p["scans"] += scans
+        p["score_sum"] += score_sum or 0
+        p["min"] = score_min if p["min"] is None else min(p["min"], score_min)
+        p["max"] = score_max if p["max"] is None else max(p["max"], score_max)
+        p["failed"] += failed or 0
+
+    return {
+        agent_id: [
+            {
+                "t": key.isoformat(),
+                "scans": p["scans"],
+                "avgScore": round(p["score_sum"] / p["scans"], 2),
+                "minScore": p["min"],
+                "maxScore": p["max"],
+                "failed": p["failed"],
+                "avgFailed": round(p["failed"] / p["scans"], 2),
+            }
+            for key, p in sorted(points.items())
+        ]
+        for agent_id, points in series.items()
+    }
+
+
+def score_trends(db, since=None, until=None, bucket="day", points=None, agent_ids=(), digest=None):
+    """
+    Fleet series (always) plus one series per id in `agent_ids`. Returns the
+    effective range and bucket so the client can label the axis.
+    """
+    until = until or datetime.utcnow()
+    since = since or until - DEFAULT_RANGE
+
+    if points:
+        width = max(1, math.ceil((until - since).total_seconds() / points))
+        bucket_for = rollup_bucket_for = lambda col: _width_bucket(db, col, since, width)
+        if width >= 7 * 86400:
+            rollup_period = "week"
+        elif width >= 86400:
+            rollup_period = "day"
+        else:
+            rollup_period = None
+        bucket_label = f"{width}s"
+    else:
+        bucket_for = lambda col: _calendar_bucket(db, col, bucket)
+        # Rollup rows already start on a day / week boundary: group by it as is
+        rollup_bucket_for = lambda col: col
+        rollup_period = bucket if bucket in PERIOD_LENGTH else None
+        bucket_label = bucket
+
+    series_args = (bucket_for, rollup_bucket_for, since, until)
+    fleet = _merge(_series_rows(db, *series_args, None, digest, rollup_period))
+    result = {
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "bucket": bucket_label,
+        "rulePackDigest": digest,
+        "rollupPeriod": rollup_period,
+        "fleet": fleet.get(None, []),
+    }
+
+    if agent_ids:
+        per_agent = _merge(_series_rows(db, *series_args, list(agent_ids), digest, rollup_period))
+        result["agents"] = {str(a): per_agent.get(a, []) for a in agent_ids}
+    return result